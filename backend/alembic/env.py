@@ -9,7 +9,7 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from app.database import Base
-from app.models import User, Poll, Participant, Option, Vote
+from app.models import User, Poll, Participant, Option, Vote, OptionScore, OptionResult, PollArchive, VersionCounter
 
 # this is the Alembic Config object
 config = context.config
@@ -0,0 +1,32 @@
+"""add poll and poll list versions
+
+Revision ID: 0797f8d04db7
+Revises: a795684a7953
+Create Date: 2026-10-17 11:33:42.926561
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0797f8d04db7'
+down_revision = 'a795684a7953'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('polls', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+    version_counters = op.create_table(
+        'version_counters',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(version_counters, [{'name': 'polls', 'version': 0}])
+
+
+def downgrade() -> None:
+    op.drop_table('version_counters')
+    op.drop_column('polls', 'version')
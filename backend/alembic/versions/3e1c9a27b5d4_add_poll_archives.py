@@ -0,0 +1,33 @@
+"""add poll archives
+
+Revision ID: 3e1c9a27b5d4
+Revises: 0797f8d04db7
+Create Date: 2026-10-17 15:02:11.384205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e1c9a27b5d4'
+down_revision = '0797f8d04db7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('polls', sa.Column('archived_at', sa.DateTime(), nullable=True))
+    op.create_table(
+        'poll_archives',
+        sa.Column('poll_id', sa.String(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['poll_id'], ['polls.id'], ),
+        sa.PrimaryKeyConstraint('poll_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('poll_archives')
+    op.drop_column('polls', 'archived_at')
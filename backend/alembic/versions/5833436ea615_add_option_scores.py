@@ -0,0 +1,40 @@
+"""add option score accumulators
+
+Revision ID: 5833436ea615
+Revises: 49ffbd90ef7e
+Create Date: 2026-10-17 09:12:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5833436ea615'
+down_revision = '49ffbd90ef7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing polls get their accumulators rebuilt lazily on first use,
+    # or eagerly with `python -m app.maintenance rebuild-scores`.
+    op.create_table('option_scores',
+    sa.Column('option_id', sa.String(), nullable=False),
+    sa.Column('poll_id', sa.String(), nullable=False),
+    sa.Column('num_raters', sa.Integer(), nullable=False),
+    sa.Column('reciprocal_sum', sa.Float(), nullable=False),
+    sa.Column('mean', sa.Float(), nullable=False),
+    sa.Column('m2', sa.Float(), nullable=False),
+    sa.Column('veto_count', sa.Integer(), nullable=False),
+    sa.Column('histogram', sa.JSON(), nullable=False),
+    sa.ForeignKeyConstraint(['option_id'], ['options.id'], ),
+    sa.ForeignKeyConstraint(['poll_id'], ['polls.id'], ),
+    sa.PrimaryKeyConstraint('option_id')
+    )
+    op.create_index('ix_option_scores_poll', 'option_scores', ['poll_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_option_scores_poll', table_name='option_scores')
+    op.drop_table('option_scores')
@@ -0,0 +1,193 @@
+"""add option results
+
+Revision ID: 6f4a0c93d2e8
+Revises: b8d26f0e4a13
+Create Date: 2026-10-17 18:21:05.662418
+
+"""
+import json
+import random
+import zlib
+from fractions import Fraction
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f4a0c93d2e8'
+down_revision = 'b8d26f0e4a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'option_results',
+        sa.Column('poll_id', sa.String(), nullable=False),
+        sa.Column('option_id', sa.String(), nullable=False),
+        sa.Column('label', sa.String(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=True),
+        sa.Column('score', sa.Float(), nullable=True),
+        sa.Column('variance', sa.Float(), nullable=True),
+        sa.Column('median', sa.Float(), nullable=True),
+        sa.Column('num_raters', sa.Integer(), nullable=True),
+        sa.Column('vetoed', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['poll_id'], ['polls.id'], ),
+        sa.PrimaryKeyConstraint('poll_id', 'option_id')
+    )
+    backfill_results()
+
+
+def backfill_results() -> None:
+    """
+    Store the results of polls revealed before this table existed.
+
+    Unarchived polls are ranked from their votes, archived ones from the
+    histograms in their archive. Votes may have changed since the reveal,
+    so the stored winner is ranked first either way.
+
+    Uses only the frozen helpers below, never app code, so this revision
+    does the same thing whatever the app looks like later.
+    """
+    bind = op.get_bind()
+    polls = sa.table('polls', sa.column('id'), sa.column('winner_id'), sa.column('archived_at'),
+                     sa.column('deleted_at'))
+    options = sa.table('options', sa.column('id'), sa.column('poll_id'), sa.column('label'))
+    votes = sa.table('votes', sa.column('poll_id'), sa.column('option_id'), sa.column('rating'),
+                     sa.column('veto'))
+    archives = sa.table('poll_archives', sa.column('poll_id'), sa.column('data', sa.LargeBinary))
+    results = sa.table('option_results', *(sa.column(name) for name in (
+        'poll_id', 'option_id', 'label', 'rank', 'score', 'variance', 'median', 'num_raters', 'vetoed')))
+
+    revealed = bind.execute(
+        sa.select(polls.c.id, polls.c.winner_id, polls.c.archived_at)
+        .where(polls.c.winner_id.is_not(None), polls.c.deleted_at.is_(None))
+    ).all()
+    for poll_id, winner_id, archived_at in revealed:
+        histograms = {}
+        vetoed = set()
+        if archived_at:
+            data = bind.execute(sa.select(archives.c.data).where(archives.c.poll_id == poll_id)).scalar()
+            if data is None:
+                continue
+            archived = json.loads(zlib.decompress(data))["options"]
+            labels = {option["id"]: option["label"] for option in archived}
+            for option in archived:
+                if option["veto_count"]:
+                    vetoed.add(option["id"])
+                else:
+                    histograms[option["id"]] = option["histogram"]
+        else:
+            labels = dict(bind.execute(
+                sa.select(options.c.id, options.c.label).where(options.c.poll_id == poll_id)
+            ).all())
+            counts = bind.execute(
+                sa.select(votes.c.option_id, votes.c.rating, votes.c.veto, sa.func.count())
+                .where(votes.c.poll_id == poll_id)
+                .group_by(votes.c.option_id, votes.c.rating, votes.c.veto)
+            )
+            for option_id, rating, veto, count in counts:
+                if veto:
+                    vetoed.add(option_id)
+                elif rating is not None:
+                    histograms.setdefault(option_id, [0] * 11)[rating] += count
+            for option_id in vetoed:
+                histograms.pop(option_id, None)
+
+        ranking = _winner_first(_rank_histograms(poll_id, list(labels), histograms, vetoed), winner_id)
+        if ranking:
+            bind.execute(results.insert(), [
+                {
+                    'poll_id': poll_id,
+                    'option_id': result['option_id'],
+                    'label': labels[result['option_id']],
+                    'rank': result['rank'],
+                    'score': result['score'],
+                    'variance': result['variance'],
+                    'median': result['median'],
+                    'num_raters': result['num_raters'],
+                    'vetoed': result['vetoed'],
+                }
+                for result in ranking
+            ])
+
+
+# Frozen copies of the scoring rules as of this revision (app.scoring.rank_histograms
+# and app.results.winner_first); do not update them when the app changes.
+
+def _score_histogram(option_id, histogram):
+    num_raters = sum(histogram)
+    if num_raters == 0:
+        return None
+    # Exact harmonic mean, rating 0 scored as 1/10
+    reciprocal_sum = sum(
+        count / Fraction(max(rating, Fraction(1, 10))) for rating, count in enumerate(histogram) if count
+    )
+    if num_raters > 1:
+        total = sum(rating * count for rating, count in enumerate(histogram))
+        total_sq = sum(rating * rating * count for rating, count in enumerate(histogram))
+        variance = float(Fraction(total_sq * num_raters - total * total, num_raters * (num_raters - 1)))
+    else:
+        variance = 0.0
+    # Median as statistics.median computes it for integer data
+    low_index, high_index = (num_raters - 1) // 2, num_raters // 2
+    low = high = None
+    seen = 0
+    for rating, count in enumerate(histogram):
+        seen += count
+        if low is None and seen > low_index:
+            low = rating
+        if seen > high_index:
+            high = rating
+            break
+    return {
+        'option_id': option_id,
+        'score': num_raters / reciprocal_sum,
+        'variance': variance,
+        'median': low if low == high else (low + high) / 2,
+        'num_raters': num_raters,
+    }
+
+
+def _rank_histograms(poll_id, option_ids, histograms, vetoed):
+    scored_options = []
+    unranked = []
+    for option_id in option_ids:
+        scored = None if option_id in vetoed else _score_histogram(option_id, histograms.get(option_id, [0] * 11))
+        if scored is not None:
+            scored_options.append(scored)
+        else:
+            unranked.append({
+                'option_id': option_id,
+                'score': None,
+                'variance': None,
+                'median': None,
+                'num_raters': None if option_id in vetoed else 0,
+                'rank': None,
+                'vetoed': option_id in vetoed,
+            })
+    # Same draws as random.seed(poll_id) followed by random.random() per option
+    tie_breaker = random.Random(poll_id)
+    scored_options.sort(key=lambda x: (-x['score'], x['variance'], -x['median'], -x['num_raters'], tie_breaker.random()))
+    for rank, scored in enumerate(scored_options, 1):
+        scored['score'] = float(scored['score'])
+        scored['rank'] = rank
+        scored['vetoed'] = False
+    return scored_options + unranked
+
+
+def _winner_first(results, winner_id):
+    winner = next((result for result in results if result['option_id'] == winner_id), None)
+    if winner is None or winner['rank'] == 1:
+        return results
+    others = [result for result in results if result is not winner]
+    ranked = [result for result in others if result['rank'] is not None]
+    for rank, result in enumerate(ranked, 2):
+        result['rank'] = rank
+    winner['rank'] = 1
+    return [winner] + ranked + [result for result in others if result['rank'] is None]
+
+
+def downgrade() -> None:
+    op.drop_table('option_results')
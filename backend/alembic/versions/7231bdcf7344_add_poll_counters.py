@@ -0,0 +1,36 @@
+"""add denormalized poll counters
+
+Revision ID: 7231bdcf7344
+Revises: 5833436ea615
+Create Date: 2026-10-17 10:03:27.550931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7231bdcf7344'
+down_revision = '5833436ea615'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('polls', sa.Column('participant_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('polls', sa.Column('ready_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('polls', sa.Column('option_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from the base tables
+    op.execute("""
+        UPDATE polls SET
+            participant_count = (SELECT COUNT(*) FROM participants WHERE participants.poll_id = polls.id),
+            ready_count = (SELECT COUNT(*) FROM participants WHERE participants.poll_id = polls.id AND participants.ready),
+            option_count = (SELECT COUNT(*) FROM options WHERE options.poll_id = polls.id)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('polls', 'option_count')
+    op.drop_column('polls', 'ready_count')
+    op.drop_column('polls', 'participant_count')
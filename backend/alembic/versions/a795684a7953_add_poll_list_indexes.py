@@ -0,0 +1,41 @@
+"""add keyset pagination indexes on polls
+
+Revision ID: a795684a7953
+Revises: 7231bdcf7344
+Create Date: 2026-10-17 11:31:20.313444
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a795684a7953'
+down_revision = '7231bdcf7344'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    open_polls = sa.text('winner_id IS NULL')
+    revealed_polls = sa.text('winner_id IS NOT NULL')
+    # SQLite matches partial index predicates textually, against "princess_mode = 1/0"
+    princess_polls = {'postgresql_where': sa.text('princess_mode'), 'sqlite_where': sa.text('princess_mode = 1')}
+    regular_polls = {'postgresql_where': sa.text('NOT princess_mode'), 'sqlite_where': sa.text('princess_mode = 0')}
+    op.create_index('ix_polls_created', 'polls', ['created_at', 'id'])
+    op.create_index('ix_polls_open_created', 'polls', ['created_at', 'id'],
+                    postgresql_where=open_polls, sqlite_where=open_polls)
+    op.create_index('ix_polls_revealed_created', 'polls', ['created_at', 'id'],
+                    postgresql_where=revealed_polls, sqlite_where=revealed_polls)
+    op.create_index('ix_polls_creator_created', 'polls', ['creator_id', 'created_at', 'id'])
+    op.create_index('ix_polls_princess_created', 'polls', ['created_at', 'id'], **princess_polls)
+    op.create_index('ix_polls_regular_created', 'polls', ['created_at', 'id'], **regular_polls)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_polls_regular_created', table_name='polls')
+    op.drop_index('ix_polls_princess_created', table_name='polls')
+    op.drop_index('ix_polls_creator_created', table_name='polls')
+    op.drop_index('ix_polls_revealed_created', table_name='polls')
+    op.drop_index('ix_polls_open_created', table_name='polls')
+    op.drop_index('ix_polls_created', table_name='polls')
@@ -0,0 +1,24 @@
+"""add poll deleted_at
+
+Revision ID: b8d26f0e4a13
+Revises: 3e1c9a27b5d4
+Create Date: 2026-10-17 16:48:27.519730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d26f0e4a13'
+down_revision = '3e1c9a27b5d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('polls', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('polls', 'deleted_at')
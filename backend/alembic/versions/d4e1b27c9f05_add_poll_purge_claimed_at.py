@@ -0,0 +1,24 @@
+"""add poll purge_claimed_at
+
+Revision ID: d4e1b27c9f05
+Revises: 6f4a0c93d2e8
+Create Date: 2026-10-17 21:07:43.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e1b27c9f05'
+down_revision = '6f4a0c93d2e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('polls', sa.Column('purge_claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('polls', 'purge_claimed_at')
@@ -0,0 +1,186 @@
+"""Archive tier for revealed polls.
+
+A revealed poll never changes again, yet its votes, participants and
+options would stay in the hot tables (and their indexes) forever. The
+archiver compacts every revealed poll created more than ARCHIVE_AFTER_DAYS
+ago into one PollArchive row: its options in display order with their
+final vote aggregates, as zlib-compressed JSON. It then deletes the raw
+rows in batches of ARCHIVE_BATCH_SIZE, committing after each batch so no
+transaction holds locks for long. The Poll row, with its counters, winner
+and version, stays where it is.
+
+Reads of an archived poll (options, status, winner, clone) are served from
+the archive and return exactly what they did before, so archiving does not
+bump the poll version and cached entries and ETags stay valid.
+
+Archiving permanently deletes votes, participants and options, so it is
+opt-in: nothing is archived unless ARCHIVE_AFTER_DAYS is set.
+
+Settings:
+- ARCHIVE_AFTER_DAYS: age after which a revealed poll is archived; 0 (the default) disables archiving
+- ARCHIVE_INTERVAL: seconds between background archiver runs
+- ARCHIVE_BATCH_SIZE: polls archived per query, and raw rows deleted per statement
+"""
+import asyncio
+import json
+import logging
+import os
+import zlib
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import select, update
+
+from app.database import AsyncSessionLocal
+from app.deletion import delete_in_batches
+from app.metrics import Counter
+from app.models import Option, OptionScore, Participant, Poll, PollArchive, Vote
+from app.results import has_results, store_results, winner_first
+from app.scoring import rank_results, vote_aggregates
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+
+# Raw tables purged once a poll is archived, children before parents
+PURGED_TABLES = (Vote, OptionScore, Participant, Option)
+
+archived_polls = Counter("themis_archived_polls_total", "Revealed polls compacted into the archive")
+purged_rows = Counter("themis_archive_purged_rows_total", "Raw rows deleted after archiving", ("table",))
+
+
+def encode_archive(data: dict) -> bytes:
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode(), 9)
+
+
+def decode_archive(blob: bytes) -> dict:
+    return json.loads(zlib.decompress(blob))
+
+
+async def load_archive(db, poll_id: str) -> Optional[dict]:
+    """The archived state of a poll, or None if it has not been archived."""
+    archive = await db.get(PollArchive, poll_id)
+    return decode_archive(archive.data) if archive else None
+
+
+def archived_option(data: dict, option_id: str) -> Optional[dict]:
+    """One option of an archived poll, or None."""
+    return next((option for option in data["options"] if option["id"] == option_id), None)
+
+
+async def archive_poll(db, poll_id: str) -> bool:
+    """
+    Compact a revealed poll into a PollArchive row and commit.
+
+    Returns False (and changes nothing) if the poll is not revealed, is
+    being deleted or was already archived, e.g. by another worker.
+    """
+    claimed = await db.execute(
+        update(Poll)
+        .where(Poll.id == poll_id, Poll.winner_id.is_not(None), Poll.archived_at.is_(None),
+               Poll.deleted_at.is_(None))
+        .values(archived_at=datetime.utcnow())
+    )
+    if not claimed.rowcount:
+        await db.rollback()
+        return False
+
+    options = (await db.execute(
+        select(Option.id, Option.label, Option.created_at)
+        .where(Option.poll_id == poll_id)
+        .order_by(Option.created_at)
+    )).all()
+    aggregates = {option_id: (vetoes, histogram) for _, option_id, vetoes, *histogram in
+                  await db.execute(vote_aggregates(poll_id))}
+    archived = []
+    for option_id, label, created_at in options:
+        vetoes, histogram = aggregates.get(option_id, (0, []))
+        histogram = [int(count or 0) for count in histogram]
+        archived.append({
+            "id": option_id,
+            "label": label,
+            "created_at": created_at.isoformat(),
+            "veto_count": int(vetoes or 0),
+            "num_raters": sum(histogram),
+            "histogram": histogram,
+        })
+    if not await has_results(db, poll_id):
+        # Revealed before results were stored; their votes are about to go.
+        # They may have changed since the reveal, so keep its winner first
+        winner_id = await db.scalar(select(Poll.winner_id).where(Poll.id == poll_id))
+        results = await db.run_sync(lambda session: rank_results(poll_id, session))
+        await store_results(db, poll_id, winner_first(results, winner_id))
+    db.add(PollArchive(poll_id=poll_id, data=encode_archive({"options": archived})))
+    await db.commit()
+    archived_polls.inc()
+    return True
+
+
+async def purge_poll(db, poll_id: str):
+    """Delete an archived poll's raw rows, ARCHIVE_BATCH_SIZE rows per statement."""
+    for table in PURGED_TABLES:
+        deleted = await delete_in_batches(db, table, poll_id, ARCHIVE_BATCH_SIZE)
+        if deleted:
+            purged_rows.inc(deleted, table=table.__tablename__)
+
+
+async def due_polls(db, older_than: timedelta) -> List[str]:
+    """Revealed, unarchived polls created before the cutoff, oldest first."""
+    cutoff = datetime.utcnow() - older_than
+    return list((await db.scalars(
+        select(Poll.id)
+        .where(Poll.winner_id.is_not(None), Poll.archived_at.is_(None), Poll.deleted_at.is_(None),
+               Poll.created_at < cutoff)
+        .order_by(Poll.created_at, Poll.id)
+        .limit(ARCHIVE_BATCH_SIZE)
+    )).all())
+
+
+async def unpurged_polls(db) -> List[str]:
+    """Archived polls whose raw rows were not all deleted, e.g. after a crash."""
+    return list((await db.scalars(
+        select(Option.poll_id).distinct()
+        .join(Poll, Poll.id == Option.poll_id)
+        .where(Poll.archived_at.is_not(None))
+        .limit(ARCHIVE_BATCH_SIZE)
+    )).all())
+
+
+async def archive_polls(poll_ids: Optional[List[str]] = None, older_than: Optional[timedelta] = None) -> int:
+    """
+    Archive and purge the given polls, or every due poll. Returns the number archived.
+
+    Polls archived by an earlier, interrupted run are purged first. With
+    neither poll IDs nor older_than, nothing is due unless
+    ARCHIVE_AFTER_DAYS is set.
+    """
+    if older_than is None:
+        if poll_ids is None and ARCHIVE_AFTER_DAYS <= 0:
+            return 0
+        older_than = timedelta(days=ARCHIVE_AFTER_DAYS)
+    archived = 0
+    async with AsyncSessionLocal() as db:
+        for poll_id in await unpurged_polls(db):
+            await purge_poll(db, poll_id)
+        while True:
+            batch = poll_ids if poll_ids is not None else await due_polls(db, older_than)
+            for poll_id in batch:
+                if await archive_poll(db, poll_id):
+                    archived += 1
+                    await purge_poll(db, poll_id)
+            if poll_ids is not None or len(batch) < ARCHIVE_BATCH_SIZE:
+                return archived
+
+
+async def run_archiver():
+    """Archive due polls every ARCHIVE_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(ARCHIVE_INTERVAL)
+        try:
+            archived = await archive_polls()
+            if archived:
+                logger.info("Archived %d revealed poll(s)", archived)
+        except Exception:
+            logger.exception("Archiving revealed polls failed")
@@ -0,0 +1,267 @@
+"""Bulk poll/option import and streaming results export.
+
+Import reads a streamed CSV or NDJSON body, one record per line, with the
+fields poll, title, creator_id, princess_mode and label:
+
+- poll names the poll: the ID of an existing poll, or any other key to
+  create a new poll (title, creator_id and princess_mode are read from the
+  first record with that key and ignored afterwards)
+- label, if present, adds an option to that poll
+
+Rows are inserted with multi-row INSERTs of IMPORT_CHUNK_SIZE rows, all in
+the request's transaction. Existing polls get one ready reset and one
+counter update each, however many options they receive.
+
+The results export streams every revealed poll's stored results (see
+app.results), one row per option, a batch of polls at a time.
+"""
+import codecs
+import csv
+import io
+import json
+import os
+from collections import deque
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+
+from app.counters import PollCounts, adjust_counts
+from app.models import Option, OptionResult, OptionScore, Participant, Poll, User, generate_ulid
+from app.results import result_order
+from app.scoring import empty_accumulator
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+
+RESULT_COLUMNS = (
+    "pollId", "title", "winner_id", "optionId", "label", "winner", "rank",
+    "score", "variance", "median", "num_raters", "vetoed",
+)
+
+
+class InvalidImport(ValueError):
+    """A record of an import could not be used."""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"Line {line}: {message}")
+
+
+class ImportResult(NamedTuple):
+    created: Dict[str, dict]  # key -> new poll row
+    added: Dict[str, List[Tuple[str, str]]]  # existing poll ID -> (option ID, label) added
+    counts: Dict[str, PollCounts]  # existing poll ID -> counts after the import
+    options: int
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _ends_in_quoted_field(line: str, quoted: bool) -> bool:
+    """Whether a CSV line ends inside a quoted field, given whether it started in one."""
+    field_start = not quoted
+    closed = False  # Just after the quote that ended a quoted field
+    for char in line:
+        if quoted:
+            if char == '"':
+                quoted, closed = False, True
+            continue
+        if char == '"' and (field_start or closed):
+            quoted = True  # Opening quote, or the second of an escaped pair
+        field_start = char == ","
+        closed = False
+    return quoted
+
+
+async def _csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, List[str]]]:
+    """
+    Parse a streamed CSV body into (first line number, row) pairs, skipping blank lines.
+
+    A single csv.reader reads the whole stream, so quoted fields may span
+    lines. It is only asked for a row once a whole record is buffered, so
+    it never runs out of input inside a quoted field.
+    """
+    pending: Deque[str] = deque()
+
+    def feed():
+        while True:
+            yield pending.popleft()
+
+    reader = csv.reader(feed())
+    line_no = 0
+    start = 0
+    quoted = False
+    async for line in _lines(chunks):
+        line_no += 1
+        if not pending and not line.strip():
+            continue
+        if not pending:
+            start = line_no
+        pending.append(line + "\n")
+        quoted = _ends_in_quoted_field(line, quoted)
+        if not quoted:
+            yield start, next(reader)
+    if pending:
+        raise InvalidImport(start, "unterminated quoted field")
+
+
+async def read_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[int, dict]]:
+    """Parse a streamed import body into (line number, record) pairs, skipping blank lines."""
+    if fmt == "csv":
+        header: Optional[List[str]] = None
+        async for line_no, row in _csv_rows(chunks):
+            if header is None:
+                header = [name.strip() for name in row]
+                continue
+            yield line_no, dict(zip(header, row))
+        return
+
+    line_no = 0
+    async for line in _lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise InvalidImport(line_no, "invalid JSON")
+        if not isinstance(record, dict):
+            raise InvalidImport(line_no, "expected a JSON object")
+        yield line_no, record
+
+
+def _flag(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+async def import_records(db, records: AsyncIterator[Tuple[int, dict]]) -> ImportResult:
+    """Write imported polls and options without committing."""
+    polls: Dict[str, str] = {}  # key -> poll ID
+    created: Dict[str, dict] = {}
+    added: Dict[str, List[Tuple[str, str]]] = {}
+    new_options: Dict[str, int] = {}
+    users = set()
+    poll_rows: List[dict] = []
+    option_rows: List[dict] = []
+    options = 0
+    now = datetime.utcnow()
+    tick = timedelta(microseconds=1)
+
+    async def flush():
+        # Polls first: their options reference them
+        if poll_rows:
+            await db.execute(insert(Poll), poll_rows)
+        if option_rows:
+            await db.execute(insert(Option), option_rows)
+            await db.execute(insert(OptionScore), [empty_accumulator(row["poll_id"], row["id"]) for row in option_rows])
+        poll_rows.clear()
+        option_rows.clear()
+
+    async for line_no, record in records:
+        key = str(record.get("poll") or "").strip()
+        if not key:
+            raise InvalidImport(line_no, "poll is required")
+        poll_id = polls.get(key)
+        if poll_id is None:
+            poll = await db.get(Poll, key)
+            if poll is not None and poll.deleted_at is None:
+                if poll.archived_at:
+                    raise InvalidImport(line_no, f"poll {key} is archived")
+                poll_id = poll.id
+                added[poll_id] = []
+            else:
+                title = str(record.get("title") or "").strip()
+                if not title:
+                    raise InvalidImport(line_no, f"poll {key} does not exist and has no title")
+                creator_id = record.get("creator_id") or None
+                if creator_id and creator_id not in users:
+                    if await db.get(User, creator_id) is None:
+                        raise InvalidImport(line_no, "creator user not found")
+                    users.add(creator_id)
+                poll_id = generate_ulid()
+                row = {
+                    "id": poll_id,
+                    "title": title,
+                    "creator_id": creator_id,
+                    "princess_mode": _flag(record.get("princess_mode")),
+                    "created_at": now + len(created) * tick,
+                }
+                poll_rows.append(row)
+                created[key] = row
+                new_options[poll_id] = 0
+            polls[key] = poll_id
+
+        label = str(record.get("label") or "").strip()
+        if label:
+            option_id = generate_ulid()
+            option_rows.append({"id": option_id, "poll_id": poll_id, "label": label, "created_at": now + options * tick})
+            options += 1
+            if poll_id in added:
+                added[poll_id].append((option_id, label))
+            else:
+                new_options[poll_id] += 1
+        if len(poll_rows) + len(option_rows) >= IMPORT_CHUNK_SIZE:
+            await flush()
+    await flush()
+
+    # One ready reset and one counter update per poll that changed
+    changed = [poll_id for poll_id, labels in added.items() if labels]
+    if changed:
+        await db.execute(update(Participant).where(Participant.poll_id.in_(changed)).values(ready=False))
+    counts = {}
+    for poll_id in changed:
+        counts[poll_id] = await adjust_counts(db, poll_id, options=len(added[poll_id]), reset_ready=True)
+    for poll_id, count in new_options.items():
+        if count:
+            await adjust_counts(db, poll_id, options=count)
+    return ImportResult(created, {poll_id: added[poll_id] for poll_id in changed}, counts, options)
+
+
+async def result_rows(db, polls: List[Poll]) -> List[dict]:
+    """Stored per-option results of revealed polls, in poll order and then rank order."""
+    stored: Dict[str, List[OptionResult]] = {poll.id: [] for poll in polls}
+    if polls:
+        for row in await db.scalars(select(OptionResult).where(OptionResult.poll_id.in_(list(stored)))):
+            stored[row.poll_id].append(row)
+
+    results = []
+    for poll in polls:
+        for row in sorted(stored[poll.id], key=result_order):
+            results.append({
+                "pollId": poll.id,
+                "title": poll.title,
+                "winner_id": poll.winner_id,
+                "optionId": row.option_id,
+                "label": row.label,
+                "winner": row.option_id == poll.winner_id,
+                "rank": row.rank,
+                "score": row.score,
+                "variance": row.variance,
+                "median": row.median,
+                "num_raters": row.num_raters,
+                "vetoed": row.vetoed,
+            })
+    return results
+
+
+def format_results(rows: List[dict], fmt: str, header: bool = False) -> str:
+    """Render result rows as NDJSON or CSV (with a header row if asked)."""
+    if fmt == "ndjson":
+        return "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=RESULT_COLUMNS, lineterminator="\n")
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue()
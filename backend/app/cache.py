@@ -0,0 +1,112 @@
+"""Per-poll read-through caches for hot read paths.
+
+The status snapshot, the ordered option list and the results of a poll
+are cached per worker in LRU caches with a TTL. Entries are invalidated by
+the WebSocket layer whenever an event for the poll is broadcast (on the
+worker that made the change) or delivered (on every other worker), so
+reads never lag the events clients see. The TTL only bounds how long an
+entry can survive a missed event.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+from app.metrics import Counter, Gauge
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))
+
+MISSING = object()
+
+cache_requests = Counter("themis_cache_requests_total", "Cache lookups", ("cache", "result"))
+cache_evictions = Counter("themis_cache_evictions_total", "Entries evicted to respect the size bound", ("cache",))
+
+_caches: List["TTLCache"] = []
+
+
+class TTLCache:
+    """
+    LRU cache whose entries also expire after ttl seconds.
+
+    get_or_load only stores a loaded value if the key was not invalidated
+    while the loader ran, so a read racing a write cannot cache the state
+    from before the write.
+    """
+
+    def __init__(self, name: str, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        # key -> [invalidation count, loads in flight], kept only while loading
+        self._loading: Dict[Hashable, list] = {}
+        _caches.append(self)
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value, or MISSING."""
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            cache_requests.inc(cache=self.name, result="miss")
+            return MISSING
+        self.entries.move_to_end(key)
+        cache_requests.inc(cache=self.name, result="hit")
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            cache_evictions.inc(cache=self.name)
+
+    def invalidate(self, key: Hashable):
+        self.entries.pop(key, None)
+        if key in self._loading:
+            self._loading[key][0] += 1
+
+    def clear(self):
+        self.entries.clear()
+        for state in self._loading.values():
+            state[0] += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value, or load and cache it. None is not cached."""
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+        return await self.load(key, loader)
+
+    async def load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Load a value after a miss and cache it unless invalidated meanwhile."""
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return await loader()
+        state = self._loading.setdefault(key, [0, 0])
+        generation = state[0]
+        state[1] += 1
+        try:
+            value = await loader()
+            if value is not None and state[0] == generation:
+                self.set(key, value)
+            return value
+        finally:
+            state[1] -= 1
+            if not state[1]:
+                del self._loading[key]
+
+
+Gauge("themis_cache_entries", "Entries held per cache", ("cache",),
+      callback=lambda: {(cache.name,): len(cache.entries) for cache in _caches})
+
+status_cache = TTLCache("status")
+options_cache = TTLCache("options")
+results_cache = TTLCache("results")
+
+
+def invalidate_poll(poll_id: str):
+    """Drop everything cached for a poll."""
+    status_cache.invalidate(poll_id)
+    options_cache.invalidate(poll_id)
+    results_cache.invalidate(poll_id)
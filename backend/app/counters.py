@@ -0,0 +1,126 @@
+"""Denormalized per-poll counters and versions.
+
+Poll.participant_count, Poll.ready_count and Poll.option_count are updated
+with relative UPDATEs in the same transaction as the change they count, so
+status reads and ready_counts broadcasts need a single primary-key lookup
+instead of aggregate scans over participants and options.
+
+Poll.version is bumped by the same UPDATE, and the poll list has its own
+version in version_counters. Both are served as ETags.
+"""
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy import Integer, cast, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import Poll, Participant, Option, VersionCounter
+
+# version_counters row for the poll list
+POLL_LIST = "polls"
+
+
+class PollCounts(NamedTuple):
+    ready: int
+    participants: int
+    options: int
+    version: int
+
+
+async def adjust_counts(
+    db: AsyncSession,
+    poll_id: str,
+    participants: int = 0,
+    ready: int = 0,
+    options: int = 0,
+    reset_ready: bool = False,
+) -> Optional[PollCounts]:
+    """
+    Apply counter deltas to a poll, bump its version and return the new counts.
+
+    reset_ready sets ready_count to zero instead of applying a delta, for
+    changes that unready every participant. Called without deltas it only
+    bumps the version. Returns None if the poll does not exist.
+    """
+    values = {
+        Poll.participant_count: Poll.participant_count + participants,
+        Poll.option_count: Poll.option_count + options,
+        Poll.ready_count: 0 if reset_ready else Poll.ready_count + ready,
+        Poll.version: Poll.version + 1,
+    }
+    row = (await db.execute(
+        update(Poll)
+        .where(Poll.id == poll_id)
+        .values(values)
+        .returning(Poll.ready_count, Poll.participant_count, Poll.option_count, Poll.version)
+    )).first()
+    return PollCounts(*row) if row else None
+
+
+async def set_ready(db: AsyncSession, participant_id: str, ready: bool) -> int:
+    """
+    Set a participant's ready flag and return the ready_count delta.
+
+    The flag is only written if it actually changes, so repeated or
+    concurrent calls never count the same participant twice.
+    """
+    result = await db.execute(
+        update(Participant)
+        .where(Participant.id == participant_id, Participant.ready == (not ready))
+        .values(ready=ready)
+    )
+    if not result.rowcount:
+        return 0
+    return 1 if ready else -1
+
+
+async def poll_version(db: AsyncSession, poll_id: str) -> Optional[int]:
+    """Current version of a poll, or None if it does not exist or is being deleted."""
+    return await db.scalar(select(Poll.version).where(Poll.id == poll_id, Poll.deleted_at.is_(None)))
+
+
+async def list_version(db: AsyncSession) -> int:
+    """Current version of the poll list."""
+    return await db.scalar(select(VersionCounter.version).where(VersionCounter.name == POLL_LIST)) or 0
+
+
+async def bump_list_version(db: AsyncSession) -> int:
+    """Bump the poll list version after polls are added, removed or revealed."""
+    version = await db.scalar(
+        update(VersionCounter)
+        .where(VersionCounter.name == POLL_LIST)
+        .values(version=VersionCounter.version + 1)
+        .returning(VersionCounter.version)
+    )
+    if version is None:
+        # Databases created without migrations have no row yet
+        db.add(VersionCounter(name=POLL_LIST, version=1))
+        await db.flush()
+        version = 1
+    return version
+
+
+def rebuild_counters(db: Session, poll_ids: Iterable[str]):
+    """Recompute the counters of the given polls from the base tables."""
+    participants = (
+        select(func.count(Participant.id))
+        .where(Participant.poll_id == Poll.id)
+        .scalar_subquery()
+    )
+    ready = (
+        select(func.coalesce(func.sum(cast(Participant.ready, Integer)), 0))
+        .where(Participant.poll_id == Poll.id)
+        .scalar_subquery()
+    )
+    options = (
+        select(func.count(Option.id))
+        .where(Option.poll_id == Poll.id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(Poll)
+        .where(Poll.id.in_(list(poll_ids)))
+        .values(participant_count=participants, ready_count=ready, option_count=options,
+                version=Poll.version + 1)
+        .execution_options(synchronize_session=False)
+    )
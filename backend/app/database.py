@@ -1,22 +1,212 @@
 """Database connection and session management."""
+import asyncio
+import logging
 import os
-from sqlalchemy import create_engine
+import time
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.instrumentation import instrument_engine
+from app.metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://localhost/themis")
 
+# Async pool settings, per worker process: a deployment can open up to
+# workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Seconds; -1 never recycles
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a connection
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "0") == "1"
+# Seconds between background liveness checks; 0 disables them
+DB_LIVENESS_INTERVAL = float(os.getenv("DB_LIVENESS_INTERVAL", "15"))
+# Sessions WebSocket handlers may hold at once, so they cannot starve HTTP requests
+WS_DB_SESSIONS = int(os.getenv("WS_DB_SESSIONS", str(max(1, DB_POOL_SIZE // 2))))
+
+pool_wait_seconds = Histogram(
+    "themis_db_pool_wait_seconds", "Time spent waiting to check out a pooled connection",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30),
+)
+pool_timeouts = Counter("themis_db_pool_timeouts_total", "Connection checkouts that hit DB_POOL_TIMEOUT")
+ws_session_wait_seconds = Histogram(
+    "themis_ws_db_session_wait_seconds", "Time WebSocket handlers waited for a database session",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+db_up = Gauge("themis_db_up", "1 if the last background liveness check succeeded")
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto the matching async driver (asyncpg / aiosqlite)."""
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+        # asyncpg takes "ssl" where libpq takes "sslmode"
+        if "sslmode" in parsed.query:
+            query = dict(parsed.query)
+            query["ssl"] = query.pop("sslmode")
+            parsed = parsed.set(query=query)
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+# Sync engine, used by Alembic and the maintenance commands
 engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_timeouts.inc()
+            raise
+        finally:
+            pool_wait_seconds.observe(time.perf_counter() - start)
+
+
+def pool_options(url: str) -> dict:
+    """Engine pool arguments for an async URL; in-memory SQLite keeps its static pool."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# Async engine, used by the API so queries never block the event loop.
+# Pre-ping is off by default: it costs a round trip per checkout, and the
+# liveness check below catches a restarted database instead
+async_engine = create_async_engine(async_database_url(DATABASE_URL), **pool_options(async_database_url(DATABASE_URL)))
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,  # Attributes stay readable after commit without lazy IO
+)
+
+# Per-request query counts and timings (see app.instrumentation)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
 Base = declarative_base()
 
 
-def get_db():
+async def upsert(db: AsyncSession, model, rows, index_elements, update_columns):
+    """
+    Insert rows, updating update_columns where index_elements already exist.
+
+    Issues a single INSERT ... ON CONFLICT DO UPDATE, which PostgreSQL and
+    SQLite (3.24+) both support. index_elements must match a unique index.
+    """
+    if not rows:
+        return
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"upsert is not supported on {dialect}")
+    stmt = insert(model).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: stmt.excluded[column] for column in update_columns},
+    )
+    await db.execute(stmt)
+
+
+async def lock_for_write(db: AsyncSession):
+    """
+    On SQLite, take the database write lock before a read-modify-write.
+
+    SQLite ignores FOR UPDATE and only locks the database at the first
+    write, so two transactions could read the same rows and then overwrite
+    each other's changes. BEGIN IMMEDIATE takes the write lock up front,
+    waiting for other writers to finish. On PostgreSQL this is a no-op and
+    the caller's FOR UPDATE row locks do the job.
+    """
+    if db.bind.dialect.name != "sqlite":
+        return
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    if not raw.driver_connection.in_transaction:
+        await connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+async def get_db():
     """Dependency for FastAPI to get database session."""
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
+
+_ws_sessions = asyncio.Semaphore(WS_DB_SESSIONS)
+
+
+@asynccontextmanager
+async def ws_session():
+    """
+    Database session for WebSocket handlers.
+
+    At most WS_DB_SESSIONS are open at once per worker, so a burst of
+    WebSocket traffic queues here instead of draining the pool.
+    """
+    start = time.perf_counter()
+    async with _ws_sessions:
+        ws_session_wait_seconds.observe(time.perf_counter() - start)
+        async with AsyncSessionLocal() as db:
+            yield db
+
+
+async def check_liveness():
+    """
+    Run SELECT 1 every DB_LIVENESS_INTERVAL seconds.
+
+    On failure the pool is disposed, so connections to a restarted
+    database are replaced instead of failing requests one by one.
+    """
+    while True:
+        await asyncio.sleep(DB_LIVENESS_INTERVAL)
+        try:
+            async with async_engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+            db_up.set(1)
+        except Exception:
+            logger.warning("Database liveness check failed; disposing the connection pool", exc_info=True)
+            db_up.set(0)
+            await async_engine.dispose()
+
+
+def _pool_stats() -> dict:
+    pool = async_engine.pool
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return {}
+    return {
+        ("size",): pool.size(),
+        ("checked_out",): pool.checkedout(),
+        ("checked_in",): pool.checkedin(),
+        ("overflow",): max(0, pool.overflow()),
+    }
+
+
+Gauge("themis_db_pool_connections", "Async pool connections by state (size is the configured base size)",
+      ("state",), callback=_pool_stats)
@@ -0,0 +1,166 @@
+"""Background deletion of polls.
+
+Deleting a large poll row by row through the ORM cascade loads every
+child row into memory inside the request. Instead, DELETE /polls/{id}
+only marks the poll deleted (Poll.deleted_at), which hides it from every
+read and write at once, broadcasts poll_deleted and returns. A background
+task then deletes the poll's rows with bulk DELETEs of DELETE_BATCH_SIZE
+rows, committing after each one, and finally the poll row itself.
+
+Each poll is claimed (Poll.purge_claimed_at) before its rows are deleted,
+so only one worker cleans it up, and the claim is renewed with every
+batch. Polls whose cleanup was interrupted are picked up again when a
+worker starts and every DELETE_CLAIM_TIMEOUT seconds after, once their
+claim has lapsed; a worker shutting down releases its claims at once.
+
+Settings:
+- DELETE_BATCH_SIZE: rows deleted per statement
+- DELETE_CLAIM_TIMEOUT: seconds after which an unrenewed claim lapses
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import delete, or_, select, update
+
+from app.database import AsyncSessionLocal
+from app.metrics import Counter
+from app.models import Option, OptionResult, OptionScore, Participant, Poll, PollArchive, Vote
+
+logger = logging.getLogger(__name__)
+
+DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", "1000"))
+DELETE_CLAIM_TIMEOUT = float(os.getenv("DELETE_CLAIM_TIMEOUT", "300"))
+
+# Tables holding a poll's rows, children before parents
+POLL_TABLES = (Vote, OptionScore, Participant, Option, OptionResult, PollArchive)
+
+deleted_polls = Counter("themis_deleted_polls_total", "Polls whose rows were deleted in the background")
+
+# Cleanup tasks running on this worker -> their poll IDs, kept referenced until they finish
+_tasks: Dict[asyncio.Task, str] = {}
+
+
+async def delete_in_batches(db, table, poll_id: str, batch_size: int,
+                            on_batch: Optional[Callable[[], Awaitable[None]]] = None) -> int:
+    """
+    Delete a poll's rows from one table, batch_size rows per committed statement.
+
+    on_batch, if given, is awaited in each batch's transaction before it commits.
+    """
+    # A column unique on its own (option_results is keyed by poll_id, option_id)
+    key = table.__mapper__.primary_key[-1]
+    total = 0
+    while True:
+        batch = select(key).where(table.poll_id == poll_id).limit(batch_size)
+        deleted = (await db.execute(delete(table).where(key.in_(batch)))).rowcount
+        if on_batch is not None:
+            await on_batch()
+        await db.commit()
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+async def claim_purge(db, poll_id: str) -> bool:
+    """
+    Claim a poll marked deleted for cleanup by this worker, and commit.
+
+    Returns False if the poll is gone or another worker's claim on it has
+    not lapsed.
+    """
+    now = datetime.utcnow()
+    claimed = await db.execute(
+        update(Poll)
+        .where(Poll.id == poll_id, Poll.deleted_at.is_not(None), or_(
+            Poll.purge_claimed_at.is_(None),
+            Poll.purge_claimed_at < now - timedelta(seconds=DELETE_CLAIM_TIMEOUT),
+        ))
+        .values(purge_claimed_at=now)
+    )
+    await db.commit()
+    return bool(claimed.rowcount)
+
+
+async def purge_deleted_poll(poll_id: str) -> bool:
+    """
+    Delete every row of a poll marked deleted, then the poll itself.
+
+    Returns False (and deletes nothing) if another worker is doing it.
+    """
+    async with AsyncSessionLocal() as db:
+        if not await claim_purge(db, poll_id):
+            return False
+
+        async def renew_claim():
+            await db.execute(update(Poll).where(Poll.id == poll_id).values(purge_claimed_at=datetime.utcnow()))
+
+        for table in POLL_TABLES:
+            await delete_in_batches(db, table, poll_id, DELETE_BATCH_SIZE, on_batch=renew_claim)
+        await db.execute(delete(Poll).where(Poll.id == poll_id, Poll.deleted_at.is_not(None)))
+        await db.commit()
+    deleted_polls.inc()
+    return True
+
+
+async def _purge(poll_id: str):
+    try:
+        await purge_deleted_poll(poll_id)
+    except Exception:
+        logger.exception("Deleting poll %s failed; it is retried when a worker starts", poll_id)
+
+
+def schedule_purge(poll_id: str):
+    """Delete a poll marked deleted in the background."""
+    task = asyncio.create_task(_purge(poll_id))
+    _tasks[task] = poll_id
+    task.add_done_callback(lambda task: _tasks.pop(task, None))
+
+
+async def stop_purges():
+    """
+    Cancel this worker's cleanup tasks and wait for them.
+
+    Their claims are released, so the next worker to start resumes the
+    polls at once.
+    """
+    tasks = dict(_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if not tasks:
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Poll)
+                .where(Poll.id.in_(list(tasks.values())), Poll.deleted_at.is_not(None))
+                .values(purge_claimed_at=None)
+            )
+            await db.commit()
+    except Exception:
+        logger.exception("Releasing cleanup claims failed; they lapse after DELETE_CLAIM_TIMEOUT")
+
+
+async def resume_purges():
+    """Finish deleting polls whose cleanup was interrupted and is not claimed."""
+    lapsed = datetime.utcnow() - timedelta(seconds=DELETE_CLAIM_TIMEOUT)
+    async with AsyncSessionLocal() as db:
+        poll_ids = list((await db.scalars(select(Poll.id).where(
+            Poll.deleted_at.is_not(None),
+            or_(Poll.purge_claimed_at.is_(None), Poll.purge_claimed_at < lapsed),
+        ))).all())
+    for poll_id in poll_ids:
+        await _purge(poll_id)
+
+
+async def run_purger():
+    """Resume interrupted cleanups now and every DELETE_CLAIM_TIMEOUT seconds."""
+    while True:
+        try:
+            await resume_purges()
+        except Exception:
+            logger.exception("Resuming poll cleanups failed")
+        await asyncio.sleep(DELETE_CLAIM_TIMEOUT)
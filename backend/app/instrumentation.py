@@ -0,0 +1,154 @@
+"""Per-request SQL query counting and timing.
+
+A SQLAlchemy event hook on the engines counts every statement and its
+duration against the unit of work active in the current context: an HTTP
+request (QueryStatsMiddleware) or a WebSocket message (track()). Each
+finished unit records its query count, DB time and handler time in
+/metrics, and can report them in a Server-Timing header.
+
+Settings:
+- SERVER_TIMING=1 adds Server-Timing headers to HTTP responses
+- QUERY_DEBUG=1 logs every unit that runs more than QUERY_BUDGET
+  statements, with the statements it ran
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+
+from app.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+QUERY_DEBUG = os.getenv("QUERY_DEBUG", "0") == "1"
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "10"))
+
+request_queries = Histogram(
+    "themis_request_queries", "SQL statements per request or WebSocket message", ("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+request_db_seconds = Histogram(
+    "themis_request_db_seconds", "Time spent in SQL per request or WebSocket message", ("route",),
+)
+request_seconds = Histogram(
+    "themis_request_seconds", "Handler time per request or WebSocket message", ("route",),
+)
+
+
+class QueryStats:
+    """Statements run by one request or WebSocket message."""
+
+    __slots__ = ("route", "queries", "db_time", "statements", "started")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements: List[str] = []
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        return (f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries", '
+                f"app;dur={self.elapsed * 1000:.1f}")
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+        if QUERY_DEBUG:
+            stats.statements.append(statement)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine):
+    """Count and time every statement run on a (sync) engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def finish(stats: QueryStats):
+    """Record a finished unit of work and log it if it blew the query budget."""
+    request_queries.observe(stats.queries, route=stats.route)
+    request_db_seconds.observe(stats.db_time, route=stats.route)
+    request_seconds.observe(stats.elapsed, route=stats.route)
+    if QUERY_DEBUG and stats.queries > QUERY_BUDGET:
+        logger.warning(
+            "%s ran %d queries (budget %d) in %.1f ms of DB time:\n%s",
+            stats.route, stats.queries, QUERY_BUDGET, stats.db_time * 1000,
+            "\n".join(stats.statements),
+        )
+
+
+@contextmanager
+def track(route: str):
+    """Count the statements run inside the block, e.g. for a WebSocket message."""
+    stats = QueryStats(route)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        finish(stats)
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware counting SQL statements per HTTP request.
+
+    Requests are labelled by route template (e.g. "GET /polls/{poll_id}"),
+    which is only known once routing has run, so the label is read after
+    the handler returns.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats("unmatched")
+        token = _current.set(stats)
+
+        async def send_with_timing(message):
+            if SERVER_TIMING and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                stats.route = f"{scope['method']} {route.path}"
+            finish(stats)
@@ -1,14 +1,18 @@
 """FastAPI application entry point."""
+import asyncio
 import os
 import json
-from fastapi import FastAPI, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from contextlib import asynccontextmanager
+from typing import Literal, Optional, Tuple
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, insert, select, update
+from datetime import datetime, timedelta
 
-from app.database import get_db, engine, Base
-from app.models import User, Poll, Participant, Option, Vote
+from app.database import DB_LIVENESS_INTERVAL, get_db, engine, Base, AsyncSessionLocal, check_liveness, lock_for_write, upsert, ws_session
+from app.models import User, Poll, Participant, Option, OptionScore, Vote, generate_ulid
 from app.schemas import (
     UserCreate, UserResponse,
     PollCreate, PollResponse,
@@ -17,12 +21,45 @@ from app.schemas import (
     VoteRequest, VoteResponse,
     ReadyRequest, ReadyResponse,
     StatusResponse, RevealResponse,
-    ClonePollRequest,
+    OptionResultResponse, ResultsResponse,
+    ClonePollRequest, ClonePollsRequest,
+    ImportResponse,
 )
-from app.scoring import compute_winner
-from app.websocket import manager, global_manager
+from app.deletion import run_purger, schedule_purge, stop_purges
+from app.bulk import InvalidImport, format_results, import_records, read_records, result_rows
+from app.archive import ARCHIVE_AFTER_DAYS, archived_option, load_archive, run_archiver
+from app.results import stored_results
+from app.reveal import reveal_poll
+from app.scoring import empty_accumulator, new_accumulator, update_accumulators
+from app.counters import adjust_counts, bump_list_version, list_version, poll_version, set_ready
+from app.cache import MISSING, options_cache, results_cache, status_cache
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, fetch_page, poll_query
+from app import metrics
+from app.instrumentation import QueryStatsMiddleware, track
+from app.websocket import manager, global_manager, start_broadcast, stop_broadcast
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Connect to the broadcast backend and run background jobs for the lifetime of the worker."""
+    await start_broadcast()
+    tasks = []
+    if DB_LIVENESS_INTERVAL > 0:
+        tasks.append(asyncio.create_task(check_liveness()))
+    if ARCHIVE_AFTER_DAYS > 0:
+        tasks.append(asyncio.create_task(run_archiver()))
+    tasks.append(asyncio.create_task(run_purger()))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await stop_purges()
+        await stop_broadcast()
 
-app = FastAPI(title="Themis API")
+
+app = FastAPI(title="Themis API", lifespan=lifespan)
 
 # CORS configuration
 allowed_origins = [origin.strip() for origin in os.getenv("ALLOWED_ORIGINS", "http://localhost:5173").split(",")]
@@ -32,7 +69,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
+app.add_middleware(QueryStatsMiddleware)
+
+# Polls read per query while streaming an export
+EXPORT_BATCH_SIZE = 1000
 
 
 @app.get("/healthz")
@@ -41,40 +83,229 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus metrics for this worker."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/users", response_model=UserResponse)
-async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Create a new user."""
     user = User(name=user_data.name)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return UserResponse(userId=user.id, name=user.name)
 
 
-@app.get("/polls", response_model=list[PollResponse])
-async def list_polls(db: Session = Depends(get_db)):
-    """List all polls."""
-    polls = db.query(Poll).order_by(Poll.created_at.desc()).all()
-    return [
-        PollResponse(
-            pollId=poll.id,
-            title=poll.title,
-            created_at=poll.created_at.isoformat(),
-            winner_id=poll.winner_id,
-            creator_id=poll.creator_id,
-            princess_mode=poll.princess_mode
+def _etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match already names this ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _conditional(request: Request, response: Response, version: int) -> Optional[Response]:
+    """
+    Tag a response with its version, or return a 304 if the client has it.
+
+    Clients must revalidate every time, so browsers send If-None-Match
+    instead of serving a stale copy.
+    """
+    etag = _etag(version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+async def _versioned_read(request: Request, response: Response, cache, poll_id: str,
+                          db: AsyncSession, load):
+    """
+    Serve a cached (version, body) poll read with ETag support.
+
+    A conditional request that misses the cache checks only the poll's
+    version before loading the body. Returns a 304 response, the body, or
+    None if the poll does not exist.
+    """
+    entry = cache.get(poll_id)
+    if entry is MISSING:
+        if request.headers.get("if-none-match"):
+            version = await poll_version(db, poll_id)
+            if version is not None and _not_modified(request, _etag(version)):
+                return _conditional(request, response, version)
+        entry = await cache.load(poll_id, load)
+    if entry is None:
+        return None
+    version, body = entry
+    return _conditional(request, response, version) or body
+
+
+async def _get_poll(db: AsyncSession, poll_id: str, lock: bool = False) -> Optional[Poll]:
+    """
+    Load a poll, or None if it does not exist or is being deleted.
+
+    With lock=True the poll row is share-locked until the transaction
+    ends, for writes adding rows under the poll: a concurrent DELETE waits
+    for them, and a write after it sees deleted_at, so the background
+    purge never misses a row.
+    """
+    if not lock:
+        poll = await db.get(Poll, poll_id)
+    else:
+        await lock_for_write(db)
+        poll = await db.scalar(
+            select(Poll).where(Poll.id == poll_id).with_for_update(read=True)
+            .execution_options(populate_existing=True)
         )
-        for poll in polls
-    ]
+    return poll if poll is not None and poll.deleted_at is None else None
+
+
+def _poll_response(poll: Poll) -> PollResponse:
+    return PollResponse(
+        pollId=poll.id,
+        title=poll.title,
+        created_at=poll.created_at.isoformat(),
+        winner_id=poll.winner_id,
+        creator_id=poll.creator_id,
+        princess_mode=poll.princess_mode
+    )
+
+
+@app.get("/polls", response_model=list[PollResponse])
+async def list_polls(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[Literal["open", "revealed"]] = None,
+    creator_id: Optional[str] = None,
+    princess_mode: Optional[bool] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    List polls, newest first, one page at a time.
+
+    When more polls follow, the X-Next-Cursor header holds the cursor to
+    pass back for the next page. The ETag is the poll list version.
+    """
+    # Read the version first: the page can only be newer than it
+    not_modified = _conditional(request, response, await list_version(db))
+    if not_modified:
+        return not_modified
+    query = poll_query(status, creator_id, princess_mode)
+    try:
+        polls, next_cursor = await fetch_page(db, query, cursor, limit)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [_poll_response(poll) for poll in polls]
+
+
+@app.get("/polls/export")
+async def export_polls(
+    status: Optional[Literal["open", "revealed"]] = None,
+    creator_id: Optional[str] = None,
+    princess_mode: Optional[bool] = None,
+):
+    """Stream every matching poll as newline-delimited JSON."""
+    query = poll_query(status, creator_id, princess_mode)
+
+    async def rows():
+        cursor = None
+        while True:
+            # A short session per batch, so the export never pins a connection
+            async with AsyncSessionLocal() as db:
+                polls, cursor = await fetch_page(db, query, cursor, EXPORT_BATCH_SIZE)
+            for poll in polls:
+                yield _poll_response(poll).model_dump_json() + "\n"
+            if cursor is None:
+                return
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+
+@app.get("/polls/results/export")
+async def export_results(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    creator_id: Optional[str] = None,
+    princess_mode: Optional[bool] = None,
+):
+    """
+    Stream the results of every matching revealed poll, one row per option.
+
+    Each row has the option's stored rank, score, variance, median, raters
+    and veto flag (see app.bulk.RESULT_COLUMNS), best option first.
+    """
+    query = poll_query("revealed", creator_id, princess_mode)
+
+    async def rows():
+        cursor = None
+        header = True
+        while True:
+            # A short session per batch, so the export never pins a connection
+            async with AsyncSessionLocal() as db:
+                polls, cursor = await fetch_page(db, query, cursor, EXPORT_BATCH_SIZE)
+                results = await result_rows(db, polls)
+            yield format_results(results, format, header)
+            header = False
+            if cursor is None:
+                return
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(rows(), media_type=media_type)
+
+
+@app.post("/polls/import", response_model=ImportResponse)
+async def import_polls(request: Request, format: Optional[Literal["ndjson", "csv"]] = None,
+                       db: AsyncSession = Depends(get_db)):
+    """
+    Create polls and add options from a streamed CSV or NDJSON body.
+
+    The format comes from ?format= or the Content-Type (text/csv for CSV,
+    NDJSON otherwise); see app.bulk for the record fields. Each poll that
+    received options gets one options_added and one ready_counts event.
+    """
+    if format is None:
+        format = "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+    try:
+        result = await import_records(db, read_records(request.stream(), format))
+    except InvalidImport as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if result.created:
+        await bump_list_version(db)
+    await db.commit()
+    
+    for poll_id, options in result.added.items():
+        await manager.send_options_added(poll_id, options)
+        counts = result.counts[poll_id]
+        await manager.send_ready_counts(poll_id, counts.ready, counts.participants)
+    if result.created:
+        await global_manager.send_polls_created([
+            PollResponse(pollId=row["id"], title=row["title"], created_at=row["created_at"].isoformat(),
+                         creator_id=row["creator_id"], princess_mode=row["princess_mode"]).model_dump()
+            for row in result.created.values()
+        ])
+    
+    return ImportResponse(polls={key: row["id"] for key, row in result.created.items()}, options=result.options)
 
 
 @app.post("/polls", response_model=PollResponse)
-async def create_poll(poll_data: PollCreate, db: Session = Depends(get_db)):
+async def create_poll(poll_data: PollCreate, db: AsyncSession = Depends(get_db)):
     """Create a new poll."""
     # Validate creator_id if provided
     creator_id = poll_data.creator_id
     if creator_id:
-        user = db.query(User).filter(User.id == creator_id).first()
+        user = await db.get(User, creator_id)
         if not user:
             raise HTTPException(status_code=404, detail="Creator user not found")
     
@@ -84,8 +315,10 @@ async def create_poll(poll_data: PollCreate, db: Session = Depends(get_db)):
         princess_mode=poll_data.princess_mode
     )
     db.add(poll)
-    db.commit()
-    db.refresh(poll)
+    await db.flush()
+    await bump_list_version(db)
+    await db.commit()
+    await db.refresh(poll)
     
     # Broadcast poll created event to all home screen connections
     await global_manager.send_poll_created(
@@ -107,23 +340,25 @@ async def create_poll(poll_data: PollCreate, db: Session = Depends(get_db)):
 
 
 @app.post("/polls/{poll_id}/join", response_model=JoinPollResponse)
-async def join_poll(poll_id: str, request: JoinPollRequest, db: Session = Depends(get_db)):
+async def join_poll(poll_id: str, request: JoinPollRequest, db: AsyncSession = Depends(get_db)):
     """Join a poll as a participant."""
     # Check if poll exists
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
+    poll = await _get_poll(db, poll_id, lock=True)
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
+    if poll.archived_at:
+        raise HTTPException(status_code=409, detail="Poll is archived")
     
     # Check if user exists
-    user = db.query(User).filter(User.id == request.userId).first()
+    user = await db.get(User, request.userId)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Check if already a participant
-    existing = db.query(Participant).filter(
+    existing = await db.scalar(select(Participant).where(
         Participant.poll_id == poll_id,
         Participant.user_id == request.userId
-    ).first()
+    ))
     
     if existing:
         return JoinPollResponse(participantId=existing.id)
@@ -131,75 +366,94 @@ async def join_poll(poll_id: str, request: JoinPollRequest, db: Session = Depend
     # Create new participant
     participant = Participant(poll_id=poll_id, user_id=request.userId, ready=False)
     db.add(participant)
-    db.commit()
-    db.refresh(participant)
+    await db.flush()
+    counts = await adjust_counts(db, poll_id, participants=1)
+    await db.commit()
     
     # Broadcast participant joined
-    participant_count = db.query(func.count(Participant.id)).filter(
-        Participant.poll_id == poll_id
-    ).scalar()
-    await manager.send_participant_joined(poll_id, participant_count)
+    await manager.send_participant_joined(poll_id, counts.participants)
     
     return JoinPollResponse(participantId=participant.id)
 
 
+async def load_options(poll_id: str, db: AsyncSession) -> Optional[Tuple[int, list[OptionResponse]]]:
+    """Load a poll's (version, ordered options), or None if the poll does not exist."""
+    # Read the version first: the options can only be newer than it
+    row = (await db.execute(
+        select(Poll.version, Poll.archived_at).where(Poll.id == poll_id, Poll.deleted_at.is_(None))
+    )).first()
+    if row is None:
+        return None
+    version, archived_at = row
+    if archived_at:
+        archive = await load_archive(db, poll_id)
+        return version, [OptionResponse(id=opt["id"], label=opt["label"]) for opt in archive["options"]]
+    options = (await db.scalars(select(Option).where(Option.poll_id == poll_id).order_by(Option.created_at))).all()
+    return version, [OptionResponse(id=opt.id, label=opt.label) for opt in options]
+
+
 @app.get("/polls/{poll_id}/options", response_model=list[OptionResponse])
-async def list_options(poll_id: str, db: Session = Depends(get_db)):
+async def list_options(poll_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """List all options for a poll."""
-    options = db.query(Option).filter(Option.poll_id == poll_id).order_by(Option.created_at).all()
-    return [OptionResponse(id=opt.id, label=opt.label) for opt in options]
+    result = await _versioned_read(request, response, options_cache, poll_id, db, lambda: load_options(poll_id, db))
+    return [] if result is None else result
 
 
 @app.post("/polls/{poll_id}/options", response_model=OptionResponse)
-async def create_option(poll_id: str, option_data: OptionCreate, db: Session = Depends(get_db)):
+async def create_option(poll_id: str, option_data: OptionCreate, db: AsyncSession = Depends(get_db)):
     """Add an option to a poll."""
     # Check if poll exists
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
+    poll = await _get_poll(db, poll_id, lock=True)
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
+    if poll.archived_at:
+        raise HTTPException(status_code=409, detail="Poll is archived")
     
-    option = Option(poll_id=poll_id, label=option_data.label)
+    option = Option(id=generate_ulid(), poll_id=poll_id, label=option_data.label)
     db.add(option)
+    db.add(new_accumulator(poll_id, option.id))
     
     # Reset all participants' ready status when option is added
-    db.query(Participant).filter(
-        Participant.poll_id == poll_id
-    ).update({Participant.ready: False})
+    await db.execute(
+        update(Participant)
+        .where(Participant.poll_id == poll_id)
+        .values(ready=False)
+    )
+    await db.flush()
+    counts = await adjust_counts(db, poll_id, options=1, reset_ready=True)
     
-    db.commit()
-    db.refresh(option)
+    await db.commit()
     
     # Broadcast option added
     await manager.send_option_added(poll_id, option.id, option.label)
     
-    # Get updated ready counts and broadcast
-    ready_count = db.query(func.count(Participant.id)).filter(
-        Participant.poll_id == poll_id,
-        Participant.ready == True
-    ).scalar()
-    
-    total_participants = db.query(func.count(Participant.id)).filter(
-        Participant.poll_id == poll_id
-    ).scalar()
-    
-    await manager.send_ready_counts(poll_id, ready_count, total_participants)
+    # Broadcast updated ready counts
+    await manager.send_ready_counts(poll_id, counts.ready, counts.participants)
     
     return OptionResponse(id=option.id, label=option.label)
 
 
-@app.put("/polls/{poll_id}/vote", response_model=VoteResponse)
-async def submit_vote(poll_id: str, vote_data: VoteRequest, db: Session = Depends(get_db)):
-    """Submit or update votes for a poll."""
+async def _write_ballot(db: AsyncSession, poll_id: str, vote_data: VoteRequest) -> Participant:
+    """
+    Validate a ballot and write it, without committing.
+
+    Returns the voter's participant row. Raises HTTPException for an
+    unknown or archived poll, a non-participant, princess mode or a bad
+    rating.
+    """
     # Check if poll exists
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
+    poll = await _get_poll(db, poll_id, lock=True)
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
+    if poll.archived_at:
+        raise HTTPException(status_code=409, detail="Poll is archived")
     
-    # Check if user is a participant
-    participant = db.query(Participant).filter(
+    # Check if user is a participant. Locking the row serializes this
+    # voter's ballots, so the current votes read below are not stale
+    participant = await db.scalar(select(Participant).where(
         Participant.poll_id == poll_id,
         Participant.user_id == vote_data.userId
-    ).first()
+    ).with_for_update())
     if not participant:
         raise HTTPException(status_code=403, detail="User not a participant")
     
@@ -212,229 +466,324 @@ async def submit_vote(poll_id: str, vote_data: VoteRequest, db: Session = Depend
         if entry.rating is not None and (entry.rating < 0 or entry.rating > 10):
             raise HTTPException(status_code=400, detail="Rating must be between 0 and 10")
     
-    # Process each vote entry
-    for entry in vote_data.entries:
-        # Check if option exists
-        option = db.query(Option).filter(
-            Option.id == entry.optionId,
-            Option.poll_id == poll_id
-        ).first()
-        if not option:
-            continue  # Skip invalid options
-        
-        # Find or create vote
-        vote = db.query(Vote).filter(
+    # Keep the last entry per option, as applying them in order would
+    entries = {entry.optionId: entry for entry in vote_data.entries}
+    
+    # Check every option and fetch this user's current votes in one query
+    current = (await db.execute(
+        select(Option.id, Vote.rating, Vote.veto, Vote.id)
+        .outerjoin(Vote, and_(
+            Vote.option_id == Option.id,
             Vote.poll_id == poll_id,
-            Vote.option_id == entry.optionId,
             Vote.user_id == vote_data.userId
-        ).first()
-        
-        if vote:
-            # Update existing vote
-            vote.rating = entry.rating if not entry.veto else None
-            vote.veto = entry.veto
-        else:
-            # Create new vote
-            vote = Vote(
-                poll_id=poll_id,
-                option_id=entry.optionId,
-                user_id=vote_data.userId,
-                rating=entry.rating if not entry.veto else None,
-                veto=entry.veto
-            )
-            db.add(vote)
+        ))
+        .where(Option.poll_id == poll_id, Option.id.in_(list(entries)))
+    )).all()
+    
+    # Write the whole ballot with one upsert, remembering what changed for the score accumulators
+    rows = []
+    changes = []
+    for option_id, old_rating, old_veto, old_vote_id in current:  # Invalid options are skipped
+        entry = entries[option_id]
+        rating = entry.rating if not entry.veto else None
+        rows.append({
+            "id": generate_ulid(),
+            "poll_id": poll_id,
+            "option_id": option_id,
+            "user_id": vote_data.userId,
+            "rating": rating,
+            "veto": entry.veto,
+        })
+        old_vote = (old_rating, old_veto) if old_vote_id is not None else None
+        changes.append((option_id, old_vote, (rating, entry.veto)))
+    
+    await upsert(
+        db, Vote, rows,
+        index_elements=["poll_id", "option_id", "user_id"],  # ix_votes_poll_option_user
+        update_columns=["rating", "veto"],
+    )
+    await db.run_sync(lambda session: update_accumulators(poll_id, changes, session))
+    return participant
+
+
+@app.put("/polls/{poll_id}/vote", response_model=VoteResponse)
+async def submit_vote(poll_id: str, vote_data: VoteRequest, db: AsyncSession = Depends(get_db)):
+    """Submit or update votes for a poll."""
+    participant = await _write_ballot(db, poll_id, vote_data)
     
     # Reset only this participant's ready status when votes change
-    participant.ready = False
-    
-    db.commit()
-    
-    # Get updated ready counts and broadcast
-    ready_count = db.query(func.count(Participant.id)).filter(
-        Participant.poll_id == poll_id,
-        Participant.ready == True
-    ).scalar()
+    ready_delta = await set_ready(db, participant.id, False)
+    counts = await adjust_counts(db, poll_id, ready=ready_delta)
     
-    total_participants = db.query(func.count(Participant.id)).filter(
-        Participant.poll_id == poll_id
-    ).scalar()
+    await db.commit()
     
-    await manager.send_ready_counts(poll_id, ready_count, total_participants)
+    # Broadcast updated ready counts
+    await manager.send_ready_counts(poll_id, counts.ready, counts.participants)
     
     return VoteResponse(ok=True)
 
 
 @app.post("/polls/{poll_id}/ready", response_model=ReadyResponse)
-async def mark_ready(poll_id: str, request: ReadyRequest, db: Session = Depends(get_db)):
+async def mark_ready(poll_id: str, request: ReadyRequest, db: AsyncSession = Depends(get_db)):
     """Mark a participant as ready."""
-    participant = db.query(Participant).filter(
+    participant = await db.scalar(select(Participant).join(Poll).where(
         Participant.poll_id == poll_id,
-        Participant.user_id == request.userId
-    ).first()
+        Participant.user_id == request.userId,
+        Poll.deleted_at.is_(None)
+    ))
     
     if not participant:
         raise HTTPException(status_code=404, detail="Participant not found")
     
-    participant.ready = True
-    db.commit()
-    
-    # Get counts
-    ready_count = db.query(func.count(Participant.id)).filter(
-        Participant.poll_id == poll_id,
-        Participant.ready == True
-    ).scalar()
-    
-    total_participants = db.query(func.count(Participant.id)).filter(
-        Participant.poll_id == poll_id
-    ).scalar()
+    ready_delta = await set_ready(db, participant.id, True)
+    counts = await adjust_counts(db, poll_id, ready=ready_delta)
+    await db.commit()
     
     # Broadcast ready counts
-    await manager.send_ready_counts(poll_id, ready_count, total_participants)
+    await manager.send_ready_counts(poll_id, counts.ready, counts.participants)
     
-    # Auto-reveal if all participants are ready
-    if ready_count >= total_participants and total_participants > 0:
-        poll = db.query(Poll).filter(Poll.id == poll_id).first()
-        if poll and not poll.winner_id:  # Only reveal once
-            winner_id = compute_winner(poll_id, db)
-            if winner_id:
-                poll.winner_id = winner_id
-                db.commit()
-                winner_option = db.query(Option).filter(Option.id == winner_id).first()
-                if winner_option:
-                    await manager.send_reveal(poll_id, winner_option.id, winner_option.label)
+    # Auto-reveal if all participants are ready; reveal_poll broadcasts it
+    if counts.ready >= counts.participants and counts.participants > 0:
+        await reveal_poll(poll_id)
     
-    return ReadyResponse(readyCount=ready_count, totalParticipants=total_participants)
+    return ReadyResponse(readyCount=counts.ready, totalParticipants=counts.participants)
 
 
-@app.get("/polls/{poll_id}/status", response_model=StatusResponse)
-async def get_status(poll_id: str, db: Session = Depends(get_db)):
-    """Get poll status."""
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
-    if not poll:
-        raise HTTPException(status_code=404, detail="Poll not found")
+@app.post("/polls/{poll_id}/submit", response_model=ReadyResponse)
+async def submit_and_ready(poll_id: str, vote_data: VoteRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Submit a ballot and mark the voter ready in one transaction.
+
+    Equivalent to PUT /vote followed by POST /ready, with one counter
+    update and one ready_counts broadcast, followed by the auto-reveal.
+    """
+    participant = await _write_ballot(db, poll_id, vote_data)
     
-    ready_count = db.query(func.count(Participant.id)).filter(
-        Participant.poll_id == poll_id,
-        Participant.ready == True
-    ).scalar()
+    ready_delta = await set_ready(db, participant.id, True)
+    counts = await adjust_counts(db, poll_id, ready=ready_delta)
+    await db.commit()
     
-    total_participants = db.query(func.count(Participant.id)).filter(
-        Participant.poll_id == poll_id
-    ).scalar()
+    # Broadcast ready counts
+    await manager.send_ready_counts(poll_id, counts.ready, counts.participants)
     
-    option_count = db.query(func.count(Option.id)).filter(
-        Option.poll_id == poll_id
-    ).scalar()
+    # Auto-reveal if all participants are ready; reveal_poll broadcasts it
+    if counts.ready >= counts.participants and counts.participants > 0:
+        await reveal_poll(poll_id)
     
-    winner = None
-    if poll.winner_id:
-        winner_option = db.query(Option).filter(Option.id == poll.winner_id).first()
+    return ReadyResponse(readyCount=counts.ready, totalParticipants=counts.participants)
+
+
+async def _load_winner(db: AsyncSession, poll: Poll) -> Optional[OptionResponse]:
+    """A revealed poll's winning option, from the archive once the poll is archived."""
+    if poll.winner_id and poll.archived_at:
+        winner_option = archived_option(await load_archive(db, poll.id), poll.winner_id)
         if winner_option:
-            winner = OptionResponse(id=winner_option.id, label=winner_option.label)
+            return OptionResponse(id=winner_option["id"], label=winner_option["label"])
+    elif poll.winner_id:
+        winner_option = await db.get(Option, poll.winner_id)
+        if winner_option:
+            return OptionResponse(id=winner_option.id, label=winner_option.label)
+    return None
+
+
+async def load_status(poll_id: str, db: AsyncSession) -> Optional[Tuple[int, StatusResponse]]:
+    """Build a poll's (version, status snapshot), or None if the poll does not exist."""
+    poll = await _get_poll(db, poll_id)
+    if not poll:
+        return None
     
-    return StatusResponse(
+    winner = await _load_winner(db, poll)
+    
+    return poll.version, StatusResponse(
         title=poll.title,
-        readyCount=ready_count,
-        totalParticipants=total_participants,
-        optionCount=option_count,
+        readyCount=poll.ready_count,
+        totalParticipants=poll.participant_count,
+        optionCount=poll.option_count,
         winner=winner,
         creator_id=poll.creator_id,
         princess_mode=poll.princess_mode
     )
 
 
+@app.get("/polls/{poll_id}/status", response_model=StatusResponse)
+async def get_status(poll_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    """Get poll status."""
+    status = await _versioned_read(request, response, status_cache, poll_id, db, lambda: load_status(poll_id, db))
+    if status is None:
+        raise HTTPException(status_code=404, detail="Poll not found")
+    return status
+
+
+async def load_results(poll_id: str, db: AsyncSession) -> Optional[Tuple[int, ResultsResponse]]:
+    """Load a poll's (version, stored results), or None if the poll does not exist."""
+    poll = await _get_poll(db, poll_id)
+    if not poll:
+        return None
+    rows = await stored_results(db, poll_id) if poll.winner_id else []
+    options = [
+        OptionResultResponse(id=row.option_id, label=row.label, rank=row.rank, score=row.score,
+                             variance=row.variance, median=row.median, num_raters=row.num_raters,
+                             vetoed=row.vetoed)
+        for row in rows
+    ]
+    winner = next((OptionResponse(id=row.id, label=row.label) for row in options if row.id == poll.winner_id), None)
+    if winner is None:
+        # Revealed before results were stored, and not backfilled yet
+        winner = await _load_winner(db, poll)
+    return poll.version, ResultsResponse(winner=winner, options=options)
+
+
+@app.get("/polls/{poll_id}/results", response_model=ResultsResponse)
+async def get_results(poll_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    """
+    Get the full ranking stored when the poll was revealed.
+
+    Options come best first, then vetoed and unrated options without a
+    rank. Empty until the poll is revealed.
+    """
+    results = await _versioned_read(request, response, results_cache, poll_id, db, lambda: load_results(poll_id, db))
+    if results is None:
+        raise HTTPException(status_code=404, detail="Poll not found")
+    return results
+
+
 @app.post("/polls/{poll_id}/reveal", response_model=RevealResponse)
-async def reveal_winner(poll_id: str, db: Session = Depends(get_db)):
+async def reveal_winner(poll_id: str, db: AsyncSession = Depends(get_db)):
     """Reveal the winner (only if all participants are ready)."""
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
+    poll = await _get_poll(db, poll_id)
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
     
     # Check if all participants are ready
-    total_participants = db.query(func.count(Participant.id)).filter(
-        Participant.poll_id == poll_id
-    ).scalar()
-    
-    ready_count = db.query(func.count(Participant.id)).filter(
-        Participant.poll_id == poll_id,
-        Participant.ready == True
-    ).scalar()
-    
-    if ready_count < total_participants or total_participants == 0:
+    if poll.ready_count < poll.participant_count or poll.participant_count == 0:
         raise HTTPException(status_code=400, detail="Not all participants are ready")
     
-    # Compute winner
-    winner_id = compute_winner(poll_id, db)
-    if not winner_id:
+    # Compute and store the winner once, or return the stored one
+    winner = await reveal_poll(poll_id)
+    if not winner:
         raise HTTPException(status_code=400, detail="Could not compute winner")
     
-    # Store winner
-    poll.winner_id = winner_id
-    db.commit()
-    
-    # Get winner option
-    winner_option = db.query(Option).filter(Option.id == winner_id).first()
-    if not winner_option:
-        raise HTTPException(status_code=500, detail="Winner option not found")
-    
-    # Broadcast reveal
-    await manager.send_reveal(poll_id, winner_option.id, winner_option.label)
-    
-    return RevealResponse(winner=OptionResponse(id=winner_option.id, label=winner_option.label))
+    return RevealResponse(winner=OptionResponse(id=winner.id, label=winner.label))
 
 
 @app.delete("/polls/{poll_id}")
-async def delete_poll(poll_id: str, db: Session = Depends(get_db)):
-    """Delete a poll."""
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
-    if not poll:
+async def delete_poll(poll_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    Delete a poll.
+
+    The poll is hidden and poll_deleted is broadcast at once; its rows are
+    deleted in the background by app.deletion.
+    """
+    hidden = await db.execute(
+        update(Poll)
+        .where(Poll.id == poll_id, Poll.deleted_at.is_(None))
+        .values(deleted_at=datetime.utcnow(), version=Poll.version + 1)
+    )
+    if not hidden.rowcount:
         raise HTTPException(status_code=404, detail="Poll not found")
-    
-    # Delete poll (cascade will handle related data)
-    db.delete(poll)
-    db.commit()
+    await bump_list_version(db)
+    await db.commit()
     
     # Broadcast poll deleted event
+    await manager.send_poll_deleted(poll_id)
     await global_manager.send_poll_deleted(poll_id)
+    schedule_purge(poll_id)
     
     return {"ok": True}
 
 
+async def _clone_polls(db: AsyncSession, originals: list[Poll], creator_id: Optional[str]) -> list[Poll]:
+    """
+    Clone polls with their options, without committing.
+
+    The source options are read with one query and the copies written with
+    one multi-row INSERT per table. Copies are stamped a microsecond apart
+    so they keep the source order, which is by created_at.
+    """
+    labels = {poll.id: [] for poll in originals}
+    live_ids = [poll.id for poll in originals if not poll.archived_at]
+    if live_ids:
+        rows = await db.execute(
+            select(Option.poll_id, Option.label).where(Option.poll_id.in_(live_ids)).order_by(Option.created_at)
+        )
+        for poll_id, label in rows:
+            labels[poll_id].append(label)
+    for poll in originals:
+        if poll.archived_at:
+            labels[poll.id] = [opt["label"] for opt in (await load_archive(db, poll.id))["options"]]
+    
+    now = datetime.utcnow()
+    tick = timedelta(microseconds=1)
+    new_polls = []
+    option_rows = []
+    for i, original in enumerate(originals):
+        new_poll = Poll(
+            id=generate_ulid(),
+            title=original.title,
+            creator_id=creator_id,
+            princess_mode=original.princess_mode,
+            created_at=now + i * tick,
+            option_count=len(labels[original.id]),
+        )
+        new_polls.append(new_poll)
+        option_rows.extend(
+            {"id": generate_ulid(), "poll_id": new_poll.id, "label": label, "created_at": now + j * tick}
+            for j, label in enumerate(labels[original.id])
+        )
+    db.add_all(new_polls)
+    await db.flush()
+    if option_rows:
+        await db.execute(insert(Option), option_rows)
+        await db.execute(insert(OptionScore), [empty_accumulator(row["poll_id"], row["id"]) for row in option_rows])
+    await bump_list_version(db)
+    return new_polls
+
+
+async def _check_creator(db: AsyncSession, creator_id: Optional[str]):
+    if creator_id:
+        user = await db.get(User, creator_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="Creator user not found")
+
+
+@app.post("/polls/clone", response_model=list[PollResponse])
+async def clone_polls(request: ClonePollsRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Clone several polls in one transaction.
+
+    New polls are returned in request order and announced with a single
+    polls_cloned event.
+    """
+    found = {poll.id: poll for poll in (await db.scalars(
+        select(Poll).where(Poll.id.in_(request.pollIds), Poll.deleted_at.is_(None))
+    )).all()}
+    missing = [poll_id for poll_id in request.pollIds if poll_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Poll not found: {', '.join(missing)}")
+    await _check_creator(db, request.creator_id)
+    
+    new_polls = await _clone_polls(db, [found[poll_id] for poll_id in request.pollIds], request.creator_id)
+    await db.commit()
+    
+    responses = [_poll_response(poll) for poll in new_polls]
+    if responses:
+        await global_manager.send_polls_cloned([response.model_dump() for response in responses])
+    return responses
+
+
 @app.post("/polls/{poll_id}/clone", response_model=PollResponse)
-async def clone_poll(poll_id: str, request: ClonePollRequest, db: Session = Depends(get_db)):
+async def clone_poll(poll_id: str, request: ClonePollRequest, db: AsyncSession = Depends(get_db)):
     """Clone a poll with its options."""
     # Get original poll
-    original_poll = db.query(Poll).filter(Poll.id == poll_id).first()
+    original_poll = await _get_poll(db, poll_id)
     if not original_poll:
         raise HTTPException(status_code=404, detail="Poll not found")
     
     # Validate creator_id if provided
-    creator_id = request.creator_id
-    if creator_id:
-        user = db.query(User).filter(User.id == creator_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="Creator user not found")
+    await _check_creator(db, request.creator_id)
     
-    # Create new poll
-    new_poll = Poll(
-        title=original_poll.title,
-        creator_id=creator_id,
-        princess_mode=original_poll.princess_mode
-    )
-    db.add(new_poll)
-    db.flush()  # Flush to get the new poll ID
-    
-    # Clone options
-    original_options = db.query(Option).filter(Option.poll_id == poll_id).order_by(Option.created_at).all()
-    for original_option in original_options:
-        new_option = Option(
-            poll_id=new_poll.id,
-            label=original_option.label
-        )
-        db.add(new_option)
-    
-    db.commit()
-    db.refresh(new_poll)
+    new_poll, = await _clone_polls(db, [original_poll], request.creator_id)
+    await db.commit()
     
     # Broadcast poll cloned event
     await global_manager.send_poll_cloned(
@@ -445,14 +794,7 @@ async def clone_poll(poll_id: str, request: ClonePollRequest, db: Session = Depe
         princess_mode=new_poll.princess_mode
     )
     
-    return PollResponse(
-        pollId=new_poll.id,
-        title=new_poll.title,
-        created_at=new_poll.created_at.isoformat(),
-        winner_id=new_poll.winner_id,
-        creator_id=new_poll.creator_id,
-        princess_mode=new_poll.princess_mode
-    )
+    return _poll_response(new_poll)
 
 
 @app.websocket("/ws/home")
@@ -471,10 +813,42 @@ async def websocket_home(websocket: WebSocket):
         global_manager.disconnect(websocket)
 
 
+async def load_snapshot(poll_id: str) -> Optional[dict]:
+    """Full poll state for a connecting socket, mostly from the caches."""
+    with track("WS snapshot"):
+        async with ws_session() as db:
+            status_entry = await status_cache.get_or_load(poll_id, lambda: load_status(poll_id, db))
+            if not status_entry:
+                return None
+            options_entry = await options_cache.get_or_load(poll_id, lambda: load_options(poll_id, db))
+    version, status = status_entry
+    options = options_entry[1] if options_entry else []
+    return {
+        "version": version,
+        "participants": status.totalParticipants,
+        "ready": status.readyCount,
+        "optionCount": status.optionCount,
+        "options": [option.model_dump() for option in options],
+        "winner": status.winner.model_dump() if status.winner else None,
+    }
+
+
 @app.websocket("/ws/polls/{poll_id}")
-async def websocket_endpoint(websocket: WebSocket, poll_id: str):
-    """WebSocket endpoint for real-time poll updates."""
-    await manager.connect(websocket, poll_id)
+async def websocket_endpoint(
+    websocket: WebSocket,
+    poll_id: str,
+    since: Optional[int] = None,
+    epoch: Optional[str] = None,
+    userId: Optional[str] = None,
+):
+    """
+    WebSocket endpoint for real-time poll updates.
+
+    The first message is a snapshot of the poll, unless the client resumes
+    with ?since=<seq>&epoch=<epoch> and only needs the events it missed.
+    Clients passing ?userId= are counted once per user in presence events.
+    """
+    await manager.connect(websocket, poll_id, lambda: load_snapshot(poll_id), since, epoch, userId)
     
     try:
         while True:
@@ -483,40 +857,22 @@ async def websocket_endpoint(websocket: WebSocket, poll_id: str):
             try:
                 message = json.loads(data)
                 if message.get("type") == "request_status":
-                    # Send status snapshot
-                    db = next(get_db())
-                    try:
-                        poll = db.query(Poll).filter(Poll.id == poll_id).first()
-                        if poll:
-                            ready_count = db.query(func.count(Participant.id)).filter(
-                                Participant.poll_id == poll_id,
-                                Participant.ready == True
-                            ).scalar()
-                            total_participants = db.query(func.count(Participant.id)).filter(
-                                Participant.poll_id == poll_id
-                            ).scalar()
-                            option_count = db.query(func.count(Option.id)).filter(
-                                Option.poll_id == poll_id
-                            ).scalar()
-                            
-                            await manager.send_status(websocket, {
-                                "participants": total_participants,
-                                "ready": ready_count,
-                                "optionCount": option_count,
-                            })
-                    finally:
-                        db.close()
+                    # Send status snapshot; the session only connects on a cache miss
+                    with track("WS request_status"):
+                        async with ws_session() as db:
+                            entry = await status_cache.get_or_load(poll_id, lambda: load_status(poll_id, db))
+                    if entry:
+                        _, status = entry
+                        await manager.send_status(websocket, poll_id, {
+                            "participants": status.totalParticipants,
+                            "ready": status.readyCount,
+                            "optionCount": status.optionCount,
+                        })
             except json.JSONDecodeError:
                 pass  # Ignore invalid JSON
     except WebSocketDisconnect:
+        pass
+    finally:
+        # Presence is announced in the next batch; no database access here
         manager.disconnect(websocket, poll_id)
-        # Broadcast participant left
-        db = next(get_db())
-        try:
-            participant_count = db.query(func.count(Participant.id)).filter(
-                Participant.poll_id == poll_id
-            ).scalar()
-            await manager.send_participant_left(poll_id, participant_count)
-        finally:
-            db.close()
 
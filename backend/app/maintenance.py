@@ -0,0 +1,127 @@
+"""Maintenance commands for derived data.
+
+Usage:
+    python -m app.maintenance check-scores [POLL_ID ...]
+    python -m app.maintenance rebuild-scores [POLL_ID ...]
+    python -m app.maintenance rebuild-counters [POLL_ID ...]
+    python -m app.maintenance archive-polls [POLL_ID ...]
+    python -m app.maintenance rebuild-results [POLL_ID ...]
+
+Without poll IDs, every poll is processed (archive-polls: every revealed
+poll older than ARCHIVE_AFTER_DAYS, which must be set; rebuild-results: every
+revealed poll that has not been archived).
+"""
+import argparse
+import asyncio
+import sys
+from typing import List
+
+from sqlalchemy import select
+
+from app.archive import ARCHIVE_AFTER_DAYS, archive_polls as archive_revealed_polls
+from app.counters import rebuild_counters as rebuild_poll_counters
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models import Poll
+from app.results import rebuild_results as rebuild_poll_results
+from app.scoring import check_accumulators, rebuild_accumulators
+
+
+def _poll_ids(db, poll_ids: List[str]) -> List[str]:
+    """Return the requested poll IDs, or every poll ID if none were given."""
+    if poll_ids:
+        return poll_ids
+    return list(db.execute(select(Poll.id).order_by(Poll.id)).scalars())
+
+
+def check_scores(poll_ids: List[str]) -> int:
+    """Report accumulators that disagree with a full recompute."""
+    failures = 0
+    db = SessionLocal()
+    try:
+        for poll_id in _poll_ids(db, poll_ids):
+            problems = check_accumulators(poll_id, db)
+            for problem in problems:
+                print(f"{poll_id} {problem}")
+            if problems:
+                failures += 1
+    finally:
+        db.close()
+    print(f"{failures} poll(s) with inconsistent score accumulators")
+    return 1 if failures else 0
+
+
+def rebuild_scores(poll_ids: List[str]) -> int:
+    """Rebuild accumulators from the votes table."""
+    db = SessionLocal()
+    try:
+        ids = _poll_ids(db, poll_ids)
+        for poll_id in ids:
+            rebuild_accumulators(poll_id, db)
+            db.commit()
+    finally:
+        db.close()
+    print(f"Rebuilt score accumulators for {len(ids)} poll(s)")
+    return 0
+
+
+def rebuild_counters(poll_ids: List[str]) -> int:
+    """Rebuild the denormalized poll counters from the base tables."""
+    db = SessionLocal()
+    try:
+        ids = _poll_ids(db, poll_ids)
+        rebuild_poll_counters(db, ids)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Rebuilt counters for {len(ids)} poll(s)")
+    return 0
+
+
+def archive_polls(poll_ids: List[str]) -> int:
+    """Compact revealed polls into the archive and delete their raw rows."""
+    if not poll_ids and ARCHIVE_AFTER_DAYS <= 0:
+        print("ARCHIVE_AFTER_DAYS is not set; pass poll IDs or set it to archive every due poll", file=sys.stderr)
+        return 1
+    archived = asyncio.run(archive_revealed_polls(poll_ids or None))
+    print(f"Archived {archived} poll(s)")
+    return 0
+
+
+def rebuild_results(poll_ids: List[str]) -> int:
+    """Recompute the stored ranking of revealed polls from their votes."""
+
+    async def rebuild() -> int:
+        rebuilt = 0
+        async with AsyncSessionLocal() as db:
+            ids = poll_ids or list((await db.scalars(
+                select(Poll.id).where(Poll.winner_id.is_not(None), Poll.archived_at.is_(None)).order_by(Poll.id)
+            )).all())
+            for poll_id in ids:
+                if await rebuild_poll_results(db, poll_id):
+                    await db.commit()
+                    rebuilt += 1
+        return rebuilt
+
+    print(f"Rebuilt results for {asyncio.run(rebuild())} poll(s)")
+    return 0
+
+
+COMMANDS = {
+    "check-scores": check_scores,
+    "rebuild-scores": rebuild_scores,
+    "rebuild-counters": rebuild_counters,
+    "archive-polls": archive_polls,
+    "rebuild-results": rebuild_results,
+}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.maintenance", description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("poll_ids", nargs="*", metavar="POLL_ID")
+    args = parser.parse_args(argv)
+    return COMMANDS[args.command](args.poll_ids)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
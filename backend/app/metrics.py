@@ -0,0 +1,119 @@
+"""Minimal Prometheus-style metrics.
+
+Metrics register themselves on creation and are rendered in the text
+exposition format by the /metrics endpoint.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+
+_registry: List["Metric"] = []
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric:
+    """Base class: a named metric with optional labels."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> List[Tuple[str, Tuple[str, ...], float]]:
+        """(suffix, label values, value) triples to render."""
+        return [("", key, value) for key, value in sorted(self.values.items())]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labels, key)} {value:g}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that can go up and down, set directly or read from a callback."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, help, labels)
+        self.callback = callback
+
+    def set(self, value: float, **labels: str):
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.callback is not None:
+            return [("", key, value) for key, value in sorted(self.callback().items())]
+        return super().samples()
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets, with sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> per-bucket counts (not cumulative), with +Inf last
+        self.counts: Dict[Tuple[str, ...], List[int]] = {}
+        self.sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = [0] * (len(self.buckets) + 1)
+            self.sums[key] = 0.0
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        counts[index] += 1
+        self.sums[key] += value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        bucket_labels = self.labels + ("le",)
+        for key, counts in sorted(self.counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels, key + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {self.sums[key]:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return "\n".join(lines)
+
+
+def render() -> str:
+    """Render every registered metric in the Prometheus text format."""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
@@ -1,6 +1,6 @@
 """Database models."""
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, DateTime, Index
+from sqlalchemy import Column, String, Integer, Float, Boolean, ForeignKey, DateTime, Index, JSON, LargeBinary
 from sqlalchemy.orm import relationship
 from ulid import ULID
 from app.database import Base
@@ -29,10 +29,41 @@ class Poll(Base):
     creator_id = Column(String, ForeignKey("users.id"), nullable=True)  # Poll creator
     princess_mode = Column(Boolean, default=False, nullable=False)  # Only creator can rate
 
+    # Denormalized counters, kept in step by app.counters in the same transaction
+    participant_count = Column(Integer, default=0, server_default="0", nullable=False)
+    ready_count = Column(Integer, default=0, server_default="0", nullable=False)
+    option_count = Column(Integer, default=0, server_default="0", nullable=False)
+    # Bumped on every change to options, participants, votes or winner; served as the ETag
+    version = Column(Integer, default=0, server_default="0", nullable=False)
+    # Set once app.archive has compacted the poll into a PollArchive row
+    archived_at = Column(DateTime, nullable=True)
+    # Set by DELETE /polls/{id}; the poll is hidden until app.deletion removes its rows
+    deleted_at = Column(DateTime, nullable=True)
+    # Set (and renewed) by the worker removing a deleted poll's rows, so only one does
+    purge_claimed_at = Column(DateTime, nullable=True)
+
     # Relationships
     participants = relationship("Participant", back_populates="poll", cascade="all, delete-orphan")
     options = relationship("Option", back_populates="poll", cascade="all, delete-orphan")
     votes = relationship("Vote", back_populates="poll", cascade="all, delete-orphan")
+    option_scores = relationship("OptionScore", cascade="all, delete-orphan")
+    archive = relationship("PollArchive", cascade="all, delete-orphan", uselist=False)
+
+    # Keyset pagination indexes for list_polls, newest first
+    __table_args__ = (
+        Index("ix_polls_created", "created_at", "id"),
+        Index("ix_polls_open_created", "created_at", "id",
+              postgresql_where=winner_id.is_(None), sqlite_where=winner_id.is_(None)),
+        Index("ix_polls_revealed_created", "created_at", "id",
+              postgresql_where=winner_id.is_not(None), sqlite_where=winner_id.is_not(None)),
+        Index("ix_polls_creator_created", "creator_id", "created_at", "id"),
+        # SQLite only uses a partial index whose WHERE matches the query's term
+        # as written, and princess_mode filters compile to "princess_mode = 1/0" there
+        Index("ix_polls_princess_created", "created_at", "id",
+              postgresql_where=princess_mode, sqlite_where=princess_mode == True),  # noqa: E712
+        Index("ix_polls_regular_created", "created_at", "id",
+              postgresql_where=~princess_mode, sqlite_where=princess_mode == False),  # noqa: E712
+    )
 
 
 class Participant(Base):
@@ -85,3 +116,54 @@ class Vote(Base):
         Index("ix_votes_poll_option_user", "poll_id", "option_id", "user_id", unique=True),
     )
 
+
+
+class OptionScore(Base):
+    """Running score aggregates for one option, updated as votes change."""
+    __tablename__ = "option_scores"
+
+    option_id = Column(String, ForeignKey("options.id"), primary_key=True)
+    poll_id = Column(String, ForeignKey("polls.id"), nullable=False)
+    num_raters = Column(Integer, default=0, nullable=False)
+    reciprocal_sum = Column(Float, default=0.0, nullable=False)
+    mean = Column(Float, default=0.0, nullable=False)  # Welford running mean
+    m2 = Column(Float, default=0.0, nullable=False)  # Welford sum of squared deviations
+    veto_count = Column(Integer, default=0, nullable=False)
+    histogram = Column(JSON, nullable=False)  # 11 counts, index == rating
+
+    __table_args__ = (
+        Index("ix_option_scores_poll", "poll_id"),
+    )
+
+
+class OptionResult(Base):
+    """Final score and rank of one option, stored when its poll is revealed."""
+    __tablename__ = "option_results"
+
+    # No foreign key to options: results outlive the option rows of archived polls
+    poll_id = Column(String, ForeignKey("polls.id"), primary_key=True)
+    option_id = Column(String, primary_key=True)
+    label = Column(String, nullable=False)
+    rank = Column(Integer, nullable=True)  # 1 is the winner; None if vetoed or unrated
+    score = Column(Float, nullable=True)
+    variance = Column(Float, nullable=True)
+    median = Column(Float, nullable=True)
+    num_raters = Column(Integer, nullable=True)
+    vetoed = Column(Boolean, default=False, nullable=False)
+
+
+class PollArchive(Base):
+    """Final options and aggregates of a revealed poll whose raw rows were deleted."""
+    __tablename__ = "poll_archives"
+
+    poll_id = Column(String, ForeignKey("polls.id"), primary_key=True)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    data = Column(LargeBinary, nullable=False)  # zlib-compressed JSON, see app.archive
+
+
+class VersionCounter(Base):
+    """Version of a collection without a row of its own, such as the poll list."""
+    __tablename__ = "version_counters"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,78 @@
+"""Keyset pagination over polls.
+
+Polls are listed newest first by (created_at, id). A page ends with an
+opaque cursor naming its last row; the next page starts strictly after it,
+so every page is an index range scan no matter how deep it is.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Select, select, tuple_
+
+from app.models import Poll
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+POLL_STATUSES = ("open", "revealed")
+
+
+class InvalidCursor(ValueError):
+    """The cursor was not produced by encode_cursor."""
+
+
+def encode_cursor(poll: Poll) -> str:
+    """Opaque cursor for the position just after a poll."""
+    raw = json.dumps([poll.created_at.isoformat(), poll.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Return the (created_at, id) a cursor points after."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, poll_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(poll_id)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def poll_query(
+    status: Optional[str] = None,
+    creator_id: Optional[str] = None,
+    princess_mode: Optional[bool] = None,
+) -> Select:
+    """Polls matching the filters, newest first, without polls being deleted."""
+    query = select(Poll).where(Poll.deleted_at.is_(None))
+    if status == "open":
+        query = query.where(Poll.winner_id.is_(None))
+    elif status == "revealed":
+        query = query.where(Poll.winner_id.is_not(None))
+    if creator_id is not None:
+        query = query.where(Poll.creator_id == creator_id)
+    if princess_mode is not None:
+        query = query.where(Poll.princess_mode == princess_mode)
+    return query.order_by(Poll.created_at.desc(), Poll.id.desc())
+
+
+def after(query: Select, cursor: Optional[str]) -> Select:
+    """Restrict a poll_query to rows after the cursor."""
+    if cursor is None:
+        return query
+    created_at, poll_id = decode_cursor(cursor)
+    return query.where(tuple_(Poll.created_at, Poll.id) < tuple_(created_at, poll_id))
+
+
+async def fetch_page(db, query: Select, cursor: Optional[str], limit: int) -> Tuple[List[Poll], Optional[str]]:
+    """
+    Return one page of polls and the cursor for the next page.
+
+    Fetches one extra row to tell whether another page exists, so the
+    last page returns no cursor.
+    """
+    polls = list((await db.scalars(after(query, cursor).limit(limit + 1))).all())
+    if len(polls) <= limit:
+        return polls, None
+    polls = polls[:limit]
+    return polls, encode_cursor(polls[-1])
@@ -0,0 +1,386 @@
+"""Pluggable pub/sub backends for cross-process WebSocket fan-out.
+
+Every event is published once to the backend, and every worker subscribed
+to it hands the event to its local connection managers. The backend is
+chosen by URL:
+
+- ``memory://``: in-process only (default, single worker)
+- ``postgresql://...``: PostgreSQL LISTEN/NOTIFY
+- ``redis://[:password@]host[:port]`` (or ``rediss://`` for TLS): any server
+  speaking the Redis protocol
+"""
+import asyncio
+import logging
+import secrets
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "themis_events"
+
+# NOTIFY payloads must be shorter than 8000 bytes; larger ones are split
+NOTIFY_MAX_BYTES = 7999
+# Starts a chunk header, "<mark><message id> <index> <count>\n"; never
+# the first character of a payload (events start with their target)
+CHUNK_MARK = "\x1f"
+# Room left for the chunk header in each notification
+CHUNK_HEADER_BYTES = 64
+# Partly received chunked payloads kept before the oldest is dropped
+MAX_PENDING_CHUNKS = 64
+
+MessageHandler = Callable[[str], Awaitable[None]]
+
+
+class BroadcastBackend:
+    """Base class: publish text payloads and deliver them to a handler."""
+
+    async def connect(self, on_message: MessageHandler):
+        """Start receiving payloads published by any worker."""
+        raise NotImplementedError
+
+    async def disconnect(self):
+        """Stop receiving payloads and release connections."""
+        raise NotImplementedError
+
+    async def publish(self, payload: str):
+        """Publish a payload to every subscribed worker, including this one."""
+        raise NotImplementedError
+
+
+class MemoryBackend(BroadcastBackend):
+    """Delivers payloads straight back to this process."""
+
+    def __init__(self):
+        self._on_message: Optional[MessageHandler] = None
+
+    async def connect(self, on_message: MessageHandler):
+        self._on_message = on_message
+
+    async def disconnect(self):
+        self._on_message = None
+
+    async def publish(self, payload: str):
+        if self._on_message is not None:
+            await self._on_message(payload)
+
+
+def split_payload(payload: str, limit: int) -> List[str]:
+    """Split a payload into pieces of at most limit UTF-8 bytes, never inside a character."""
+    data = payload.encode()
+    pieces = []
+    start = 0
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and data[end] & 0xC0 == 0x80:  # UTF-8 continuation byte
+            end -= 1
+        pieces.append(data[start:end].decode())
+        start = end
+    return pieces
+
+
+class PostgresBackend(BroadcastBackend):
+    """
+    PostgreSQL LISTEN/NOTIFY.
+
+    One connection listens, another publishes with pg_notify. A payload
+    too large for one NOTIFY (NOTIFY_MAX_BYTES) is split into numbered
+    chunks sent in one transaction, so listeners receive them together and
+    in order, and reassembled before delivery.
+
+    A supervisor task reopens the listening connection when it is lost
+    (reported by asyncpg, or found by a periodic health check), backing
+    off between attempts. A publish on a lost connection reconnects once
+    and retries.
+    """
+
+    reconnect_delay = 1.0
+    max_reconnect_delay = 30.0
+    # Seconds between pings of the listening connection
+    health_check_interval = 30.0
+
+    def __init__(self, url: str):
+        # asyncpg wants a plain libpq-style URL
+        _, rest = url.split("://", 1)
+        self.dsn = "postgresql://" + rest
+        self._listen_conn = None
+        self._publish_conn = None
+        self._publish_lock = asyncio.Lock()
+        self._supervisor: Optional[asyncio.Task] = None
+        self._listen_lost = asyncio.Event()
+        self._on_message: Optional[MessageHandler] = None
+        self._pending: Dict[str, List[Optional[str]]] = OrderedDict()  # message id -> chunks
+
+    async def connect(self, on_message: MessageHandler):
+        self._on_message = on_message
+        await self._listen()
+        self._publish_conn = await self._open()
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def _open(self):
+        import asyncpg
+
+        return await asyncpg.connect(self.dsn)
+
+    async def _listen(self):
+        """Open a connection and LISTEN on it."""
+        connection = await self._open()
+        self._listen_lost.clear()
+        connection.add_termination_listener(self._terminated)
+        await connection.add_listener(CHANNEL, self._notified)
+        self._listen_conn = connection
+
+    def _terminated(self, connection):
+        if connection is self._listen_conn:
+            self._listen_lost.set()
+
+    async def _supervise(self):
+        """Reopen the listening connection whenever it is lost."""
+        while True:
+            try:
+                await asyncio.wait_for(self._listen_lost.wait(), self.health_check_interval)
+            except asyncio.TimeoutError:
+                # A connection dropped without a FIN never reports termination
+                try:
+                    await asyncio.wait_for(self._listen_conn.execute("SELECT 1"), self.health_check_interval)
+                    continue
+                except Exception:
+                    pass
+            logger.warning("PostgreSQL LISTEN connection lost; reconnecting")
+            self._listen_conn.remove_termination_listener(self._terminated)
+            self._listen_conn.terminate()
+            # Chunks sent while nobody listened are gone; their payloads can never complete
+            self._pending.clear()
+            delay = self.reconnect_delay
+            while True:
+                await asyncio.sleep(delay)
+                try:
+                    await self._listen()
+                    break
+                except Exception:
+                    logger.warning("PostgreSQL reconnect failed; retrying in %.1fs", delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+            logger.info("PostgreSQL LISTEN connection restored")
+
+    def _notified(self, connection, pid, channel, payload):
+        if payload.startswith(CHUNK_MARK):
+            payload = self._reassemble(payload)
+            if payload is None:
+                return
+        asyncio.ensure_future(self._on_message(payload))
+
+    def _reassemble(self, chunk: str) -> Optional[str]:
+        """Store one chunk; return the whole payload once its last chunk arrives."""
+        header, data = chunk[len(CHUNK_MARK):].split("\n", 1)
+        message_id, index, count = header.split(" ")
+        chunks = self._pending.get(message_id)
+        if chunks is None:
+            chunks = self._pending[message_id] = [None] * int(count)
+            if len(self._pending) > MAX_PENDING_CHUNKS:
+                dropped, _ = self._pending.popitem(last=False)
+                logger.warning("Dropped incomplete chunked broadcast %s", dropped)
+        chunks[int(index)] = data
+        if any(part is None for part in chunks):
+            return None
+        del self._pending[message_id]
+        return "".join(chunks)
+
+    @staticmethod
+    def _notifications(payload: str) -> List[str]:
+        """The NOTIFY payloads carrying one published payload."""
+        if len(payload.encode()) <= NOTIFY_MAX_BYTES:
+            return [payload]
+        message_id = secrets.token_hex(8)
+        pieces = split_payload(payload, NOTIFY_MAX_BYTES - CHUNK_HEADER_BYTES)
+        return [
+            f"{CHUNK_MARK}{message_id} {index} {len(pieces)}\n{piece}"
+            for index, piece in enumerate(pieces)
+        ]
+
+    async def disconnect(self):
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            try:
+                await self._supervisor
+            except asyncio.CancelledError:
+                pass
+            self._supervisor = None
+        if self._listen_conn is not None:
+            self._listen_conn.remove_termination_listener(self._terminated)
+            if not self._listen_conn.is_closed():
+                await self._listen_conn.remove_listener(CHANNEL, self._notified)
+                await self._listen_conn.close()
+            self._listen_conn = None
+        if self._publish_conn is not None:
+            await self._publish_conn.close()
+            self._publish_conn = None
+
+    async def publish(self, payload: str):
+        import asyncpg
+
+        notifications = self._notifications(payload)
+        async with self._publish_lock:
+            try:
+                await self._notify(notifications)
+            except (asyncpg.ConnectionDoesNotExistError, asyncpg.InterfaceError, ConnectionError):
+                # Reconnect once and retry
+                logger.warning("PostgreSQL publish connection lost; reconnecting")
+                self._publish_conn.terminate()
+                self._publish_conn = await self._open()
+                await self._notify(notifications)
+
+    async def _notify(self, notifications: List[str]):
+        if len(notifications) == 1:
+            await self._publish_conn.execute("SELECT pg_notify($1, $2)", CHANNEL, notifications[0])
+            return
+        async with self._publish_conn.transaction():
+            for notification in notifications:
+                await self._publish_conn.execute("SELECT pg_notify($1, $2)", CHANNEL, notification)
+
+
+class RedisProtocolError(Exception):
+    """Error reply or malformed data from a Redis-protocol server."""
+
+
+class RedisBackend(BroadcastBackend):
+    """
+    Redis PUBLISH/SUBSCRIBE over a minimal RESP client.
+
+    Speaks the wire protocol directly, so it works against Redis, Valkey,
+    KeyDB or a fake server in tests without a client library.
+    """
+
+    reconnect_delay = 1.0
+
+    def __init__(self, url: str):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.ssl = parsed.scheme == "rediss"
+        self._publisher = None
+        self._publish_lock = asyncio.Lock()
+        self._listener: Optional[asyncio.Task] = None
+        self._on_message: Optional[MessageHandler] = None
+
+    async def connect(self, on_message: MessageHandler):
+        self._on_message = on_message
+        self._publisher = await self._open()
+        subscriber = await self._open()
+        await self._subscribe(subscriber)
+        self._listener = asyncio.create_task(self._listen(subscriber))
+
+    async def disconnect(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._publisher is not None:
+            self._publisher[1].close()
+            self._publisher = None
+
+    async def publish(self, payload: str):
+        async with self._publish_lock:
+            try:
+                await self._command(self._publisher, "PUBLISH", CHANNEL, payload)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # Reconnect once and retry
+                self._publisher = await self._open()
+                await self._command(self._publisher, "PUBLISH", CHANNEL, payload)
+
+    async def _open(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+        if self.password:
+            await self._command((reader, writer), "AUTH", self.password)
+        return reader, writer
+
+    async def _subscribe(self, connection):
+        reader, writer = connection
+        writer.write(_encode_command("SUBSCRIBE", CHANNEL))
+        await writer.drain()
+        reply = await _read_reply(reader)
+        if not isinstance(reply, list) or reply[:1] != [b"subscribe"]:
+            raise RedisProtocolError(f"Unexpected SUBSCRIBE reply: {reply!r}")
+
+    async def _listen(self, connection):
+        """Read pushed messages, reconnecting if the subscription drops."""
+        while True:
+            reader, writer = connection
+            try:
+                while True:
+                    reply = await _read_reply(reader)
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                        await self._on_message(reply[2].decode())
+            except asyncio.CancelledError:
+                writer.close()
+                raise
+            except Exception:
+                logger.exception("Redis subscription lost; reconnecting")
+                writer.close()
+            while True:
+                await asyncio.sleep(self.reconnect_delay)
+                try:
+                    connection = await self._open()
+                    await self._subscribe(connection)
+                    break
+                except (OSError, RedisProtocolError, asyncio.IncompleteReadError):
+                    logger.warning("Redis reconnect failed; retrying")
+
+    @staticmethod
+    async def _command(connection, *args: str):
+        reader, writer = connection
+        writer.write(_encode_command(*args))
+        await writer.drain()
+        return await _read_reply(reader)
+
+
+def _encode_command(*args: str) -> bytes:
+    """Encode a command as a RESP array of bulk strings."""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg.encode() if isinstance(arg, str) else arg
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader):
+    """Read one RESP reply."""
+    line = await reader.readuntil(b"\r\n")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body
+    if kind == b"-":
+        raise RedisProtocolError(body.decode())
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(body)
+        if length < 0:
+            return None
+        items: List = []
+        for _ in range(length):
+            items.append(await _read_reply(reader))
+        return items
+    raise RedisProtocolError(f"Unexpected reply: {line!r}")
+
+
+def create_backend(url: str) -> BroadcastBackend:
+    """Build the backend for a BROADCAST_URL."""
+    scheme = url.split("://", 1)[0].split("+", 1)[0]
+    if scheme == "memory":
+        return MemoryBackend()
+    if scheme in ("postgres", "postgresql"):
+        return PostgresBackend(url)
+    if scheme in ("redis", "rediss"):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported BROADCAST_URL scheme: {scheme}")
@@ -0,0 +1,90 @@
+"""Stored poll results.
+
+The reveal scores and ranks every option once and writes the ranking to
+option_results in the same transaction as the winner. GET
+/polls/{id}/results then serves that table instead of rescoring. Result
+rows carry the option label, so they outlive the option rows an archived
+poll loses.
+
+Polls revealed before the table existed get their results from the
+migration that added it, or from rebuild_results. Both rank the votes as
+they are now, which may have changed since the reveal, so the stored
+winner is always put first (see winner_first).
+"""
+from typing import List, Optional
+
+from sqlalchemy import delete, insert, select
+
+from app.models import Option, OptionResult, Poll
+from app.scoring import rank_results
+
+
+def winner_first(results: List[dict], winner_id: Optional[str]) -> List[dict]:
+    """
+    Rank a poll's stored winner first, moving the other ranked options down.
+
+    For rankings computed after the reveal, which may no longer agree with
+    the winner the poll announced.
+    """
+    winner = next((result for result in results if result["option_id"] == winner_id), None)
+    if winner is None or winner["rank"] == 1:
+        return results
+    others = [result for result in results if result is not winner]
+    ranked = [result for result in others if result["rank"] is not None]
+    for rank, result in enumerate(ranked, 2):
+        result["rank"] = rank
+    winner["rank"] = 1
+    return [winner] + ranked + [result for result in others if result["rank"] is None]
+
+
+async def store_results(db, poll_id: str, results: List[dict]):
+    """Write a poll's rank_results to option_results, without committing."""
+    if not results:
+        return
+    labels = dict((await db.execute(select(Option.id, Option.label).where(Option.poll_id == poll_id))).all())
+    await db.execute(insert(OptionResult), [
+        {
+            "poll_id": poll_id,
+            "option_id": result["option_id"],
+            "label": labels.get(result["option_id"], ""),
+            "rank": result["rank"],
+            "score": result["score"],
+            "variance": result["variance"],
+            "median": result["median"],
+            "num_raters": result["num_raters"],
+            "vetoed": result["vetoed"],
+        }
+        for result in results
+    ])
+
+
+async def rebuild_results(db, poll_id: str) -> bool:
+    """
+    Recompute and store the results of a revealed poll from its votes, without committing.
+
+    For polls revealed before results were stored. The stored winner is
+    ranked first whatever the votes say now. Returns False if the poll is
+    not revealed or its votes are gone (archived).
+    """
+    poll = await db.get(Poll, poll_id)
+    if poll is None or not poll.winner_id or poll.archived_at:
+        return False
+    results = winner_first(await db.run_sync(lambda session: rank_results(poll_id, session)), poll.winner_id)
+    await db.execute(delete(OptionResult).where(OptionResult.poll_id == poll_id))
+    await store_results(db, poll_id, results)
+    return True
+
+
+async def has_results(db, poll_id: str) -> bool:
+    return await db.scalar(select(OptionResult.option_id).where(OptionResult.poll_id == poll_id).limit(1)) is not None
+
+
+def result_order(row: OptionResult) -> tuple:
+    """Sort key putting ranked options first, best first, then vetoed and unrated ones."""
+    return row.rank is None, row.rank or 0, row.label
+
+
+async def stored_results(db, poll_id: str) -> List[OptionResult]:
+    """A poll's stored results, best first."""
+    rows = (await db.scalars(select(OptionResult).where(OptionResult.poll_id == poll_id))).all()
+    return sorted(rows, key=result_order)
@@ -0,0 +1,116 @@
+"""Single-flight reveal.
+
+Revealing a poll computes the winner, stores it and broadcasts it exactly
+once, however many requests ask at the same moment:
+
+- Within a worker, concurrent callers for the same poll share one
+  in-flight reveal and its result.
+- Across workers, the reveal transaction locks the poll row
+  (SELECT ... FOR UPDATE on PostgreSQL), so a second worker waits and then
+  finds the winner already stored. SQLite has no row locks; there the
+  winner is stored with a conditional UPDATE ... WHERE winner_id IS NULL,
+  and whoever loses that race returns the stored winner instead.
+
+Only the caller whose UPDATE stored the winner broadcasts the reveal. The
+same transaction stores the full ranking (see app.results).
+"""
+import asyncio
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import select, update
+
+from app.archive import archived_option, load_archive
+from app.counters import bump_list_version
+from app.database import AsyncSessionLocal
+from app.metrics import Counter
+from app.models import Option, Poll
+from app.results import store_results
+from app.scoring import rank_results
+from app.websocket import manager
+
+reveals = Counter(
+    "themis_reveals_total",
+    "Reveal attempts (revealed: winner stored; joined: shared an in-flight reveal; "
+    "already_revealed, not_ready, no_winner: nothing stored)",
+    ("result",),
+)
+
+
+class Winner(NamedTuple):
+    id: str
+    label: str
+
+
+# poll_id -> reveal in flight on this worker
+_in_flight: Dict[str, asyncio.Task] = {}
+
+
+async def reveal_poll(poll_id: str) -> Optional[Winner]:
+    """
+    Reveal a poll whose participants are all ready, or return its winner.
+
+    Returns None if the poll does not exist, is not ready or has no
+    winner. Callers that arrive while a reveal is running wait for it and
+    share its result.
+    """
+    task = _in_flight.get(poll_id)
+    if task is None:
+        task = asyncio.ensure_future(_reveal(poll_id))
+        _in_flight[poll_id] = task
+        task.add_done_callback(lambda _: _in_flight.pop(poll_id, None))
+    else:
+        reveals.inc(result="joined")
+    # A cancelled caller must not cancel the reveal other callers share
+    return await asyncio.shield(task)
+
+
+async def _reveal(poll_id: str) -> Optional[Winner]:
+    async with AsyncSessionLocal() as db:
+        poll = await db.scalar(select(Poll).where(Poll.id == poll_id, Poll.deleted_at.is_(None)).with_for_update())
+        if poll is None:
+            return None
+        if poll.winner_id:
+            reveals.inc(result="already_revealed")
+            return await _stored_winner(db, poll_id, poll.winner_id)
+        if poll.participant_count == 0 or poll.ready_count < poll.participant_count:
+            reveals.inc(result="not_ready")
+            return None
+
+        # Rank every option once; the ranking is stored with the winner
+        results = await db.run_sync(lambda session: rank_results(poll_id, session))
+        winner_id = results[0]["option_id"] if results and results[0]["rank"] == 1 else None
+        if not winner_id:
+            reveals.inc(result="no_winner")
+            return None
+
+        stored = await db.execute(
+            update(Poll)
+            .where(Poll.id == poll_id, Poll.winner_id.is_(None))
+            .values(winner_id=winner_id, version=Poll.version + 1)
+        )
+        if not stored.rowcount:
+            # Another process stored a winner first
+            await db.rollback()
+            reveals.inc(result="already_revealed")
+            return await _stored_winner(db, poll_id, await db.scalar(select(Poll.winner_id).where(Poll.id == poll_id)))
+        await store_results(db, poll_id, results)
+        await bump_list_version(db)
+        winner = await _stored_winner(db, poll_id, winner_id)
+        await db.commit()
+
+    reveals.inc(result="revealed")
+    if winner:
+        await manager.send_reveal(poll_id, winner.id, winner.label)
+    return winner
+
+
+async def _stored_winner(db, poll_id: str, winner_id: Optional[str]) -> Optional[Winner]:
+    if not winner_id:
+        return None
+    option = await db.get(Option, winner_id)
+    if option is None:
+        # The option rows of an archived poll are gone
+        archive = await load_archive(db, poll_id)
+        option = archived_option(archive, winner_id) if archive else None
+        return Winner(option["id"], option["label"]) if option else None
+    return Winner(option.id, option.label)
@@ -1,6 +1,6 @@
 """Pydantic schemas for request/response validation."""
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 class UserCreate(BaseModel):
@@ -91,6 +91,32 @@ class RevealResponse(BaseModel):
     winner: OptionResponse
 
 
+class OptionResultResponse(BaseModel):
+    id: str
+    label: str
+    rank: Optional[int] = None  # 1 is the winner; None if vetoed or unrated
+    score: Optional[float] = None
+    variance: Optional[float] = None
+    median: Optional[float] = None
+    num_raters: Optional[int] = None
+    vetoed: bool = False
+
+
+class ResultsResponse(BaseModel):
+    winner: Optional[OptionResponse] = None
+    options: List[OptionResultResponse]
+
+
 class ClonePollRequest(BaseModel):
     creator_id: Optional[str] = None
 
+
+class ClonePollsRequest(BaseModel):
+    pollIds: List[str]
+    creator_id: Optional[str] = None
+
+
+class ImportResponse(BaseModel):
+    polls: Dict[str, str]  # Import key -> ID of the poll created for it
+    options: int
+
@@ -1,97 +1,99 @@
 """Harmonic mean scoring algorithm with tie-breakers."""
-import statistics
+import math
+import os
 import random
-from typing import List, Dict, Optional
+from fractions import Fraction
+from typing import List, Dict, Optional, Set, Tuple
+from sqlalchemy import Select, case, func, select
 from sqlalchemy.orm import Session
-from app.models import Poll, Option, Vote
+from app.models import Poll, Option, Vote, OptionScore
 
+# Ratings are whole numbers in [0, 10], so every option's ratings can be
+# summarised exactly as an 11-bucket histogram (index == rating).
+RATING_BUCKETS = 11
 
-def compute_winner(poll_id: str, db: Session) -> Optional[str]:
+# Rating 0 is scored as 0.1 (1/10 exactly) to avoid division by zero
+ZERO_RATING = Fraction(1, 10)
+
+# "python" folds raw vote rows in the app; "sql" aggregates in the database
+# and only brings back one summary row per option; "incremental" reads the
+# running OptionScore accumulators kept up to date on every vote.
+SCORING_MODES = ("python", "sql", "incremental")
+SCORING_MODE = os.getenv("SCORING_MODE", "python")
+
+
+def empty_histogram() -> List[int]:
+    """Return a zeroed rating histogram."""
+    return [0] * RATING_BUCKETS
+
+
+def score_histogram(option_id: str, histogram: List[int]) -> Optional[dict]:
     """
-    Compute winner using harmonic mean scoring.
-    
-    For each option:
-    1. If ANY user vetoed the option, exclude it entirely
-    2. Collect all non-None ratings
-    3. If no ratings remain, option is excluded
-    4. Score = harmonic mean
-    
-    Tie-breakers (in order):
-    1. Lower variance (more consistent ratings)
-    2. Higher median
-    3. More raters
-    4. Seeded random (using poll_id)
+    Score one option from its rating histogram.
+
+    Returns None if the option has no ratings. Every statistic is derived
+    from the bucket counts alone, so the result does not depend on the
+    order the votes were read in. The score is an exact Fraction; the
+    results are converted to floats once ranked.
     """
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
-    if not poll:
+    num_raters = sum(histogram)
+    if num_raters == 0:
         return None
 
-    options = db.query(Option).filter(Option.poll_id == poll_id).all()
-    if not options:
-        return None
+    # Harmonic mean = n / sum(1/rating), kept exact so equal means tie
+    # and fall through to the tie-breakers whatever the vote order
+    reciprocal_sum = sum(
+        count / Fraction(max(rating, ZERO_RATING)) for rating, count in enumerate(histogram) if count
+    )
+    harmonic_mean = num_raters / reciprocal_sum
 
-    # Get all votes for this poll
-    votes = db.query(Vote).filter(Vote.poll_id == poll_id).all()
+    # Sample variance, computed exactly like statistics.variance
+    if num_raters > 1:
+        total = sum(rating * count for rating, count in enumerate(histogram))
+        total_sq = sum(rating * rating * count for rating, count in enumerate(histogram))
+        variance = float(Fraction(total_sq * num_raters - total * total, num_raters * (num_raters - 1)))
+    else:
+        variance = 0.0
 
-    # Build vote map: option_id -> list of (user_id, rating, veto)
-    option_votes: Dict[str, List[tuple]] = {}
-    for vote in votes:
-        if vote.option_id not in option_votes:
-            option_votes[vote.option_id] = []
-        option_votes[vote.option_id].append((vote.user_id, vote.rating, vote.veto))
+    return {
+        "option_id": option_id,
+        "score": harmonic_mean,
+        "variance": variance,
+        "median": _histogram_median(histogram, num_raters),
+        "num_raters": num_raters,
+    }
 
-    scored_options = []
 
-    for option in options:
-        votes_for_option = option_votes.get(option.id, [])
-        
-        # Check if ANY user vetoed this option - if so, exclude it entirely
-        # A vetoed option can NEVER be the winner, regardless of other ratings
-        # Query directly from database to ensure we have the latest veto status
-        vetoed_votes = db.query(Vote).filter(
-            Vote.poll_id == poll_id,
-            Vote.option_id == option.id,
-            Vote.veto == True
-        ).first()
-        
-        if vetoed_votes is not None:
-            continue  # Vetoed options are never winners
-        
-        # Filter: only include non-None ratings
-        valid_ratings = []
-        for user_id, rating, veto in votes_for_option:
-            if rating is not None:
-                valid_ratings.append(rating)
-        
-        if not valid_ratings:
-            continue  # Option excluded
-        
-        # Compute harmonic mean
-        
-        # Harmonic mean = n / sum(1/rating)
-        # Handle zero ratings (treat as 0.1 to avoid division by zero)
-        reciprocal_sum = sum(1.0 / max(r, 0.1) for r in valid_ratings)
-        harmonic_mean = len(valid_ratings) / reciprocal_sum if reciprocal_sum > 0 else 0.0
-        
-        variance = statistics.variance(valid_ratings) if len(valid_ratings) > 1 else 0.0
-        median = statistics.median(valid_ratings)
-        num_raters = len(valid_ratings)
-        
-        scored_options.append({
-            "option_id": option.id,
-            "score": harmonic_mean,
-            "variance": variance,
-            "median": median,
-            "num_raters": num_raters,
-        })
-    
-    if not scored_options:
-        return None
-    
-    # Sort by score (descending), then tie-breakers
-    # Tie-breakers: lower variance, higher median, more raters
+def _histogram_median(histogram: List[int], num_raters: int):
+    """Median of a histogram, matching statistics.median for integer data."""
+    low_index = (num_raters - 1) // 2
+    high_index = num_raters // 2
+    low = high = None
+    seen = 0
+    for rating, count in enumerate(histogram):
+        seen += count
+        if low is None and seen > low_index:
+            low = rating
+        if seen > high_index:
+            high = rating
+            break
+    if low == high:
+        return low
+    return (low + high) / 2
+
+
+def rank_options(poll_id: str, scored_options: List[dict]) -> List[dict]:
+    """
+    Sort scored options best-first.
+
+    Tie-breakers (in order):
+    1. Lower variance (more consistent ratings)
+    2. Higher median
+    3. More raters
+    4. Seeded random (using poll_id)
+    """
     random.seed(poll_id)  # Seed for final tie-breaker
-    
+
     scored_options.sort(
         key=lambda x: (
             -x["score"],  # Higher score first
@@ -101,6 +103,371 @@ def compute_winner(poll_id: str, db: Session) -> Optional[str]:
             random.random()  # Final random tie-breaker
         )
     )
-    
+    return scored_options
+
+
+def load_histograms(poll_id: str, db: Session) -> Tuple[List[str], Dict[str, List[int]], Set[str]]:
+    """
+    Load every vote of a poll in one pass.
+
+    Returns the poll's option IDs, a rating histogram per option and the set
+    of vetoed option IDs.
+    """
+    option_ids = list(db.execute(select(Option.id).where(Option.poll_id == poll_id)).scalars())
+
+    histograms: Dict[str, List[int]] = {}
+    vetoed: Set[str] = set()
+    rows = db.execute(
+        select(Vote.option_id, Vote.rating, Vote.veto).where(Vote.poll_id == poll_id)
+    )
+    for option_id, rating, veto in rows:
+        if veto:
+            vetoed.add(option_id)
+        elif rating is not None:
+            histogram = histograms.get(option_id)
+            if histogram is None:
+                histogram = histograms[option_id] = empty_histogram()
+            histogram[rating] += 1
+
+    return option_ids, histograms, vetoed
+
+
+def vote_aggregates(*poll_ids: str) -> Select:
+    """One (poll_id, option_id, veto count, *rating bucket counts) row per voted option of the polls."""
+    veto_count = func.sum(case((Vote.veto == True, 1), else_=0))
+    bucket_counts = [
+        func.sum(case((Vote.rating == rating, 1), else_=0))
+        for rating in range(RATING_BUCKETS)
+    ]
+    return (
+        select(Vote.poll_id, Vote.option_id, veto_count, *bucket_counts)
+        .where(Vote.poll_id.in_(poll_ids))
+        .group_by(Vote.poll_id, Vote.option_id)
+    )
+
+
+def load_histograms_sql(poll_id: str, db: Session) -> Tuple[List[str], Dict[str, List[int]], Set[str]]:
+    """
+    Same result as load_histograms, aggregated by the database.
+
+    A single GROUP BY returns one row per option with its veto count and a
+    conditional count per rating bucket, so memory use depends on the
+    number of options only, never on the number of votes. Plain SUM/CASE
+    keeps the query portable between PostgreSQL and SQLite.
+    """
+    option_ids = list(db.execute(select(Option.id).where(Option.poll_id == poll_id)).scalars())
+
+    rows = db.execute(vote_aggregates(poll_id))
+
+    histograms: Dict[str, List[int]] = {}
+    vetoed: Set[str] = set()
+    for _, option_id, vetoes, *histogram in rows:
+        if vetoes:
+            vetoed.add(option_id)
+        else:
+            histograms[option_id] = [int(count or 0) for count in histogram]
+
+    return option_ids, histograms, vetoed
+
+
+def load_histograms_incremental(poll_id: str, db: Session) -> Tuple[List[str], Dict[str, List[int]], Set[str]]:
+    """
+    Same result as load_histograms, read from the OptionScore accumulators.
+
+    Cost is O(options). Polls whose accumulators are missing (e.g. created
+    before they existed) are rebuilt from their votes first.
+    """
+    option_ids = list(db.execute(select(Option.id).where(Option.poll_id == poll_id)).scalars())
+    scores = {
+        score.option_id: score
+        for score in db.execute(select(OptionScore).where(OptionScore.poll_id == poll_id)).scalars()
+    }
+    if any(option_id not in scores for option_id in option_ids):
+        scores = rebuild_accumulators(poll_id, db)
+
+    histograms: Dict[str, List[int]] = {}
+    vetoed: Set[str] = set()
+    for option_id, score in scores.items():
+        if score.veto_count:
+            vetoed.add(option_id)
+        else:
+            histograms[option_id] = list(score.histogram)
+
+    return option_ids, histograms, vetoed
+
+
+def score_options(poll_id: str, db: Session, mode: Optional[str] = None) -> List[dict]:
+    """
+    Score and rank every eligible option of a poll.
+
+    For each option:
+    1. If ANY user vetoed the option, exclude it entirely
+    2. Collect all non-None ratings
+    3. If no ratings remain, option is excluded
+    4. Score = harmonic mean
+
+    mode selects where votes are aggregated (see SCORING_MODES) and
+    defaults to the SCORING_MODE environment variable.
+    """
+    return [result for result in rank_results(poll_id, db, mode) if result["rank"] is not None]
+
+
+def rank_results(poll_id: str, db: Session, mode: Optional[str] = None) -> List[dict]:
+    """
+    Final results for every option of a poll, best first.
+
+    Eligible options come first, scored and ranked as by score_options
+    (rank 1 wins). Vetoed and unrated options follow with no rank or score;
+    vetoed options report no raters either, since how many non-veto
+    ratings they have depends on the scoring mode.
+    """
+    mode = mode or SCORING_MODE
+    if mode not in SCORING_MODES:
+        raise ValueError(f"Unknown scoring mode: {mode}")
+
+    if db.get(Poll, poll_id) is None:
+        return []
+
+    if mode == "sql":
+        option_ids, histograms, vetoed = load_histograms_sql(poll_id, db)
+    elif mode == "incremental":
+        option_ids, histograms, vetoed = load_histograms_incremental(poll_id, db)
+    else:
+        option_ids, histograms, vetoed = load_histograms(poll_id, db)
+    return rank_histograms(poll_id, option_ids, histograms, vetoed)
+
+
+def rank_histograms(poll_id: str, option_ids: List[str], histograms: Dict[str, List[int]],
+                    vetoed: Set[str]) -> List[dict]:
+    """rank_results for options already loaded as histograms and vetoes."""
+    scored_options = []
+    unranked = []
+    for option_id in option_ids:
+        # A vetoed option can NEVER be the winner, regardless of other ratings
+        if option_id in vetoed:
+            unranked.append(_unranked(option_id, vetoed=True))
+            continue
+        scored = score_histogram(option_id, histograms.get(option_id, empty_histogram()))
+        if scored is not None:
+            scored_options.append(scored)
+        else:
+            unranked.append(_unranked(option_id, vetoed=False))
+
+    ranked = rank_options(poll_id, scored_options)
+    for rank, scored in enumerate(ranked, 1):
+        scored["score"] = float(scored["score"])
+        scored["rank"] = rank
+        scored["vetoed"] = False
+    return ranked + unranked
+
+
+def _unranked(option_id: str, vetoed: bool) -> dict:
+    return {
+        "option_id": option_id,
+        "score": None,
+        "variance": None,
+        "median": None,
+        "num_raters": None if vetoed else 0,
+        "rank": None,
+        "vetoed": vetoed,
+    }
+
+
+def compute_winner(poll_id: str, db: Session, mode: Optional[str] = None) -> Optional[str]:
+    """
+    Compute winner using harmonic mean scoring.
+
+    See score_options for the scoring rules and rank_options for the
+    tie-breakers.
+    """
+    scored_options = score_options(poll_id, db, mode)
+    if not scored_options:
+        return None
+
     return scored_options[0]["option_id"]
 
+
+def empty_accumulator(poll_id: str, option_id: str) -> dict:
+    """Column values of an empty accumulator, e.g. for a bulk insert."""
+    return {
+        "option_id": option_id,
+        "poll_id": poll_id,
+        "num_raters": 0,
+        "reciprocal_sum": 0.0,
+        "mean": 0.0,
+        "m2": 0.0,
+        "veto_count": 0,
+        "histogram": empty_histogram(),
+    }
+
+
+def new_accumulator(poll_id: str, option_id: str) -> OptionScore:
+    """Return an empty accumulator for a freshly created option."""
+    return OptionScore(**empty_accumulator(poll_id, option_id))
+
+
+def _add_rating(score: OptionScore, histogram: List[int], rating: int):
+    """Fold one rating into an accumulator (Welford update)."""
+    score.num_raters += 1
+    score.reciprocal_sum += 1.0 / max(rating, 0.1)
+    delta = rating - score.mean
+    score.mean += delta / score.num_raters
+    score.m2 += delta * (rating - score.mean)
+    histogram[rating] += 1
+
+
+def _remove_rating(score: OptionScore, histogram: List[int], rating: int):
+    """Take one rating back out of an accumulator (inverse Welford update)."""
+    histogram[rating] -= 1
+    if score.num_raters <= 1:
+        score.num_raters = 0
+        score.reciprocal_sum = 0.0
+        score.mean = 0.0
+        score.m2 = 0.0
+        return
+    old_mean = score.mean
+    score.num_raters -= 1
+    score.reciprocal_sum -= 1.0 / max(rating, 0.1)
+    score.mean = (old_mean * (score.num_raters + 1) - rating) / score.num_raters
+    score.m2 = max(score.m2 - (rating - old_mean) * (rating - score.mean), 0.0)
+
+
+def _accumulator_values(histogram: List[int]) -> dict:
+    """Exact accumulator fields for a histogram, as a full recompute gives them."""
+    num_raters = sum(histogram)
+    if num_raters == 0:
+        return {"num_raters": 0, "reciprocal_sum": 0.0, "mean": 0.0, "m2": 0.0}
+    mean = sum(rating * count for rating, count in enumerate(histogram)) / num_raters
+    return {
+        "num_raters": num_raters,
+        "reciprocal_sum": math.fsum(count / max(rating, 0.1) for rating, count in enumerate(histogram)),
+        "mean": mean,
+        "m2": math.fsum(count * (rating - mean) ** 2 for rating, count in enumerate(histogram)),
+    }
+
+
+def update_accumulators(poll_id: str, changes: List[Tuple[str, Optional[tuple], tuple]], db: Session):
+    """
+    Apply vote changes to the option accumulators.
+
+    Each change is (option_id, old, new) where old is the previous
+    (rating, veto) pair, or None for a new vote. Vote rows must already be
+    written; if any option has no accumulator yet, the whole poll is rebuilt
+    from its votes instead.
+
+    The accumulators are read-modified-written, so their rows are locked
+    (in option_id order, so concurrent ballots cannot deadlock) until the
+    caller commits.
+    """
+    if not changes:
+        return
+
+    option_ids = {option_id for option_id, _, _ in changes}
+    scores = {
+        score.option_id: score
+        for score in db.execute(
+            select(OptionScore)
+            .where(OptionScore.option_id.in_(option_ids))
+            .order_by(OptionScore.option_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        ).scalars()
+    }
+    if len(scores) < len(option_ids):
+        db.flush()
+        rebuild_accumulators(poll_id, db)
+        return
+
+    for option_id, old, new in changes:
+        score = scores[option_id]
+        histogram = list(score.histogram)
+        if old is not None:
+            old_rating, old_veto = old
+            if old_veto:
+                score.veto_count -= 1
+            elif old_rating is not None:
+                _remove_rating(score, histogram, old_rating)
+        new_rating, new_veto = new
+        if new_veto:
+            score.veto_count += 1
+        elif new_rating is not None:
+            _add_rating(score, histogram, new_rating)
+        score.histogram = histogram  # Reassign so the JSON change is flushed
+
+
+def rebuild_accumulators(poll_id: str, db: Session) -> Dict[str, OptionScore]:
+    """Recompute every accumulator of a poll from its votes."""
+    option_ids, histograms, _ = load_histograms(poll_id, db)
+    veto_counts = dict(db.execute(
+        select(Vote.option_id, func.count(Vote.id))
+        .where(Vote.poll_id == poll_id, Vote.veto == True)
+        .group_by(Vote.option_id)
+    ).all())
+    existing = {
+        score.option_id: score
+        for score in db.execute(
+            select(OptionScore)
+            .where(OptionScore.poll_id == poll_id)
+            .order_by(OptionScore.option_id)
+            .with_for_update()
+        ).scalars()
+    }
+
+    scores = {}
+    for option_id in option_ids:
+        score = existing.get(option_id)
+        if score is None:
+            score = new_accumulator(poll_id, option_id)
+            db.add(score)
+        histogram = histograms.get(option_id, empty_histogram())
+        for field, value in _accumulator_values(histogram).items():
+            setattr(score, field, value)
+        score.veto_count = veto_counts.get(option_id, 0)
+        score.histogram = histogram
+        scores[option_id] = score
+
+    db.flush()
+    return scores
+
+
+def check_accumulators(poll_id: str, db: Session) -> List[str]:
+    """
+    Compare a poll's accumulators against a full recompute from its votes.
+
+    Returns a description of every mismatch; an empty list means the
+    accumulators are consistent.
+    """
+    option_ids, histograms, _ = load_histograms(poll_id, db)
+    veto_counts = dict(db.execute(
+        select(Vote.option_id, func.count(Vote.id))
+        .where(Vote.poll_id == poll_id, Vote.veto == True)
+        .group_by(Vote.option_id)
+    ).all())
+    scores = {
+        score.option_id: score
+        for score in db.execute(select(OptionScore).where(OptionScore.poll_id == poll_id)).scalars()
+    }
+
+    problems = []
+    for option_id in option_ids:
+        score = scores.get(option_id)
+        if score is None:
+            problems.append(f"{option_id}: missing accumulator")
+            continue
+        histogram = histograms.get(option_id, empty_histogram())
+        expected_veto = veto_counts.get(option_id, 0)
+        if list(score.histogram) != histogram:
+            problems.append(f"{option_id}: histogram {score.histogram} != {histogram}")
+        if score.veto_count != expected_veto:
+            problems.append(f"{option_id}: veto_count {score.veto_count} != {expected_veto}")
+
+        expected = _accumulator_values(histogram)
+        if score.num_raters != expected.pop("num_raters"):
+            problems.append(f"{option_id}: num_raters {score.num_raters} != {sum(histogram)}")
+            continue
+        for field, value in expected.items():
+            actual = getattr(score, field)
+            if not math.isclose(actual, value, rel_tol=1e-9, abs_tol=1e-6):
+                problems.append(f"{option_id}: {field} {actual} != {value}")
+
+    return problems
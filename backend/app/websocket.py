@@ -1,60 +1,484 @@
-"""WebSocket manager for real-time updates."""
-from typing import Dict, Set
+"""WebSocket manager for real-time updates.
+
+Events are published through a pub/sub backend (see app.pubsub) and
+delivered by every worker to the sockets it holds, so clients connected to
+any worker see every event.
+
+Each socket has a bounded outbound queue drained by its own task, so a
+broadcast only enqueues and never waits on a slow client. Messages are
+JSON-encoded once per broadcast and the same text frame is queued for
+every recipient.
+
+Count updates (ready counts, participants joining or leaving) are
+coalesced per poll: within a short window only the latest message of each
+type is published. Other events flush anything pending for the poll
+first, so clients still see events in order.
+
+Broadcasting or delivering a poll event also invalidates the poll's
+cached reads (see app.cache).
+
+A poll socket gets a full snapshot when it connects and numbered events
+after that. Each worker stamps the events it delivers with a sequence
+number and keeps the last few per poll in a replay buffer. A client that
+reconnects to the same worker with ?since=<seq>&epoch=<epoch> is sent only
+what it missed. If the buffer no longer covers that, or the epoch is
+another worker's, it gets a fresh snapshot followed by a resync.
+
+Presence (who has a poll open) is tracked in memory, separately from the
+persisted participants. Each worker announces its per-poll online counts
+in one batched message per window; every worker adds up the latest
+announcement from each worker and sends poll clients a presence event
+when the total changes. Connecting and disconnecting never touch the
+database. Workers also re-announce all their counts on a heartbeat, and
+counts from a worker that misses a few heartbeats (one that crashed
+without withdrawing them) are dropped. A starting worker asks the others
+to re-announce at once.
+"""
+import asyncio
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from fastapi import WebSocket
 import json
 
+try:
+    import orjson
+except ImportError:  # Optional speedup
+    orjson = None
+
+from app.cache import invalidate_poll
+from app.metrics import Counter, Gauge
+from app.pubsub import BroadcastBackend, create_backend
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_URL = os.getenv("BROADCAST_URL", "memory://")
+
+# Envelope target for home screen events; poll events target the poll ID
+HOME_TARGET = "home"
+# Envelope target for batched presence announcements between workers
+PRESENCE_TARGET = "presence"
+
+# Per-socket send timeout (seconds) and outbound queue bound
+SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5"))
+SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "64"))
+
+# Events kept per poll for reconnecting clients, and polls with a replay buffer
+REPLAY_BUFFER_SIZE = int(os.getenv("WS_REPLAY_BUFFER_SIZE", "128"))
+REPLAY_MAX_POLLS = int(os.getenv("WS_REPLAY_MAX_POLLS", "1000"))
+
+# Identifies this worker's sequence numbers; a reconnect to another worker gets a snapshot
+EPOCH = secrets.token_hex(8)
+
+# Window (milliseconds) over which presence changes are batched
+PRESENCE_WINDOW = float(os.getenv("WS_PRESENCE_WINDOW_MS", "1000")) / 1000
+# Seconds between full presence announcements, and heartbeats a worker may miss before its counts expire
+PRESENCE_HEARTBEAT = float(os.getenv("WS_PRESENCE_HEARTBEAT", "15"))
+PRESENCE_EXPIRY_HEARTBEATS = 3
+
+# Window (milliseconds) over which count updates are merged; 0 disables
+COALESCE_WINDOW = float(os.getenv("WS_COALESCE_WINDOW_MS", "100")) / 1000
+
+
+def encode_message(message: dict) -> str:
+    """Encode a message as a compact JSON text frame."""
+    if orjson is not None:
+        return orjson.dumps(message).decode()
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+
+
+RESYNC_FRAME = encode_message({"type": "resync"})
+
+ws_sends = Counter("themis_ws_sends_total", "WebSocket messages sent", ("scope",))
+ws_dropped_sends = Counter(
+    "themis_ws_dropped_sends_total",
+    "WebSocket messages dropped (queue_full: replaced by a resync; timeout/error: socket closed)",
+    ("scope", "reason"),
+)
+ws_resyncs = Counter("themis_ws_resyncs_total", "Resync requests sent to slow clients", ("scope",))
+ws_connects = Counter(
+    "themis_ws_poll_connects_total",
+    "Poll socket connections by how they were brought up to date (snapshot or replay)",
+    ("sync",),
+)
+ws_coalesced = Counter(
+    "themis_ws_coalesced_total",
+    "Count updates superseded within the coalescing window and never published",
+    ("type",),
+)
+ws_coalesced_frames = Counter(
+    "themis_ws_coalesced_frames_saved_total",
+    "Socket frames saved on this worker by coalescing count updates",
+)
+
+
+class ClientConnection:
+    """Outbound side of one WebSocket: a bounded queue and the task draining it."""
+    
+    def __init__(self, websocket: WebSocket, scope: str, on_failed: Callable[["ClientConnection"], None],
+                 presence_key: str = None):
+        self.websocket = websocket
+        self.scope = scope
+        self.on_failed = on_failed
+        self.presence_key = presence_key
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.task = asyncio.create_task(self._drain())
+    
+    def send(self, frame: str):
+        """Queue an encoded frame without waiting for the socket."""
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # The client is too far behind for the backlog to matter:
+            # drop it and ask the client to reload its state instead
+            dropped = 0
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                dropped += 1
+            self.queue.put_nowait(RESYNC_FRAME)
+            ws_dropped_sends.inc(dropped + 1, scope=self.scope, reason="queue_full")
+            ws_resyncs.inc(scope=self.scope)
+    
+    async def _drain(self):
+        """Send queued frames in order, each within SEND_TIMEOUT."""
+        while True:
+            frame = await self.queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(frame), SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                ws_dropped_sends.inc(1 + self.queue.qsize(), scope=self.scope, reason="timeout")
+                await self._abort()
+                return
+            except Exception:
+                ws_dropped_sends.inc(1 + self.queue.qsize(), scope=self.scope, reason="error")
+                self.on_failed(self)
+                return
+            ws_sends.inc(scope=self.scope)
+    
+    async def _abort(self):
+        """Close a stalled socket and stop tracking it."""
+        # on_failed cancels this task, so it must come after the last await
+        try:
+            await asyncio.wait_for(self.websocket.close(code=1013), SEND_TIMEOUT)
+        except Exception:
+            pass
+        finally:
+            self.on_failed(self)
+    
+    def close(self):
+        """Stop the sender task, unless it is the one closing."""
+        if not self.task.done() and self.task is not asyncio.current_task():
+            self.task.cancel()
+
+
+class ReplayBuffer:
+    """The last REPLAY_BUFFER_SIZE stamped frames delivered for one poll."""
+    
+    def __init__(self, base_seq: int):
+        self.frames: deque = deque(maxlen=REPLAY_BUFFER_SIZE)  # (seq, frame)
+        # Frames up to this sequence number are no longer available
+        self.dropped_through = base_seq
+    
+    def append(self, seq: int, frame: str):
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped_through = self.frames[0][0]
+        self.frames.append((seq, frame))
+    
+    def since(self, seq: int) -> Optional[List[str]]:
+        """Frames after seq, or None if some of them were already dropped."""
+        if seq < self.dropped_through:
+            return None
+        return [frame for frame_seq, frame in self.frames if frame_seq > seq]
+
+
+def stamp(frame: str, seq: int) -> str:
+    """Add a sequence number to an encoded JSON object without re-encoding it."""
+    return f'{{"seq":{seq},{frame[1:]}'
+
 
 class ConnectionManager:
     """Manages WebSocket connections per poll."""
     
-    def __init__(self):
-        # poll_id -> set of WebSocket connections
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
+    def __init__(self, backend: BroadcastBackend):
+        self.backend = backend
+        # poll_id -> {WebSocket: outbound client}
+        self.active_connections: Dict[str, Dict[WebSocket, ClientConnection]] = {}
+        # Worker-wide sequence number of the last stamped event
+        self.seq = 0
+        # poll_id -> recent events, least recently used first
+        self.replay: "OrderedDict[str, ReplayBuffer]" = OrderedDict()
+        # poll_id -> {user ID (or socket key for anonymous clients): open sockets here}
+        self.presence: Dict[str, Dict[str, int]] = {}
+        # poll_id -> {worker epoch: online count}, from every worker's announcements
+        self.worker_presence: Dict[str, Dict[str, int]] = {}
+        # worker epoch -> time.monotonic() of its last announcement
+        self.worker_seen: Dict[str, float] = {}
+        # poll_id -> online total last sent to this worker's clients
+        self.sent_presence: Dict[str, int] = {}
+        self.presence_dirty: set = set()
+        self.presence_task: Optional[asyncio.Task] = None
+        self.heartbeat_task: Optional[asyncio.Task] = None
+        # poll_id -> {event type: latest message}, in order of last update
+        self.pending: Dict[str, Dict[str, dict]] = {}
+        self.flush_tasks: Dict[str, asyncio.Task] = {}
     
-    async def connect(self, websocket: WebSocket, poll_id: str):
-        """Connect a client to a poll."""
+    async def connect(
+        self,
+        websocket: WebSocket,
+        poll_id: str,
+        snapshot: Optional[Callable[[], Awaitable[Optional[dict]]]] = None,
+        since: Optional[int] = None,
+        epoch: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ):
+        """
+        Connect a client to a poll and bring it up to date.
+
+        A client resuming from sequence number since (of this worker's
+        epoch) is sent the events it missed. Otherwise it is sent the
+        state returned by snapshot (and a resync if it asked to resume),
+        followed by any events delivered while the snapshot was loading.
+        The client counts towards the poll's presence as user_id, or as
+        its own anonymous user.
+        """
         await websocket.accept()
+        buffer = self._replay_buffer(poll_id)
+        client = ClientConnection(websocket, "poll", lambda client: self.disconnect(websocket, poll_id),
+                                  presence_key=user_id or f"socket:{id(websocket)}")
+        missed = buffer.since(since) if since is not None and epoch == EPOCH else None
+        if missed is not None:
+            ws_connects.inc(sync="replay")
+        elif snapshot is not None:
+            seq = self.seq
+            state = await snapshot()
+            if state is not None:
+                state["online"] = self.online(poll_id)
+                client.send(encode_message({"type": "snapshot", "seq": seq, "epoch": EPOCH, **state}))
+            if since is not None:
+                # The events it asked for are gone or another worker's
+                client.send(RESYNC_FRAME)
+            # Snapshots are loaded after seq, so replaying a later event only repeats it
+            missed = buffer.since(seq)
+            if missed is None:
+                missed = [frame for _, frame in buffer.frames]
+            ws_connects.inc(sync="snapshot")
+        for frame in missed or ():
+            client.send(frame)
+        # No await since the frames above were read, so no event can slip in between
         if poll_id not in self.active_connections:
-            self.active_connections[poll_id] = set()
-        self.active_connections[poll_id].add(websocket)
+            self.active_connections[poll_id] = {}
+        self.active_connections[poll_id][websocket] = client
+        self._change_presence(poll_id, client.presence_key, 1)
+    
+    def _replay_buffer(self, poll_id: str) -> ReplayBuffer:
+        """Return a poll's replay buffer, creating it and evicting idle ones as needed."""
+        buffer = self.replay.get(poll_id)
+        if buffer is not None:
+            self.replay.move_to_end(poll_id)
+            return buffer
+        buffer = self.replay[poll_id] = ReplayBuffer(self.seq)
+        if len(self.replay) > REPLAY_MAX_POLLS:
+            for idle_poll_id in list(self.replay):
+                if idle_poll_id not in self.active_connections and idle_poll_id != poll_id:
+                    del self.replay[idle_poll_id]
+                    break
+        return buffer
     
     def disconnect(self, websocket: WebSocket, poll_id: str):
         """Disconnect a client from a poll."""
         if poll_id in self.active_connections:
-            self.active_connections[poll_id].discard(websocket)
+            client = self.active_connections[poll_id].pop(websocket, None)
+            if client is not None:
+                client.close()
+                self._change_presence(poll_id, client.presence_key, -1)
             if not self.active_connections[poll_id]:
                 del self.active_connections[poll_id]
     
-    async def broadcast(self, poll_id: str, message: dict):
-        """Broadcast a message to all connected clients for a poll."""
-        if poll_id not in self.active_connections:
+    def online(self, poll_id: str) -> int:
+        """Users with the poll open, on every worker, as last announced."""
+        return sum(self.worker_presence.get(poll_id, {}).values())
+    
+    def _change_presence(self, poll_id: str, key: str, delta: int):
+        """Count a socket opening or closing and schedule a presence announcement."""
+        users = self.presence.setdefault(poll_id, {})
+        before = len(users)
+        users[key] = users.get(key, 0) + delta
+        if users[key] <= 0:
+            del users[key]
+        if not users:
+            del self.presence[poll_id]
+        if len(users) == before:
+            return  # Another tab of a user already counted
+        self.presence_dirty.add(poll_id)
+        if self.presence_task is None:
+            self.presence_task = asyncio.create_task(self._announce_presence_later())
+    
+    async def _announce_presence_later(self):
+        await asyncio.sleep(PRESENCE_WINDOW)
+        self.presence_task = None
+        await self.announce_presence()
+    
+    async def announce_presence(self, polls: Optional[Dict[str, int]] = None, full: bool = False):
+        """
+        Publish this worker's online counts for every poll whose presence changed.
+
+        A full announcement carries every poll this worker has clients of
+        and replaces whatever was last announced for it.
+        """
+        if full:
+            polls = {poll_id: len(users) for poll_id, users in self.presence.items()}
+            self.presence_dirty.clear()
+        elif polls is None:
+            polls = {poll_id: len(self.presence.get(poll_id, ())) for poll_id in self.presence_dirty}
+            self.presence_dirty.clear()
+        if polls or full:
+            message = {"worker": EPOCH, "polls": polls}
+            if full:
+                message["full"] = True
+            await publish(self.backend, PRESENCE_TARGET, message)
+    
+    async def apply_presence(self, announcement: dict):
+        """Record a worker's online counts and tell local clients about changed totals."""
+        worker = announcement["worker"]
+        if announcement.get("hello"):
+            # A worker starting up: tell it who is online here
+            if worker != EPOCH and self.presence:
+                await self.announce_presence(full=True)
             return
-        
-        disconnected = set()
-        for connection in self.active_connections[poll_id]:
+        self.worker_seen[worker] = time.monotonic()
+        polls = dict(announcement["polls"])
+        if announcement.get("full"):
+            for poll_id, workers in self.worker_presence.items():
+                if worker in workers and poll_id not in polls:
+                    polls[poll_id] = 0
+        self._set_worker_presence(worker, polls)
+    
+    def _set_worker_presence(self, worker: str, polls: Dict[str, int]):
+        for poll_id, online in polls.items():
+            workers = self.worker_presence.setdefault(poll_id, {})
+            if online:
+                workers[worker] = online
+            else:
+                workers.pop(worker, None)
+                if not workers:
+                    del self.worker_presence[poll_id]
+            total = self.online(poll_id)
+            if self.sent_presence.get(poll_id) != total and poll_id in self.active_connections:
+                self.sent_presence[poll_id] = total
+                self._send_local(poll_id, encode_message({"type": "presence", "online": total}))
+            elif poll_id not in self.active_connections:
+                self.sent_presence.pop(poll_id, None)
+    
+    def expire_presence(self):
+        """Drop the counts of workers that stopped announcing, e.g. because they crashed."""
+        deadline = time.monotonic() - PRESENCE_HEARTBEAT * PRESENCE_EXPIRY_HEARTBEATS
+        for worker, seen in list(self.worker_seen.items()):
+            if seen >= deadline or worker == EPOCH:
+                continue
+            del self.worker_seen[worker]
+            logger.info("Presence from worker %s expired", worker)
+            self._set_worker_presence(worker, {
+                poll_id: 0 for poll_id, workers in self.worker_presence.items() if worker in workers
+            })
+    
+    async def start_presence(self):
+        """Ask other workers for their counts and start this worker's heartbeat."""
+        await publish(self.backend, PRESENCE_TARGET, {"worker": EPOCH, "hello": True})
+        self.heartbeat_task = asyncio.create_task(self._heartbeat())
+    
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(PRESENCE_HEARTBEAT)
             try:
-                await connection.send_json(message)
+                await self.announce_presence(full=True)
+                self.expire_presence()
             except Exception:
-                disconnected.add(connection)
-        
-        # Clean up disconnected clients
-        for connection in disconnected:
-            self.active_connections[poll_id].discard(connection)
+                logger.exception("Presence heartbeat failed")
+    
+    async def withdraw_presence(self):
+        """Announce that this worker no longer has anyone online, e.g. at shutdown."""
+        for task in (self.presence_task, self.heartbeat_task):
+            if task is not None:
+                task.cancel()
+        self.presence_task = None
+        self.heartbeat_task = None
+        polls = {poll_id: 0 for poll_id in self.presence}
+        polls.update({poll_id: 0 for poll_id in self.presence_dirty})
+        self.presence_dirty.clear()
+        await self.announce_presence(polls)
+    
+    async def broadcast(self, poll_id: str, message: dict):
+        """Broadcast a message to all clients of a poll, on every worker."""
+        invalidate_poll(poll_id)
+        await self.flush(poll_id)
+        await publish(self.backend, poll_id, message)
+    
+    async def broadcast_coalesced(self, poll_id: str, message: dict):
+        """
+        Broadcast a count update at the end of the coalescing window.
+
+        A later message of the same type replaces a pending one, so only
+        the latest state is published.
+        """
+        if COALESCE_WINDOW <= 0:
+            await self.broadcast(poll_id, message)
+            return
+        invalidate_poll(poll_id)
+        pending = self.pending.setdefault(poll_id, {})
+        message_type = message["type"]
+        if pending.pop(message_type, None) is not None:
+            ws_coalesced.inc(type=message_type)
+            ws_coalesced_frames.inc(len(self.active_connections.get(poll_id, {})))
+        pending[message_type] = message
+        if poll_id not in self.flush_tasks:
+            self.flush_tasks[poll_id] = asyncio.create_task(self._flush_later(poll_id))
+    
+    async def _flush_later(self, poll_id: str):
+        await asyncio.sleep(COALESCE_WINDOW)
+        self.flush_tasks.pop(poll_id, None)
+        await self.flush(poll_id)
+    
+    async def flush(self, poll_id: str):
+        """Publish any count updates still pending for a poll."""
+        pending = self.pending.pop(poll_id, None)
+        if pending:
+            for message in pending.values():
+                await publish(self.backend, poll_id, message)
+    
+    async def flush_all(self):
+        """Publish every pending count update, e.g. before shutdown."""
+        for task in self.flush_tasks.values():
+            task.cancel()
+        self.flush_tasks.clear()
+        for poll_id in list(self.pending):
+            await self.flush(poll_id)
+    
+    async def deliver(self, poll_id: str, frame: str):
+        """Queue a poll event for this worker's clients of the poll."""
+        invalidate_poll(poll_id)
+        self._send_local(poll_id, frame)
+    
+    def _send_local(self, poll_id: str, frame: str):
+        """Stamp an encoded frame, keep it for replay and queue it for local clients."""
+        buffer = self.replay.get(poll_id)
+        if buffer is None:
+            return  # No client here has watched this poll
+        self.seq += 1
+        frame = stamp(frame, self.seq)
+        buffer.append(self.seq, frame)
+        for client in list(self.active_connections.get(poll_id, {}).values()):
+            client.send(frame)
     
     async def send_participant_joined(self, poll_id: str, participant_count: int):
         """Broadcast participant joined event."""
-        await self.broadcast(poll_id, {
+        await self.broadcast_coalesced(poll_id, {
             "type": "participant_joined",
             "participants": participant_count,
         })
     
-    async def send_participant_left(self, poll_id: str, participant_count: int):
-        """Broadcast participant left event."""
-        await self.broadcast(poll_id, {
-            "type": "participant_left",
-            "participants": participant_count,
-        })
-    
     async def send_option_added(self, poll_id: str, option_id: str, label: str):
         """Broadcast option added event."""
         await self.broadcast(poll_id, {
@@ -65,9 +489,16 @@ class ConnectionManager:
             },
         })
     
+    async def send_options_added(self, poll_id: str, options: List[Tuple[str, str]]):
+        """Broadcast one event for a batch of (option ID, label) added together."""
+        await self.broadcast(poll_id, {
+            "type": "options_added",
+            "options": [{"id": option_id, "label": label} for option_id, label in options],
+        })
+    
     async def send_ready_counts(self, poll_id: str, ready: int, participants: int):
         """Broadcast ready count update."""
-        await self.broadcast(poll_id, {
+        await self.broadcast_coalesced(poll_id, {
             "type": "ready_counts",
             "ready": ready,
             "participants": participants,
@@ -83,45 +514,52 @@ class ConnectionManager:
             },
         })
     
-    async def send_status(self, websocket: WebSocket, status: dict):
+    async def send_poll_deleted(self, poll_id: str):
+        """Broadcast poll deleted event to the poll's clients."""
+        await self.broadcast(poll_id, {
+            "type": "poll_deleted",
+            "pollId": poll_id,
+        })
+    
+    async def send_status(self, websocket: WebSocket, poll_id: str, status: dict):
         """Send status snapshot to a single client."""
-        try:
-            await websocket.send_json({
+        client = self.active_connections.get(poll_id, {}).get(websocket)
+        if client is not None:
+            client.send(encode_message({
                 "type": "status",
                 **status,
-            })
-        except Exception:
-            pass
+            }))
 
 
 class GlobalConnectionManager:
     """Manages global WebSocket connections (e.g., for home screen)."""
     
-    def __init__(self):
-        # Set of WebSocket connections for global updates
-        self.active_connections: Set[WebSocket] = set()
+    def __init__(self, backend: BroadcastBackend):
+        self.backend = backend
+        # WebSocket connections for global updates -> outbound client
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
     
     async def connect(self, websocket: WebSocket):
         """Connect a client for global updates."""
         await websocket.accept()
-        self.active_connections.add(websocket)
+        self.active_connections[websocket] = ClientConnection(
+            websocket, "home", lambda client: self.disconnect(websocket)
+        )
     
     def disconnect(self, websocket: WebSocket):
         """Disconnect a client from global updates."""
-        self.active_connections.discard(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if client is not None:
+            client.close()
     
     async def broadcast(self, message: dict):
-        """Broadcast a message to all connected clients."""
-        disconnected = set()
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                disconnected.add(connection)
-        
-        # Clean up disconnected clients
-        for connection in disconnected:
-            self.active_connections.discard(connection)
+        """Broadcast a message to all connected clients, on every worker."""
+        await publish(self.backend, HOME_TARGET, message)
+    
+    async def deliver(self, frame: str):
+        """Queue an encoded frame for this worker's clients."""
+        for client in list(self.active_connections.values()):
+            client.send(frame)
     
     async def send_poll_created(self, poll_id: str, title: str, created_at: str, creator_id: str = None, princess_mode: bool = False):
         """Broadcast poll created event."""
@@ -157,8 +595,86 @@ class GlobalConnectionManager:
                 "princess_mode": princess_mode,
             },
         })
+    
+    async def send_polls_created(self, polls: List[dict]):
+        """Broadcast one event for a batch of created polls, e.g. by an import."""
+        await self.broadcast({
+            "type": "polls_created",
+            "polls": polls,
+        })
+    
+    async def send_polls_cloned(self, polls: List[dict]):
+        """Broadcast one event for a batch of cloned polls."""
+        await self.broadcast({
+            "type": "polls_cloned",
+            "polls": polls,
+        })
+
+
+async def publish(backend: BroadcastBackend, target: str, message: dict):
+    """
+    Encode a message once and publish it as "<target>\n<frame>".
+
+    The frame is passed through to sockets verbatim, so no worker decodes
+    or re-encodes it. Failures are logged, not raised to the caller; the
+    event is then still delivered to this worker's sockets.
+    """
+    payload = f"{target}\n{encode_message(message)}"
+    try:
+        await backend.publish(payload)
+    except Exception:
+        logger.exception("Failed to publish %s event; delivering it locally only", message.get("type"))
+        await dispatch(payload)
+
+
+async def dispatch(payload: str):
+    """Hand an event received from the backend to the local managers."""
+    try:
+        target, frame = payload.split("\n", 1)
+        if target == HOME_TARGET:
+            await global_manager.deliver(frame)
+        elif target == PRESENCE_TARGET:
+            await manager.apply_presence(json.loads(frame))
+        else:
+            await manager.deliver(target, frame)
+    except Exception:
+        logger.exception("Failed to deliver broadcast")
+
+
+async def start_broadcast():
+    """Subscribe this worker to the broadcast backend."""
+    await backend.connect(dispatch)
+    await manager.start_presence()
+
+
+async def stop_broadcast():
+    """Unsubscribe this worker from the broadcast backend."""
+    await manager.flush_all()
+    await manager.withdraw_presence()
+    await backend.disconnect()
+
+
+def _all_clients():
+    for clients in manager.active_connections.values():
+        yield from clients.values()
+    yield from global_manager.active_connections.values()
+
+
+def _connection_stats(field: Callable[[ClientConnection], int]):
+    stats = {("poll",): 0, ("home",): 0}
+    for client in _all_clients():
+        stats[(client.scope,)] += field(client)
+    return stats
+
 
+backend = create_backend(BROADCAST_URL)
+manager = ConnectionManager(backend)
+global_manager = GlobalConnectionManager(backend)
 
-manager = ConnectionManager()
-global_manager = GlobalConnectionManager()
+Gauge("themis_ws_connections", "Open WebSocket connections on this worker", ("scope",),
+      callback=lambda: _connection_stats(lambda client: 1))
+Gauge("themis_ws_send_queue_depth", "Messages waiting in outbound WebSocket queues", ("scope",),
+      callback=lambda: _connection_stats(lambda client: client.queue.qsize()))
+Gauge("themis_ws_send_queue_max_depth", "Deepest outbound WebSocket queue", (),
+      callback=lambda: {(): max((client.queue.qsize() for client in _all_clients()), default=0)})
 
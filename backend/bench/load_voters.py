@@ -0,0 +1,129 @@
+"""Concurrent voter load test.
+
+Simulates a poll where many voters submit ballots and press ready at the
+same time, while a probe keeps hitting /healthz. Reports p50/p95/p99
+latency for each request type. The health probe shows how long the event
+loop stalls behind database work.
+
+Usage:
+    python -m bench.load_voters [--voters 50] [--options 20] [--rounds 3]
+    python -m bench.load_voters --url http://localhost:10000
+
+Without --url the app is served in-process, so DATABASE_URL decides the
+database (point it at a scratch SQLite file or a local PostgreSQL).
+Compare before/after a change by running it on both checkouts.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Return count, p50/p95/p99 and max of latency samples in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    cuts = statistics.quantiles(ordered, n=100, method="inclusive") if len(ordered) > 1 else ordered * 99
+    return {
+        "count": len(ordered),
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+async def timed(client: httpx.AsyncClient, samples: List[float], method: str, url: str, **kwargs):
+    """Issue a request and record its latency."""
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    samples.append(time.perf_counter() - start)
+    response.raise_for_status()
+    return response
+
+
+async def run(client: httpx.AsyncClient, voters: int, options: int, rounds: int, seed: int) -> dict:
+    """Set up one poll and drive it with concurrent voters."""
+    rng = random.Random(seed)
+    creator = (await client.post("/users", json={"name": "creator"})).json()["userId"]
+    poll_id = (await client.post("/polls", json={"title": "load test", "creator_id": creator})).json()["pollId"]
+    option_ids = [
+        (await client.post(f"/polls/{poll_id}/options", json={"label": f"option {i}"})).json()["id"]
+        for i in range(options)
+    ]
+    user_ids = []
+    for i in range(voters):
+        user_id = (await client.post("/users", json={"name": f"voter {i}"})).json()["userId"]
+        await client.post(f"/polls/{poll_id}/join", json={"userId": user_id})
+        user_ids.append(user_id)
+
+    samples: Dict[str, List[float]] = {"vote": [], "ready": [], "healthz": []}
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            await timed(client, samples["healthz"], "GET", "/healthz")
+            await asyncio.sleep(0.005)
+
+    async def voter(user_id: str):
+        for round_number in range(rounds):
+            entries = [
+                {"optionId": option_id, "rating": rng.randint(0, 10), "veto": False}
+                for option_id in option_ids
+            ]
+            await timed(client, samples["vote"], "PUT", f"/polls/{poll_id}/vote",
+                        json={"userId": user_id, "entries": entries})
+            if round_number == rounds - 1:
+                await timed(client, samples["ready"], "POST", f"/polls/{poll_id}/ready",
+                            json={"userId": user_id})
+
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(voter(user_id) for user_id in user_ids))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe_task
+
+    return {
+        "voters": voters,
+        "options": options,
+        "rounds": rounds,
+        "elapsed_s": round(elapsed, 3),
+        "latency": {name: percentiles(values) for name, values in samples.items()},
+    }
+
+
+def make_client(url: str = None) -> httpx.AsyncClient:
+    """Client against a running server, or the app served in-process."""
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=60)
+    from app.database import Base, engine
+    from app.main import app
+    Base.metadata.create_all(engine)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+
+async def main_async(args) -> dict:
+    async with make_client(args.url) as client:
+        return await run(client, args.voters, args.options, args.rounds, args.seed)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(prog="python -m bench.load_voters", description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process app)")
+    parser.add_argument("--voters", type=int, default=50)
+    parser.add_argument("--options", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
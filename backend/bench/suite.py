@@ -0,0 +1,324 @@
+"""Backend benchmark suite.
+
+Seeds synthetic polls of a configurable size, then measures the hot paths:
+scoring (compute_winner in every SCORING_MODE), submit_vote, list_polls,
+get_status and WebSocket broadcast fan-out. Each benchmark reports
+throughput and p50/p95/p99 latency as JSON.
+
+Usage:
+    python -m bench.suite run [--users 200] [--options 20] [--polls 2000] [--out results.json]
+    python -m bench.suite compare baseline.json results.json [--threshold 0.10]
+
+DATABASE_URL decides the database (a scratch SQLite file or a local
+PostgreSQL); the seeded data is added to whatever is there. compare exits
+with status 1 if any benchmark regressed by more than the threshold.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List
+
+from sqlalchemy import insert
+
+from bench.load_voters import make_client, percentiles
+
+BENCHMARKS = ("compute_winner", "submit_vote", "list_polls", "get_status", "broadcast_fanout")
+
+# Latency percentiles compared by compare(); throughput is compared too
+COMPARED_LATENCIES = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def summarize(samples: List[float], elapsed: float) -> dict:
+    """Latency percentiles plus throughput over the wall-clock elapsed time."""
+    summary = percentiles(samples)
+    summary["throughput_per_s"] = round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0
+    return summary
+
+
+async def measure(call: Callable[[], Awaitable], iterations: int, concurrency: int) -> dict:
+    """Run call iterations times across concurrency workers and summarize."""
+    samples: List[float] = []
+    remaining = iter(range(iterations))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            await call()
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, time.perf_counter() - start)
+
+
+def seed(users: int, options: int, polls: int, seed_value: int) -> dict:
+    """
+    Insert one voting poll (users x options ballots) and polls - 1 filler polls.
+
+    Returns the IDs the benchmarks need. Counters and score accumulators
+    are rebuilt so every SCORING_MODE starts from consistent data.
+    """
+    from app.counters import rebuild_counters
+    from app.database import SessionLocal
+    from app.models import Option, Participant, Poll, User, Vote, generate_ulid
+    from app.scoring import rebuild_accumulators
+
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    user_ids = [generate_ulid() for _ in range(users)]
+    poll_id = generate_ulid()
+    option_ids = [generate_ulid() for _ in range(options)]
+    db = SessionLocal()
+    try:
+        db.execute(insert(User), [{"id": user_id, "name": f"bench {i}"} for i, user_id in enumerate(user_ids)])
+        db.execute(insert(Poll), [{"id": poll_id, "title": "bench poll", "created_at": now}])
+        db.execute(insert(Poll), [
+            {
+                "id": generate_ulid(),
+                "title": f"filler {i}",
+                "created_at": now - timedelta(seconds=i + 1),
+                "creator_id": rng.choice(user_ids),
+                "princess_mode": i % 10 == 0,
+                "winner_id": None if i % 2 else "revealed",
+            }
+            for i in range(polls - 1)
+        ])
+        db.execute(insert(Option), [
+            {"id": option_id, "poll_id": poll_id, "label": f"option {i}"} for i, option_id in enumerate(option_ids)
+        ])
+        db.execute(insert(Participant), [
+            {"id": generate_ulid(), "poll_id": poll_id, "user_id": user_id, "ready": True} for user_id in user_ids
+        ])
+        db.execute(insert(Vote), [
+            {
+                "id": generate_ulid(),
+                "poll_id": poll_id,
+                "option_id": option_id,
+                "user_id": user_id,
+                "rating": rng.randint(0, 10),
+                "veto": rng.random() < 0.01,
+            }
+            for user_id in user_ids
+            for option_id in option_ids
+        ])
+        rebuild_counters(db, [poll_id])
+        rebuild_accumulators(poll_id, db)
+        db.commit()
+    finally:
+        db.close()
+    return {"poll_id": poll_id, "option_ids": option_ids, "user_ids": user_ids}
+
+
+def bench_compute_winner(poll_id: str, iterations: int) -> Dict[str, dict]:
+    """Time a full scoring pass in each SCORING_MODE."""
+    from app.database import SessionLocal
+    from app.scoring import SCORING_MODES, compute_winner
+
+    results = {}
+    db = SessionLocal()
+    try:
+        for mode in SCORING_MODES:
+            samples = []
+            start = time.perf_counter()
+            for _ in range(iterations):
+                call_start = time.perf_counter()
+                compute_winner(poll_id, db, mode=mode)
+                samples.append(time.perf_counter() - call_start)
+            results[f"compute_winner[{mode}]"] = summarize(samples, time.perf_counter() - start)
+            db.rollback()
+    finally:
+        db.close()
+    return results
+
+
+async def bench_http(client, data: dict, iterations: int, concurrency: int, seed_value: int) -> Dict[str, dict]:
+    """Time submit_vote, list_polls and get_status through the API."""
+    rng = random.Random(seed_value)
+    poll_id = data["poll_id"]
+
+    async def submit_vote():
+        entries = [{"optionId": option_id, "rating": rng.randint(0, 10), "veto": False}
+                   for option_id in data["option_ids"]]
+        response = await client.put(f"/polls/{poll_id}/vote",
+                                    json={"userId": rng.choice(data["user_ids"]), "entries": entries})
+        response.raise_for_status()
+
+    async def list_polls():
+        (await client.get("/polls")).raise_for_status()
+
+    async def list_polls_filtered():
+        (await client.get("/polls", params={"status": "open", "creator_id": rng.choice(data["user_ids"])})).raise_for_status()
+
+    async def get_status():
+        (await client.get(f"/polls/{poll_id}/status")).raise_for_status()
+
+    return {
+        "submit_vote": await measure(submit_vote, iterations, concurrency),
+        "list_polls": await measure(list_polls, iterations, concurrency),
+        "list_polls[filtered]": await measure(list_polls_filtered, iterations, concurrency),
+        "get_status": await measure(get_status, iterations, concurrency),
+    }
+
+
+class _BenchSocket:
+    """Stands in for a WebSocket; counts frames and signals the last delivery."""
+
+    def __init__(self, delivered: Callable[[], None]):
+        self.delivered = delivered
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame: str):
+        self.delivered()
+
+
+async def bench_broadcast(sockets: int, iterations: int) -> Dict[str, dict]:
+    """Time from broadcast until every socket on the poll has been sent the frame."""
+    from app.pubsub import MemoryBackend
+    from app.websocket import ConnectionManager
+
+    backend = MemoryBackend()
+    fanout = ConnectionManager(backend)
+
+    async def on_message(payload: str):
+        target, frame = payload.split("\n", 1)
+        await fanout.deliver(target, frame)
+
+    await backend.connect(on_message)
+    state = {"pending": 0, "done": None}
+
+    def delivered():
+        state["pending"] -= 1
+        if state["pending"] == 0:
+            state["done"].set()
+
+    for _ in range(sockets):
+        await fanout.connect(_BenchSocket(delivered), "bench")
+
+    samples = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        state["pending"] = sockets
+        state["done"] = asyncio.Event()
+        call_start = time.perf_counter()
+        await fanout.send_option_added("bench", f"option {i}", f"label {i}")
+        await state["done"].wait()
+        samples.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+
+    for websocket in list(fanout.active_connections.get("bench", {})):
+        fanout.disconnect(websocket, "bench")
+    await backend.disconnect()
+    return {f"broadcast_fanout[{sockets}]": summarize(samples, elapsed)}
+
+
+async def run(args) -> dict:
+    from app.database import engine
+
+    started = time.perf_counter()
+    async with make_client() as client:  # Creates the tables if needed
+        data = seed(args.users, args.options, args.polls, args.seed)
+        results = {}
+        if "compute_winner" in args.only:
+            results.update(bench_compute_winner(data["poll_id"], args.scoring_iterations))
+        if {"submit_vote", "list_polls", "get_status"} & set(args.only):
+            http = await bench_http(client, data, args.iterations, args.concurrency, args.seed)
+            results.update({name: value for name, value in http.items() if name.split("[")[0] in args.only})
+        if "broadcast_fanout" in args.only:
+            results.update(await bench_broadcast(args.sockets, args.iterations))
+    return {
+        "meta": {
+            "database": engine.dialect.name,
+            "python": platform.python_version(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "users": args.users,
+            "options": args.options,
+            "polls": args.polls,
+            "sockets": args.sockets,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "elapsed_s": round(time.perf_counter() - started, 3),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[dict]:
+    """
+    Compare two runs benchmark by benchmark.
+
+    A metric regresses if a latency grew, or throughput fell, by more than
+    threshold (a fraction of the baseline value).
+    """
+    rows = []
+    for name, base in sorted(baseline["results"].items()):
+        new = current["results"].get(name)
+        if new is None or not base.get("count") or not new.get("count"):
+            continue
+        for metric in COMPARED_LATENCIES + ("throughput_per_s",):
+            before, after = base[metric], new[metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            worse = -change if metric == "throughput_per_s" else change
+            rows.append({
+                "benchmark": name,
+                "metric": metric,
+                "baseline": before,
+                "current": after,
+                "change_pct": round(change * 100, 1),
+                "regression": worse > threshold,
+            })
+    return rows
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.suite", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Seed synthetic data and run the benchmarks")
+    run_parser.add_argument("--users", type=int, default=200, help="Voters in the benchmark poll")
+    run_parser.add_argument("--options", type=int, default=20, help="Options in the benchmark poll")
+    run_parser.add_argument("--polls", type=int, default=2000, help="Polls in total, for list_polls")
+    run_parser.add_argument("--sockets", type=int, default=500, help="WebSockets for broadcast fan-out")
+    run_parser.add_argument("--iterations", type=int, default=200, help="Calls per API/broadcast benchmark")
+    run_parser.add_argument("--scoring-iterations", type=int, default=20, help="Calls per scoring mode")
+    run_parser.add_argument("--concurrency", type=int, default=10, help="Concurrent API callers")
+    run_parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--out", help="Write the JSON results here as well as to stdout")
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions between two runs")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="Allowed relative slowdown before flagging (default: 0.10)")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        results = asyncio.run(run(args))
+        output = json.dumps(results, indent=2)
+        if args.out:
+            with open(args.out, "w") as f:
+                f.write(output + "\n")
+        print(output)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    regressions = [row for row in rows if row["regression"]]
+    print(json.dumps({"threshold": args.threshold, "regressions": regressions, "comparisons": rows}, indent=2))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Test configuration.
+
+The app reads DATABASE_URL when it is imported, so it is pointed at a
+throwaway SQLite file here, before any test imports it. Set
+TEST_DATABASE_URL to run the suite against another database instead.
+"""
+import asyncio
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = os.getenv(
+    "TEST_DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "themis-test.db")
+)
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.database import Base, SessionLocal, engine
+import app.models  # noqa: F401  (registers the tables)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+async def client():
+    from app import deletion
+    from app.main import app
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    # Background purges started by DELETE /polls belong to this test's event
+    # loop; left running, they would hold the SQLite write lock into the next test
+    await asyncio.gather(*deletion._tasks, return_exceptions=True)
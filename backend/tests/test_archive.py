@@ -0,0 +1,41 @@
+"""Archiving revealed polls."""
+from sqlalchemy import delete
+
+from app.archive import archive_polls
+from app.cache import invalidate_poll
+from app.database import AsyncSessionLocal
+from app.models import OptionResult
+from tests.test_results import revealed_poll
+
+
+async def test_archiving_is_off_by_default(client):
+    poll_id, _, _ = await revealed_poll(client, [9, 5])
+    assert await archive_polls() == 0
+    assert (await client.post(f"/polls/{poll_id}/options", json={"label": "late"})).status_code == 200
+
+
+async def test_archived_poll_reads_as_before(client):
+    poll_id, _, options = await revealed_poll(client, [9, 5])
+    before = [(await client.get(f"/polls/{poll_id}/{read}")).json() for read in ("status", "options", "results")]
+
+    assert await archive_polls([poll_id]) == 1
+    invalidate_poll(poll_id)
+    assert [(await client.get(f"/polls/{poll_id}/{read}")).json() for read in ("status", "options", "results")] == before
+    assert (await client.post(f"/polls/{poll_id}/options", json={"label": "late"})).status_code == 409
+
+
+async def test_archiving_a_legacy_poll_keeps_its_winner_first(client):
+    poll_id, users, options = await revealed_poll(client, [9, 5])
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(OptionResult).where(OptionResult.poll_id == poll_id))
+        await db.commit()
+    # Votes changed after the reveal would now rank the other option first
+    for user_id in users:
+        entries = [{"optionId": options[0], "rating": 0, "veto": False}]
+        assert (await client.put(f"/polls/{poll_id}/vote", json={"userId": user_id, "entries": entries})).status_code == 200
+
+    assert await archive_polls([poll_id]) == 1
+    invalidate_poll(poll_id)
+    results = (await client.get(f"/polls/{poll_id}/results")).json()
+    assert results["winner"]["id"] == options[0]
+    assert [(option["id"], option["rank"]) for option in results["options"]] == [(options[0], 1), (options[1], 2)]
@@ -0,0 +1,35 @@
+"""Concurrent ballots and the score accumulators."""
+import asyncio
+import random
+
+from app.scoring import SCORING_MODES, check_accumulators, score_options
+
+
+async def test_concurrent_ballots_keep_accumulators_consistent(client, db):
+    users = [(await client.post("/users", json={"name": f"voter-{index}"})).json()["userId"] for index in range(8)]
+    poll_id = (await client.post("/polls", json={"title": "poll"})).json()["pollId"]
+    options = [
+        (await client.post(f"/polls/{poll_id}/options", json={"label": f"option-{index}"})).json()["id"]
+        for index in range(6)
+    ]
+    for user_id in users:
+        assert (await client.post(f"/polls/{poll_id}/join", json={"userId": user_id})).status_code == 200
+
+    rng = random.Random(3)
+
+    def ballot(user_id):
+        return {"userId": user_id, "entries": [
+            {"optionId": option_id, "rating": rng.choice([None, 0, 4, 7, 10]), "veto": rng.random() < 0.05}
+            for option_id in options
+        ]}
+
+    # Every voter sends several ballots at once, overlapping with everyone else's
+    responses = await asyncio.gather(*(
+        client.put(f"/polls/{poll_id}/vote", json=ballot(user_id))
+        for _ in range(4) for user_id in users
+    ))
+    assert [response.status_code for response in responses] == [200] * len(responses)
+
+    assert check_accumulators(poll_id, db) == []
+    scores = {mode: score_options(poll_id, db, mode) for mode in SCORING_MODES}
+    assert scores["incremental"] == scores["python"] == scores["sql"]
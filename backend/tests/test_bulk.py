@@ -0,0 +1,43 @@
+"""Bulk CSV/NDJSON import."""
+import pytest
+
+from app.bulk import InvalidImport, read_records
+
+
+async def chunked(text, size):
+    data = text.encode()
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def records(text, fmt="csv", size=3):
+    return [record async for record in read_records(chunked(text, size), fmt)]
+
+
+async def test_csv_fields_may_span_lines():
+    text = (
+        'poll,title,label\r\n'
+        'new,"Movies,\r\n night",5" screen\r\n'
+        '\r\n'
+        'new,,"multi\nline, ""quoted"""\n'
+        'new,,\n'
+    )
+    assert await records(text) == [
+        (2, {"poll": "new", "title": "Movies,\r\n night", "label": '5" screen'}),
+        (5, {"poll": "new", "title": "", "label": 'multi\nline, "quoted"'}),
+        (7, {"poll": "new", "title": "", "label": ""}),
+    ]
+
+
+async def test_unterminated_csv_quote_is_rejected():
+    with pytest.raises(InvalidImport, match="Line 2: unterminated quoted field"):
+        await records('poll,label\nnew,"open\nstill open\n')
+
+
+async def test_csv_import_keeps_multiline_labels(client):
+    body = 'poll,title,label\nnew,Poll,"first\nline"\nnew,,second\n'
+    response = await client.post("/polls/import", content=body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200, response.text
+    poll_id = response.json()["polls"]["new"]
+    labels = [option["label"] for option in (await client.get(f"/polls/{poll_id}/options")).json()]
+    assert labels == ["first\nline", "second"]
@@ -0,0 +1,99 @@
+"""Deleting polls in the background."""
+import asyncio
+
+from sqlalchemy import func, select
+
+from app import deletion
+from app.database import AsyncSessionLocal
+from app.models import Option, Poll, Vote
+
+
+async def test_deleted_poll_is_hidden_and_its_rows_removed(client, monkeypatch):
+    poll_id = (await client.post("/polls", json={"title": "poll"})).json()["pollId"]
+    for index in range(3):
+        await client.post(f"/polls/{poll_id}/options", json={"label": f"option-{index}"})
+
+    # Hold the background cleanup until the worker shuts down
+    started = asyncio.Event()
+    cancelled = []
+
+    async def slow_purge(poll_id):
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(poll_id)
+            raise
+
+    monkeypatch.setattr(deletion, "purge_deleted_poll", slow_purge)
+    assert (await client.delete(f"/polls/{poll_id}")).status_code == 200
+    assert (await client.get(f"/polls/{poll_id}/status")).status_code == 404
+    await asyncio.wait_for(started.wait(), 5)
+
+    # Shutting down cancels the cleanup and waits for it...
+    await deletion.stop_purges()
+    assert cancelled == [poll_id]
+    assert not deletion._tasks
+
+    # ...and the next worker to start finishes it
+    monkeypatch.undo()
+    await deletion.resume_purges()
+    async with AsyncSessionLocal() as db:
+        assert await db.get(Poll, poll_id) is None
+        assert await db.scalar(select(func.count()).select_from(Option).where(Option.poll_id == poll_id)) == 0
+
+
+async def test_only_one_worker_purges_a_poll(client, monkeypatch):
+    poll_id = (await client.post("/polls", json={"title": "poll"})).json()["pollId"]
+    monkeypatch.setattr("app.main.schedule_purge", lambda poll_id: None)
+    assert (await client.delete(f"/polls/{poll_id}")).status_code == 200
+
+    async with AsyncSessionLocal() as db:
+        assert await deletion.claim_purge(db, poll_id)
+        assert not await deletion.claim_purge(db, poll_id)
+    # Another worker starting now leaves the claimed poll alone
+    assert not await deletion.purge_deleted_poll(poll_id)
+    await deletion.resume_purges()
+    async with AsyncSessionLocal() as db:
+        assert await db.get(Poll, poll_id) is not None
+
+    # A claim its worker stopped renewing lapses
+    monkeypatch.setattr(deletion, "DELETE_CLAIM_TIMEOUT", 0)
+    await deletion.resume_purges()
+    async with AsyncSessionLocal() as db:
+        assert await db.get(Poll, poll_id) is None
+
+
+async def test_ballots_for_a_deleted_poll_are_rejected(client, monkeypatch):
+    monkeypatch.setattr("app.main.schedule_purge", lambda poll_id: None)
+    user_id = (await client.post("/users", json={"name": "voter"})).json()["userId"]
+    poll_id = (await client.post("/polls", json={"title": "poll"})).json()["pollId"]
+    option_id = (await client.post(f"/polls/{poll_id}/options", json={"label": "option"})).json()["id"]
+    await client.post(f"/polls/{poll_id}/join", json={"userId": user_id})
+    assert (await client.delete(f"/polls/{poll_id}")).status_code == 200
+
+    entries = [{"optionId": option_id, "rating": 7, "veto": False}]
+    assert (await client.put(f"/polls/{poll_id}/vote", json={"userId": user_id, "entries": entries})).status_code == 404
+    assert (await client.post(f"/polls/{poll_id}/options", json={"label": "late"})).status_code == 404
+    assert (await client.post(f"/polls/{poll_id}/join", json={"userId": user_id})).status_code == 404
+    assert await deletion.purge_deleted_poll(poll_id)
+
+
+async def test_ballots_racing_a_delete_leave_no_rows_behind(client):
+    users = [(await client.post("/users", json={"name": f"voter-{index}"})).json()["userId"] for index in range(8)]
+    poll_id = (await client.post("/polls", json={"title": "poll"})).json()["pollId"]
+    option_id = (await client.post(f"/polls/{poll_id}/options", json={"label": "option"})).json()["id"]
+    for user_id in users:
+        await client.post(f"/polls/{poll_id}/join", json={"userId": user_id})
+
+    entries = [{"optionId": option_id, "rating": 7, "veto": False}]
+    responses = await asyncio.gather(
+        *(client.put(f"/polls/{poll_id}/vote", json={"userId": user_id, "entries": entries}) for user_id in users[:4]),
+        client.delete(f"/polls/{poll_id}"),
+        *(client.put(f"/polls/{poll_id}/vote", json={"userId": user_id, "entries": entries}) for user_id in users[4:]),
+    )
+    assert {response.status_code for response in responses} <= {200, 404}
+    await asyncio.gather(*deletion._tasks)
+    async with AsyncSessionLocal() as db:
+        assert await db.get(Poll, poll_id) is None
+        assert await db.scalar(select(func.count()).select_from(Vote).where(Vote.poll_id == poll_id)) == 0
@@ -0,0 +1,122 @@
+"""ETags, 304 responses and the read caches behind them."""
+import asyncio
+
+from app.cache import MISSING, TTLCache, invalidate_poll, options_cache, results_cache, status_cache
+
+
+async def etag_of(client, path):
+    response = await client.get(path)
+    assert response.status_code == 200
+    return response.headers["etag"]
+
+
+async def assert_changed(client, path, etag):
+    """The read no longer matches etag: a full 200 with a new ETag, never a 304."""
+    response = await client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 200, path
+    assert response.headers["etag"] != etag
+    return response.headers["etag"]
+
+
+async def test_matching_if_none_match_gets_304(client):
+    poll_id = (await client.post("/polls", json={"title": "poll"})).json()["pollId"]
+    for path in ("/polls", f"/polls/{poll_id}/status", f"/polls/{poll_id}/options"):
+        etag = await etag_of(client, path)
+        response = await client.get(path, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+        # Weak and listed validators match too
+        assert (await client.get(path, headers={"If-None-Match": f'"nope", W/{etag}'})).status_code == 304
+        assert (await client.get(path, headers={"If-None-Match": '"nope"'})).status_code == 200
+
+
+async def test_etags_change_after_every_write(client):
+    users = [(await client.post("/users", json={"name": f"voter-{index}"})).json()["userId"] for index in range(2)]
+    list_etag = await etag_of(client, "/polls")
+
+    poll_id = (await client.post("/polls", json={"title": "poll"})).json()["pollId"]
+    list_etag = await assert_changed(client, "/polls", list_etag)
+    status = f"/polls/{poll_id}/status"
+    options = f"/polls/{poll_id}/options"
+    # Read both first, so the cached entries are what a stale 304 would come from
+    status_etag = await etag_of(client, status)
+    options_etag = await etag_of(client, options)
+
+    option_id = (await client.post(f"/polls/{poll_id}/options", json={"label": "option"})).json()["id"]
+    status_etag = await assert_changed(client, status, status_etag)
+    options_etag = await assert_changed(client, options, options_etag)
+
+    for user_id in users:
+        await client.post(f"/polls/{poll_id}/join", json={"userId": user_id})
+    status_etag = await assert_changed(client, status, status_etag)
+
+    entries = [{"optionId": option_id, "rating": 8, "veto": False}]
+    for user_id in users:
+        assert (await client.put(f"/polls/{poll_id}/vote", json={"userId": user_id, "entries": entries})).status_code == 200
+    assert (await client.post(f"/polls/{poll_id}/ready", json={"userId": users[0]})).status_code == 200
+    status_etag = await assert_changed(client, status, status_etag)
+    # A vote that resets the voter's ready flag changes the status
+    assert (await client.put(f"/polls/{poll_id}/vote", json={"userId": users[0], "entries": entries})).status_code == 200
+    status_etag = await assert_changed(client, status, status_etag)
+
+    # Readying the last participant reveals the poll
+    for user_id in users:
+        assert (await client.post(f"/polls/{poll_id}/ready", json={"userId": user_id})).status_code == 200
+    assert (await client.get(status)).json()["winner"]["id"] == option_id
+    status_etag = await assert_changed(client, status, status_etag)
+    list_etag = await assert_changed(client, "/polls", list_etag)
+
+    assert (await client.delete(f"/polls/{poll_id}")).status_code == 200
+    await assert_changed(client, "/polls", list_etag)
+    assert (await client.get(status, headers={"If-None-Match": status_etag})).status_code == 404
+    # Options of an unknown poll read as an empty list, never as the cached one
+    response = await client.get(options, headers={"If-None-Match": options_etag})
+    assert (response.status_code, response.json()) == (200, [])
+
+
+async def test_invalidate_poll_drops_every_cached_read(client):
+    poll_id = (await client.post("/polls", json={"title": "poll"})).json()["pollId"]
+    await client.get(f"/polls/{poll_id}/status")
+    await client.get(f"/polls/{poll_id}/options")
+    results_cache.set(poll_id, (0, "results"))
+    assert all(cache.get(poll_id) is not MISSING for cache in (status_cache, options_cache, results_cache))
+
+    invalidate_poll(poll_id)
+    assert all(cache.get(poll_id) is MISSING for cache in (status_cache, options_cache, results_cache))
+
+
+async def test_writes_invalidate_the_cache(client):
+    poll_id = (await client.post("/polls", json={"title": "poll"})).json()["pollId"]
+    await client.get(f"/polls/{poll_id}/options")
+    assert options_cache.get(poll_id) is not MISSING
+    await client.post(f"/polls/{poll_id}/options", json={"label": "option"})
+    assert options_cache.get(poll_id) is MISSING
+    assert [option["label"] for option in (await client.get(f"/polls/{poll_id}/options")).json()] == ["option"]
+
+
+async def test_load_racing_an_invalidation_is_not_cached():
+    cache = TTLCache("test", max_entries=10, ttl=60)
+    loading = asyncio.Event()
+    release = asyncio.Event()
+
+    async def loader():
+        loading.set()
+        await release.wait()
+        return "before the write"
+
+    load = asyncio.create_task(cache.get_or_load("poll", loader))
+    await loading.wait()
+    cache.invalidate("poll")  # a write lands while the old state is loading
+    release.set()
+    assert await load == "before the write"
+    assert cache.get("poll") is MISSING
+
+    assert await cache.get_or_load("poll", _value("after the write")) == "after the write"
+    assert cache.get("poll") == "after the write"
+
+
+def _value(value):
+    async def loader():
+        return value
+    return loader
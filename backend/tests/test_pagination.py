@@ -0,0 +1,90 @@
+"""Keyset pagination of GET /polls."""
+from datetime import datetime
+
+import pytest
+
+from app.database import engine
+from app.models import Poll, User
+from app.pagination import poll_query
+
+
+async def list_all(client, **params):
+    """Page through GET /polls, returning every poll ID and the number of pages."""
+    poll_ids = []
+    pages = 0
+    cursor = None
+    while True:
+        response = await client.get("/polls", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        poll_ids += [poll["pollId"] for poll in response.json()]
+        pages += 1
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return poll_ids, pages
+
+
+async def new_creator(client):
+    return (await client.post("/users", json={"name": "creator"})).json()["userId"]
+
+
+async def test_cursor_round_trip(client):
+    creator_id = await new_creator(client)
+    created = [
+        (await client.post("/polls", json={"title": f"poll-{index}", "creator_id": creator_id})).json()["pollId"]
+        for index in range(7)
+    ]
+    everything, pages = await list_all(client, creator_id=creator_id, limit=100)
+    assert pages == 1
+    assert sorted(everything) == sorted(created)
+
+    paged, pages = await list_all(client, creator_id=creator_id, limit=2)
+    assert paged == everything
+    assert pages == 4
+
+
+async def test_equal_created_at_is_ordered_by_id(client, db):
+    creator = User(name="creator")
+    db.add(creator)
+    db.flush()
+    same_time = datetime(2020, 2, 2, 12, 0, 0)
+    polls = [Poll(title=f"poll-{index}", creator_id=creator.id, created_at=same_time) for index in range(5)]
+    db.add_all(polls)
+    db.commit()
+
+    paged, pages = await list_all(client, creator_id=creator.id, limit=1)
+    assert paged == sorted((poll.id for poll in polls), reverse=True)
+    assert pages == 5
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "W10", "WyJub3QgYSBkYXRlIiwgIngiXQ"])
+async def test_malformed_cursor_is_rejected(client, cursor):
+    response = await client.get("/polls", params={"cursor": cursor})
+    assert response.status_code == 400
+
+
+async def test_filtered_pages(client):
+    creator_id = await new_creator(client)
+    princess = set()
+    regular = set()
+    for index in range(6):
+        princess_mode = index % 3 == 0
+        poll_id = (await client.post("/polls", json={
+            "title": f"poll-{index}", "creator_id": creator_id, "princess_mode": princess_mode,
+        })).json()["pollId"]
+        (princess if princess_mode else regular).add(poll_id)
+
+    paged, _ = await list_all(client, creator_id=creator_id, princess_mode="true", limit=1)
+    assert set(paged) == princess and len(paged) == len(princess)
+    paged, _ = await list_all(client, creator_id=creator_id, princess_mode="false", limit=3)
+    assert set(paged) == regular and len(paged) == len(regular)
+    paged, _ = await list_all(client, creator_id=creator_id, status="revealed", limit=3)
+    assert paged == []
+
+
+@pytest.mark.skipif(engine.dialect.name != "sqlite", reason="SQLite query plan")
+@pytest.mark.parametrize("princess_mode, index", [(True, "ix_polls_princess_created"), (False, "ix_polls_regular_created")])
+def test_princess_mode_filters_use_their_partial_index(db, princess_mode, index):
+    query = poll_query(princess_mode=princess_mode).limit(10)
+    compiled = query.compile(engine)
+    plan = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), tuple(compiled.params.values())).all()
+    assert any(index in row[-1] for row in plan), plan
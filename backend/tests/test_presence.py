@@ -0,0 +1,95 @@
+"""Presence announcements between workers."""
+import asyncio
+import json
+
+from app import websocket
+from app.pubsub import BroadcastBackend
+from app.websocket import EPOCH, PRESENCE_TARGET, ConnectionManager
+
+
+class RecordingBackend(BroadcastBackend):
+    """Records published payloads and delivers presence announcements back to one manager."""
+
+    def __init__(self):
+        self.payloads = []
+        self.manager = None
+
+    async def publish(self, payload):
+        self.payloads.append(payload)
+        target, frame = payload.split("\n", 1)
+        if target == PRESENCE_TARGET:
+            await self.manager.apply_presence(json.loads(frame))
+
+    def announcements(self):
+        return [json.loads(payload.split("\n", 1)[1]) for payload in self.payloads]
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame):
+        self.frames.append(json.loads(frame))
+
+    async def close(self, code=1000):
+        pass
+
+
+def presence_manager():
+    backend = RecordingBackend()
+    manager = backend.manager = ConnectionManager(backend)
+    return manager, backend
+
+
+async def wait_until(condition, timeout=5.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition never became true")
+
+
+async def test_counts_of_a_silent_worker_expire(monkeypatch):
+    monkeypatch.setattr(websocket, "PRESENCE_WINDOW", 0)
+    monkeypatch.setattr(websocket, "PRESENCE_HEARTBEAT", 0.02)
+    manager, _ = presence_manager()
+    socket = FakeWebSocket()
+    await manager.connect(socket, "poll-1", user_id="local-user")
+    await manager.apply_presence({"worker": "crashed", "polls": {"poll-1": 2}})
+    await manager.start_presence()
+    try:
+        await wait_until(lambda: manager.online("poll-1") == 3)
+        # The crashed worker never announces again; this worker's heartbeat keeps its own count
+        await wait_until(lambda: manager.online("poll-1") == 1)
+        assert "crashed" not in manager.worker_seen
+        await wait_until(lambda: socket.frames[-1]["type"] == "presence" and socket.frames[-1]["online"] == 1)
+    finally:
+        await manager.withdraw_presence()
+        manager.disconnect(socket, "poll-1")
+    assert manager.online("poll-1") == 0
+
+
+async def test_full_announcement_replaces_a_workers_counts():
+    manager, _ = presence_manager()
+    await manager.apply_presence({"worker": "other", "polls": {"poll-1": 2, "poll-2": 1}})
+    # A missed delta (poll-2 emptied) is corrected by the next heartbeat
+    await manager.apply_presence({"worker": "other", "polls": {"poll-1": 3}, "full": True})
+    assert manager.online("poll-1") == 3
+    assert manager.online("poll-2") == 0
+
+
+async def test_hello_gets_a_full_announcement(monkeypatch):
+    monkeypatch.setattr(websocket, "PRESENCE_WINDOW", 3600)
+    manager, backend = presence_manager()
+    socket = FakeWebSocket()
+    await manager.connect(socket, "poll-1", user_id="local-user")
+    try:
+        await manager.apply_presence({"worker": "newcomer", "hello": True})
+        assert backend.announcements() == [{"worker": EPOCH, "polls": {"poll-1": 1}, "full": True}]
+        assert manager.online("poll-1") == 1
+    finally:
+        await manager.withdraw_presence()
+        manager.disconnect(socket, "poll-1")
@@ -0,0 +1,378 @@
+"""Broadcast backends, against a local fake Redis-protocol server and fake asyncpg connections."""
+import asyncio
+
+import asyncpg
+import pytest
+
+from app import websocket
+from app.pubsub import (
+    CHANNEL, NOTIFY_MAX_BYTES, PostgresBackend, RedisBackend, RedisProtocolError, create_backend,
+    split_payload,
+)
+
+
+class FakeRedisServer:
+    """
+    Just enough of a Redis server for PUBLISH/SUBSCRIBE: AUTH, PING,
+    SUBSCRIBE and PUBLISH, parsed and answered independently of app.pubsub.
+    """
+
+    def __init__(self, password=None):
+        self.password = password
+        self.subscribers = {}  # channel -> set of writers
+        self.connections = set()
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return self
+
+    @property
+    def url(self):
+        port = self.server.sockets[0].getsockname()[1]
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}127.0.0.1:{port}"
+
+    async def stop(self):
+        self.drop_connections()
+        self.server.close()
+        await self.server.wait_closed()
+
+    def drop_connections(self):
+        for writer in list(self.connections):
+            writer.close()
+        self.connections.clear()
+        self.subscribers.clear()
+
+    @staticmethod
+    async def _read_command(reader):
+        header = await reader.readuntil(b"\r\n")
+        assert header[:1] == b"*", header
+        args = []
+        for _ in range(int(header[1:-2])):
+            length = await reader.readuntil(b"\r\n")
+            assert length[:1] == b"$", length
+            args.append((await reader.readexactly(int(length[1:-2]) + 2))[:-2])
+        return args
+
+    @staticmethod
+    def _bulk(value: bytes) -> bytes:
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    async def _serve(self, reader, writer):
+        self.connections.add(writer)
+        authed = self.password is None
+        try:
+            while True:
+                name, *args = await self._read_command(reader)
+                name = name.upper()
+                if name == b"AUTH":
+                    authed = args == [self.password.encode()]
+                    writer.write(b"+OK\r\n" if authed else b"-WRONGPASS invalid password\r\n")
+                elif not authed:
+                    writer.write(b"-NOAUTH Authentication required.\r\n")
+                elif name == b"PING":
+                    writer.write(b"+PONG\r\n")
+                elif name == b"SUBSCRIBE":
+                    for count, channel in enumerate(args, 1):
+                        self.subscribers.setdefault(channel, set()).add(writer)
+                        writer.write(b"*3\r\n" + self._bulk(b"subscribe") + self._bulk(channel) + b":%d\r\n" % count)
+                elif name == b"PUBLISH":
+                    channel, message = args
+                    receivers = self.subscribers.get(channel, set())
+                    for receiver in receivers:
+                        receiver.write(b"*3\r\n" + self._bulk(b"message") + self._bulk(channel) + self._bulk(message))
+                    writer.write(b":%d\r\n" % len(receivers))
+                else:
+                    writer.write(b"-ERR unknown command\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            for receivers in self.subscribers.values():
+                receivers.discard(writer)
+            writer.close()
+
+
+class Inbox:
+    """Collects delivered payloads and waits for them."""
+
+    def __init__(self):
+        self.payloads = []
+        self._changed = asyncio.Event()
+
+    async def __call__(self, payload):
+        self.payloads.append(payload)
+        self._changed.set()
+
+    async def wait_for(self, count, timeout=5.0):
+        async def wait():
+            while len(self.payloads) < count:
+                self._changed.clear()
+                await self._changed.wait()
+        await asyncio.wait_for(wait(), timeout)
+        return self.payloads
+
+
+@pytest.fixture
+async def redis_server():
+    server = await FakeRedisServer().start()
+    yield server
+    await server.stop()
+
+
+async def test_redis_fans_out_to_every_worker(redis_server):
+    workers = [create_backend(redis_server.url) for _ in range(2)]
+    inboxes = [Inbox() for _ in workers]
+    for worker, inbox in zip(workers, inboxes):
+        await worker.connect(inbox)
+    try:
+        await workers[0].publish("poll-1\n{\"type\":\"a\"}")
+        await workers[1].publish("home\n{\"type\":\"b\"}")
+        for inbox in inboxes:
+            assert await inbox.wait_for(2) == ["poll-1\n{\"type\":\"a\"}", "home\n{\"type\":\"b\"}"]
+    finally:
+        for worker in workers:
+            await worker.disconnect()
+
+
+async def test_redis_authenticates():
+    server = await FakeRedisServer(password="secret").start()
+    try:
+        worker = RedisBackend(server.url)
+        inbox = Inbox()
+        await worker.connect(inbox)
+        await worker.publish("home\n{}")
+        assert await inbox.wait_for(1) == ["home\n{}"]
+        await worker.disconnect()
+
+        with pytest.raises(RedisProtocolError):
+            await RedisBackend(server.url.replace("secret", "wrong")).connect(inbox)
+    finally:
+        await server.stop()
+
+
+async def test_redis_carries_large_payloads(redis_server):
+    worker = RedisBackend(redis_server.url)
+    inbox = Inbox()
+    await worker.connect(inbox)
+    try:
+        payload = "poll-1\n" + "é€option\r\n" * 20000
+        await worker.publish(payload)
+        assert await inbox.wait_for(1) == [payload]
+    finally:
+        await worker.disconnect()
+
+
+async def test_redis_reconnects_after_the_server_drops_connections(redis_server):
+    worker = RedisBackend(redis_server.url)
+    worker.reconnect_delay = 0.01
+    inbox = Inbox()
+    await worker.connect(inbox)
+    try:
+        redis_server.drop_connections()
+        # Wait for the subscription to come back, then publish on a reconnected publisher
+        for _ in range(500):
+            if redis_server.subscribers.get(CHANNEL.encode()):
+                break
+            await asyncio.sleep(0.01)
+        await worker.publish("home\n{}")
+        assert await inbox.wait_for(1) == ["home\n{}"]
+    finally:
+        await worker.disconnect()
+
+
+class FakeNotifyConnection:
+    """Records pg_notify calls, as a transaction would deliver them."""
+
+    def __init__(self):
+        self.notifications = []
+        self.transactions = 0
+
+    async def execute(self, query, channel, payload):
+        assert channel == CHANNEL
+        assert len(payload.encode()) <= NOTIFY_MAX_BYTES
+        self.notifications.append(payload)
+
+    def transaction(self):
+        connection = self
+
+        class Transaction:
+            async def __aenter__(self):
+                connection.transactions += 1
+
+            async def __aexit__(self, *exc_info):
+                return False
+
+        return Transaction()
+
+
+async def test_postgres_splits_payloads_over_the_notify_limit():
+    backend = PostgresBackend("postgresql://localhost/themis")
+    backend._publish_conn = FakeNotifyConnection()
+    inbox = Inbox()
+    backend._on_message = inbox
+
+    small = "poll-1\n{\"type\":\"ready_count\"}"
+    large = "home\n" + "".join(f"{index}:€é😀," for index in range(5000))
+    await backend.publish(small)
+    await backend.publish(large)
+    notifications = backend._publish_conn.notifications
+    assert notifications[0] == small
+    assert len(notifications) > 3
+    assert backend._publish_conn.transactions == 1
+
+    # Another worker's event may arrive between two transactions' chunks
+    for payload in notifications[1:3] + [small] + notifications[3:]:
+        backend._notified(None, 0, CHANNEL, payload)
+    assert await inbox.wait_for(2) == [small, large]
+    assert not backend._pending
+
+
+class FakePostgres:
+    """
+    Hands out fake asyncpg connections that deliver pg_notify to every
+    listening connection, and can kill them like pg_terminate_backend.
+    """
+
+    def __init__(self):
+        self.connections = []
+        self.refuse = 0  # connection attempts to fail next
+
+    async def connect(self, dsn):
+        if self.refuse:
+            self.refuse -= 1
+            raise ConnectionRefusedError("server starting up")
+        connection = FakePgConnection(self)
+        self.connections.append(connection)
+        return connection
+
+    def listening(self):
+        return [connection for connection in self.connections if connection.listeners and not connection.closed]
+
+    def notify(self, channel, payload):
+        for connection in self.listening():
+            for callback in connection.listeners.get(channel, ()):
+                callback(connection, 0, channel, payload)
+
+    def kill_all(self):
+        for connection in self.connections:
+            connection.kill()
+
+
+class FakePgConnection:
+    def __init__(self, server):
+        self.server = server
+        self.listeners = {}
+        self.termination_listeners = []
+        self.closed = False
+        self.stale = False  # dropped without the client noticing
+
+    async def execute(self, query, *args):
+        if self.closed:
+            raise asyncpg.ConnectionDoesNotExistError("connection was closed in the middle of operation")
+        if self.stale:
+            await asyncio.sleep(3600)
+        if query.startswith("SELECT pg_notify"):
+            self.server.notify(*args)
+
+    async def add_listener(self, channel, callback):
+        self.listeners.setdefault(channel, []).append(callback)
+
+    async def remove_listener(self, channel, callback):
+        self.listeners[channel].remove(callback)
+
+    def add_termination_listener(self, callback):
+        self.termination_listeners.append(callback)
+
+    def remove_termination_listener(self, callback):
+        self.termination_listeners.remove(callback)
+
+    def is_closed(self):
+        return self.closed
+
+    def terminate(self):
+        self.closed = True
+
+    async def close(self):
+        self.closed = True
+
+    def kill(self):
+        if not self.closed:
+            self.closed = True
+            for callback in list(self.termination_listeners):
+                callback(self)
+
+
+async def wait_until(condition, timeout=5.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition never became true")
+
+
+@pytest.fixture
+def postgres(monkeypatch):
+    server = FakePostgres()
+    monkeypatch.setattr(asyncpg, "connect", server.connect)
+    return server
+
+
+async def test_postgres_reconnects_after_its_connections_are_killed(postgres):
+    worker = PostgresBackend("postgresql://localhost/themis")
+    worker.reconnect_delay = 0.01
+    inbox = Inbox()
+    await worker.connect(inbox)
+    try:
+        listen_conn = worker._listen_conn
+        postgres.refuse = 2
+        postgres.kill_all()
+        # Reconnects (backing off past the refused attempts) and listens again
+        await wait_until(lambda: postgres.listening())
+        assert worker._listen_conn is not listen_conn
+        assert postgres.refuse == 0
+        # The publish connection died too; publishing reopens it instead of failing
+        await worker.publish("home\n{}")
+        assert await inbox.wait_for(1) == ["home\n{}"]
+        assert not worker._publish_conn.closed
+    finally:
+        await worker.disconnect()
+    assert all(connection.closed for connection in postgres.connections)
+
+
+async def test_postgres_health_check_replaces_a_silently_dropped_listener(postgres):
+    worker = PostgresBackend("postgresql://localhost/themis")
+    worker.reconnect_delay = 0.01
+    worker.health_check_interval = 0.05
+    inbox = Inbox()
+    await worker.connect(inbox)
+    try:
+        listen_conn = worker._listen_conn
+        listen_conn.stale = True
+        listen_conn.listeners.clear()  # notifications no longer arrive
+        await wait_until(lambda: postgres.listening())
+        assert listen_conn.closed
+        await worker.publish("home\n{}")
+        assert await inbox.wait_for(1) == ["home\n{}"]
+    finally:
+        await worker.disconnect()
+
+
+def test_split_payload_keeps_characters_whole():
+    payload = "aé€😀" * 1000
+    pieces = split_payload(payload, 7)
+    assert "".join(pieces) == payload
+    assert all(0 < len(piece.encode()) <= 7 for piece in pieces)
+
+
+async def test_publish_failure_still_reaches_local_sockets(monkeypatch):
+    class BrokenBackend:
+        async def publish(self, payload):
+            raise ConnectionError("backend down")
+
+    delivered = Inbox()
+    monkeypatch.setattr(websocket, "dispatch", delivered)
+    await websocket.publish(BrokenBackend(), "poll-1", {"type": "option_added"})
+    assert await delivered.wait_for(1) == ["poll-1\n" + websocket.encode_message({"type": "option_added"})]
@@ -0,0 +1,76 @@
+"""Stored results and GET /polls/{id}/results."""
+from sqlalchemy import delete
+
+from app.cache import invalidate_poll
+from app.database import AsyncSessionLocal
+from app.models import OptionResult
+from app.results import rebuild_results, winner_first
+
+
+async def revealed_poll(client, ratings):
+    """A poll with one option per rating, rated by two voters and revealed."""
+    users = [(await client.post("/users", json={"name": f"voter-{index}"})).json()["userId"] for index in range(2)]
+    poll_id = (await client.post("/polls", json={"title": "poll"})).json()["pollId"]
+    options = [
+        (await client.post(f"/polls/{poll_id}/options", json={"label": f"option-{index}"})).json()["id"]
+        for index in range(len(ratings))
+    ]
+    for user_id in users:
+        await client.post(f"/polls/{poll_id}/join", json={"userId": user_id})
+    for user_id in users:
+        entries = [{"optionId": option_id, "rating": rating, "veto": False} for option_id, rating in zip(options, ratings)]
+        assert (await client.post(f"/polls/{poll_id}/submit", json={"userId": user_id, "entries": entries})).status_code == 200
+    assert (await client.get(f"/polls/{poll_id}/status")).json()["winner"]["id"] == options[0]
+    return poll_id, users, options
+
+
+def test_winner_first_moves_the_stored_winner_up():
+    results = [
+        {"option_id": "a", "rank": 1},
+        {"option_id": "b", "rank": 2},
+        {"option_id": "c", "rank": 3},
+        {"option_id": "d", "rank": None},
+    ]
+    assert [(result["option_id"], result["rank"]) for result in winner_first(results, "c")] == [
+        ("c", 1), ("a", 2), ("b", 3), ("d", None),
+    ]
+    # A winner that is now vetoed or unrated still comes first
+    results = [{"option_id": "a", "rank": 1}, {"option_id": "d", "rank": None}]
+    assert [(result["option_id"], result["rank"]) for result in winner_first(results, "d")] == [("d", 1), ("a", 2)]
+
+
+async def test_results_are_stored_at_reveal(client):
+    poll_id, _, options = await revealed_poll(client, [9, 5, None])
+    response = await client.get(f"/polls/{poll_id}/results")
+    results = response.json()
+    assert results["winner"]["id"] == options[0]
+    assert [(option["id"], option["rank"]) for option in results["options"]] == [
+        (options[0], 1), (options[1], 2), (options[2], None),
+    ]
+    assert results["options"][2]["num_raters"] == 0
+
+    etag = response.headers["etag"]
+    assert (await client.get(f"/polls/{poll_id}/results", headers={"If-None-Match": etag})).status_code == 304
+
+
+async def test_legacy_poll_falls_back_to_the_stored_winner_and_rebuilds_it_first(client):
+    poll_id, users, options = await revealed_poll(client, [9, 5])
+    # As if revealed before results were stored...
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(OptionResult).where(OptionResult.poll_id == poll_id))
+        await db.commit()
+    invalidate_poll(poll_id)
+    results = (await client.get(f"/polls/{poll_id}/results")).json()
+    assert results == {"winner": {"id": options[0], "label": "option-0"}, "options": []}
+
+    # ...and with votes changed since the reveal
+    for user_id in users:
+        entries = [{"optionId": options[0], "rating": 0, "veto": False}]
+        assert (await client.put(f"/polls/{poll_id}/vote", json={"userId": user_id, "entries": entries})).status_code == 200
+    async with AsyncSessionLocal() as db:
+        assert await rebuild_results(db, poll_id)
+        await db.commit()
+    invalidate_poll(poll_id)
+    results = (await client.get(f"/polls/{poll_id}/results")).json()
+    assert results["winner"]["id"] == options[0]
+    assert [(option["id"], option["rank"]) for option in results["options"]] == [(options[0], 1), (options[1], 2)]
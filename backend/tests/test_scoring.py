@@ -0,0 +1,138 @@
+"""Single-pass scoring against the original per-vote algorithm."""
+import random
+import statistics
+from fractions import Fraction
+
+import pytest
+
+from app.models import Option, Poll, User, Vote
+from app.scoring import SCORING_MODES, compute_winner, empty_histogram, rank_options, score_histogram
+
+
+def old_winner(poll_id, options, exact=False):
+    """
+    compute_winner as it was before single-pass scoring, over in-memory votes.
+
+    options is a list of (option_id, [(rating, veto), ...]) in vote order.
+    The original summed 1.0 / max(rating, 0.1) in floating point, in the
+    order the votes came back from the database, so mathematically equal
+    harmonic means could differ in the last bit depending on that order.
+    exact=True evaluates the same formula in exact arithmetic.
+    """
+    scored_options = []
+    for option_id, votes in options:
+        if any(veto for _, veto in votes):
+            continue
+        valid_ratings = [rating for rating, _ in votes if rating is not None]
+        if not valid_ratings:
+            continue
+        if exact:
+            reciprocal_sum = sum(1 / Fraction(max(rating, Fraction(1, 10))) for rating in valid_ratings)
+        else:
+            reciprocal_sum = sum(1.0 / max(rating, 0.1) for rating in valid_ratings)
+        scored_options.append({
+            "option_id": option_id,
+            "score": len(valid_ratings) / reciprocal_sum,
+            "variance": statistics.variance(valid_ratings) if len(valid_ratings) > 1 else 0.0,
+            "median": statistics.median(valid_ratings),
+            "num_raters": len(valid_ratings),
+        })
+    if not scored_options:
+        return None
+
+    random.seed(poll_id)
+    scored_options.sort(key=lambda x: (-x["score"], x["variance"], -x["median"], -x["num_raters"], random.random()))
+    return scored_options[0]["option_id"]
+
+
+def new_winner(poll_id, options):
+    """The current scoring path over the same in-memory votes."""
+    scored_options = []
+    for option_id, votes in options:
+        if any(veto for _, veto in votes):
+            continue
+        histogram = empty_histogram()
+        for rating, _ in votes:
+            if rating is not None:
+                histogram[rating] += 1
+        scored = score_histogram(option_id, histogram)
+        if scored is not None:
+            scored_options.append(scored)
+    ranked = rank_options(poll_id, scored_options)
+    return ranked[0]["option_id"] if ranked else None
+
+
+def random_poll(rng):
+    """Options with votes drawn so that equal scores (and equal tie-breakers) are common."""
+    options = []
+    for index in range(rng.randint(1, 6)):
+        if rng.random() < 0.4:
+            # Unanimous ratings: the same harmonic mean whatever the number of raters
+            votes = [(rng.choice([0, 3, 7, 10]), False)] * rng.randint(1, 12)
+        else:
+            votes = [
+                (rng.choice([None, 0, 1, 3, 5, 7, 9, 10]), rng.random() < 0.03)
+                for _ in range(rng.randint(0, 10))
+            ]
+        options.append((f"option-{index}", votes))
+    return options
+
+
+def test_matches_old_algorithm():
+    rng = random.Random(20240101)
+    for poll in range(20000):
+        poll_id = f"poll-{poll}"
+        options = random_poll(rng)
+        assert new_winner(poll_id, options) == old_winner(poll_id, options, exact=True), options
+
+
+def test_matches_old_float_algorithm_without_score_ties():
+    # Rounding only matters when two options have exactly the same score
+    rng = random.Random(7)
+    compared = 0
+    for poll in range(20000):
+        poll_id = f"poll-{poll}"
+        options = random_poll(rng)
+        scores = [
+            Fraction(len(ratings)) / sum(1 / Fraction(max(rating, Fraction(1, 10))) for rating in ratings)
+            for ratings in (
+                [rating for rating, _ in votes if rating is not None]
+                for _, votes in options if not any(veto for _, veto in votes)
+            )
+            if ratings
+        ]
+        if len(scores) != len(set(scores)):
+            continue
+        compared += 1
+        assert new_winner(poll_id, options) == old_winner(poll_id, options), options
+    assert compared > 10000
+
+
+def test_equal_scores_fall_through_to_tie_breakers():
+    # 9 x 7 and 4 x 7 both score 7; more raters wins
+    options = [("four", [(7, False)] * 4), ("nine", [(7, False)] * 9)]
+    assert new_winner("poll", options) == "nine"
+    assert new_winner("poll", list(reversed(options))) == "nine"
+
+
+@pytest.mark.parametrize("mode", SCORING_MODES)
+def test_scoring_modes_match_old_algorithm(db, mode):
+    rng = random.Random(11)
+    voters = [User(name=f"voter-{index}") for index in range(12)]
+    db.add_all(voters)
+    for _ in range(30):
+        poll = Poll(title="poll")
+        db.add(poll)
+        db.flush()
+        options = []
+        for index, (_, votes) in enumerate(random_poll(rng)):
+            option = Option(poll_id=poll.id, label=f"option-{index}")
+            db.add(option)
+            db.flush()
+            options.append((option.id, votes))
+            for voter, (rating, veto) in enumerate(votes):
+                db.add(Vote(poll_id=poll.id, option_id=option.id, user_id=voters[voter].id,
+                            rating=None if veto else rating, veto=veto))
+        db.flush()
+        assert compute_winner(poll.id, db, mode) == old_winner(poll.id, options, exact=True)
+    db.rollback()
@@ -0,0 +1,143 @@
+"""WebSocket delivery to clients: slow sockets, snapshots and replay."""
+import asyncio
+import json
+
+import pytest
+
+from app import websocket
+from app.pubsub import MemoryBackend
+from app.websocket import EPOCH, ConnectionManager
+
+
+class FakeWebSocket:
+    """Records frames; a stalled one never finishes sending."""
+
+    def __init__(self, stalled=False):
+        self.stalled = stalled
+        self.frames = []
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame):
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.frames.append(json.loads(frame))
+
+    async def close(self, code=1000):
+        # Starlette awaits the ASGI send here, where a pending cancellation would land
+        await asyncio.sleep(0)
+        self.close_code = code
+
+
+async def test_stalled_socket_is_closed_with_1013(monkeypatch):
+    monkeypatch.setattr(websocket, "SEND_TIMEOUT", 0.01)
+    manager = ConnectionManager(MemoryBackend())
+    socket = FakeWebSocket(stalled=True)
+    await manager.connect(socket, "poll-1")
+    client = manager.active_connections["poll-1"][socket]
+    client.send('{"type":"option_added"}')
+    await asyncio.wait_for(asyncio.shield(client.task), 5)
+    assert socket.close_code == 1013
+    assert "poll-1" not in manager.active_connections
+
+
+async def poll_manager():
+    """A manager whose backend delivers poll events straight back to it."""
+    manager = ConnectionManager(MemoryBackend())
+    await manager.backend.connect(lambda payload: manager.deliver(*payload.split("\n", 1)))
+    return manager
+
+
+async def load_snapshot():
+    return {"options": [], "ready": 0, "participants": 0, "winner": None}
+
+
+async def wait_for_frames(socket, count):
+    for _ in range(500):
+        if len(socket.frames) >= count:
+            return socket.frames
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"got {socket.frames}")
+
+
+async def send_events(manager, poll_id, labels):
+    for label in labels:
+        await manager.send_option_added(poll_id, label, label)
+
+
+async def disconnected_client(manager, poll_id, events):
+    """Connect, receive events, and disconnect; returns the last seq seen."""
+    socket = FakeWebSocket()
+    await manager.connect(socket, poll_id, snapshot=load_snapshot)
+    await send_events(manager, poll_id, events)
+    frames = await wait_for_frames(socket, 1 + len(events))
+    manager.disconnect(socket, poll_id)
+    return frames[-1]["seq"]
+
+
+async def test_in_window_reconnect_replays_exactly_the_missed_frames():
+    manager = await poll_manager()
+    seen = await disconnected_client(manager, "poll-1", ["a", "b"])
+    await send_events(manager, "poll-1", ["c", "d", "e"])
+
+    async def no_snapshot():
+        raise AssertionError("a replay needs no snapshot")
+
+    socket = FakeWebSocket()
+    await manager.connect(socket, "poll-1", snapshot=no_snapshot, since=seen, epoch=EPOCH)
+    frames = await wait_for_frames(socket, 3)
+    await asyncio.sleep(0.05)
+    assert [(frame["type"], frame["option"]["id"]) for frame in socket.frames] == [
+        ("option_added", "c"), ("option_added", "d"), ("option_added", "e"),
+    ]
+    assert [frame["seq"] for frame in frames] == [seen + 1, seen + 2, seen + 3]
+    manager.disconnect(socket, "poll-1")
+
+
+@pytest.mark.parametrize("case", ["out_of_window", "foreign_epoch"])
+async def test_unreplayable_reconnect_gets_a_snapshot_and_resync(monkeypatch, case):
+    monkeypatch.setattr(websocket, "REPLAY_BUFFER_SIZE", 4)
+    manager = await poll_manager()
+    seen = await disconnected_client(manager, "poll-1", ["a"])
+    if case == "out_of_window":
+        await send_events(manager, "poll-1", [str(index) for index in range(10)])
+        epoch = EPOCH
+    else:
+        epoch = "another-worker"
+
+    socket = FakeWebSocket()
+    await manager.connect(socket, "poll-1", snapshot=load_snapshot, since=seen, epoch=epoch)
+    frames = await wait_for_frames(socket, 2)
+    assert frames[0]["type"] == "snapshot" and frames[0]["epoch"] == EPOCH
+    assert frames[1] == {"type": "resync"}
+    # Nothing older than the snapshot is replayed after it
+    await asyncio.sleep(0.05)
+    assert len(socket.frames) == 2
+    manager.disconnect(socket, "poll-1")
+
+
+async def test_coalesced_count_updates_keep_seq_increasing(monkeypatch):
+    monkeypatch.setattr(websocket, "COALESCE_WINDOW", 0.02)
+    manager = await poll_manager()
+    socket = FakeWebSocket()
+    await manager.connect(socket, "poll-1", snapshot=load_snapshot)
+    for ready in range(1, 6):
+        await manager.send_ready_counts("poll-1", ready, 5)
+        await manager.send_participant_joined("poll-1", 5)
+    # Another event flushes the pending counts first, so they stay in order
+    await manager.send_option_added("poll-1", "late", "late")
+    for ready in range(5, 0, -1):
+        await manager.send_ready_counts("poll-1", ready, 5)
+    await asyncio.sleep(0.1)
+
+    frames = socket.frames[1:]
+    assert [frame["type"] for frame in frames] == [
+        "ready_counts", "participant_joined", "option_added", "ready_counts",
+    ]
+    assert [frame["ready"] for frame in frames if frame["type"] == "ready_counts"] == [5, 1]
+    # Snapshot included: strictly increasing
+    seqs = [frame["seq"] for frame in socket.frames]
+    assert seqs == sorted(set(seqs))
+    manager.disconnect(socket, "poll-1")
@@ -36,10 +36,17 @@ export async function createUser(name: string): Promise<User> {
   return response.json()
 }
 
-export async function listPolls(): Promise<Poll[]> {
-  const response = await fetch(`${API_URL}/polls`)
+export interface PollPage {
+  polls: Poll[]
+  nextCursor: string | null
+}
+
+// Polls come a page at a time, newest first; pass nextCursor to get the next page
+export async function listPolls(cursor?: string | null): Promise<PollPage> {
+  const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''
+  const response = await fetch(`${API_URL}/polls${query}`)
   if (!response.ok) throw new Error('Failed to fetch polls')
-  return response.json()
+  return { polls: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') }
 }
 
 export async function createPoll(title: string, creatorId: string, princessMode: boolean = false): Promise<Poll> {
@@ -97,6 +104,16 @@ export async function markReady(pollId: string, userId: string): Promise<{ ready
   return response.json()
 }
 
+export async function submitAndReady(pollId: string, userId: string, entries: VoteEntry[]): Promise<{ readyCount: number; totalParticipants: number }> {
+  const response = await fetch(`${API_URL}/polls/${pollId}/submit`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ userId, entries }),
+  })
+  if (!response.ok) throw new Error('Failed to submit and mark ready')
+  return response.json()
+}
+
 export async function getStatus(pollId: string): Promise<{
   title: string
   readyCount: number
@@ -136,7 +153,12 @@ export async function clonePoll(pollId: string, creatorId: string): Promise<Poll
   return response.json()
 }
 
-export function createWebSocket(pollId: string): WebSocket {
+export interface WebSocketResume {
+  since: number
+  epoch: string
+}
+
+export function createWebSocket(pollId: string, userId: string, resume?: WebSocketResume): WebSocket {
   // Handle both full URLs and protocol-relative URLs
   let wsBase = WS_URL
   if (wsBase.startsWith('http://')) {
@@ -149,7 +171,13 @@ export function createWebSocket(pollId: string): WebSocket {
       ? `ws://${wsBase}` 
       : `wss://${wsBase}`
   }
-  return new WebSocket(`${wsBase}/ws/polls/${pollId}`)
+  // userId counts every tab of a user once in presence events. Resuming
+  // sends only the events missed since the last sequence number seen
+  let query = `?userId=${encodeURIComponent(userId)}`
+  if (resume) {
+    query += `&since=${resume.since}&epoch=${encodeURIComponent(resume.epoch)}`
+  }
+  return new WebSocket(`${wsBase}/ws/polls/${pollId}${query}`)
 }
 
 export function createHomeWebSocket(): WebSocket {
@@ -7,6 +7,8 @@ export default function HomeScreen() {
   const user = useStore((state) => state.user)
   const [polls, setPolls] = useState<Poll[]>([])
   const [loading, setLoading] = useState(true)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [creating, setCreating] = useState(false)
   const [showCreateModal, setShowCreateModal] = useState(false)
   const [newPollTitle, setNewPollTitle] = useState('')
@@ -34,6 +36,9 @@ export default function HomeScreen() {
       } else if (message.type === 'poll_deleted') {
         // Remove deleted poll from the list
         setPolls((prevPolls) => prevPolls.filter(p => p.pollId !== message.pollId))
+      } else if (message.type === 'resync') {
+        // The server dropped events we were too slow to receive; reload the list
+        loadPolls()
       } else if (message.type === 'poll_cloned') {
         // Add cloned poll to the list if it doesn't already exist
         setPolls((prevPolls) => {
@@ -44,6 +49,12 @@ export default function HomeScreen() {
           // Add new poll at the beginning (most recent first)
           return [message.poll, ...prevPolls]
         })
+      } else if (message.type === 'polls_cloned' || message.type === 'polls_created') {
+        // Add a batch of cloned or imported polls, newest first, skipping known ones
+        setPolls((prevPolls) => {
+          const added = message.polls.filter((poll: Poll) => !prevPolls.some(p => p.pollId === poll.pollId))
+          return [...added.reverse(), ...prevPolls]
+        })
       }
     }
     ws.onerror = (error) => {
@@ -60,8 +71,9 @@ export default function HomeScreen() {
 
   const loadPolls = async () => {
     try {
-      const data = await listPolls()
-      setPolls(data)
+      const page = await listPolls()
+      setPolls(page.polls)
+      setNextCursor(page.nextCursor)
     } catch (error) {
       alert('Failed to load polls')
     } finally {
@@ -69,6 +81,24 @@ export default function HomeScreen() {
     }
   }
 
+  const loadMorePolls = async () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    try {
+      const page = await listPolls(nextCursor)
+      // Skip polls already shown, e.g. added over the WebSocket meanwhile
+      setPolls((prevPolls) => [
+        ...prevPolls,
+        ...page.polls.filter((poll) => !prevPolls.some(p => p.pollId === poll.pollId)),
+      ])
+      setNextCursor(page.nextCursor)
+    } catch (error) {
+      alert('Failed to load polls')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleCreatePoll = async () => {
     setShowCreateModal(true)
   }
@@ -408,6 +438,14 @@ export default function HomeScreen() {
           )
         })()}
       </div>
+
+      {nextCursor && (
+        <div style={{ marginTop: '24px', textAlign: 'center' }}>
+          <button onClick={loadMorePolls} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   )
 }
@@ -6,7 +6,7 @@ import {
   listOptions,
   createOption,
   submitVote,
-  markReady,
+  submitAndReady,
   getStatus,
   Option,
   VoteEntry,
@@ -22,6 +22,7 @@ export default function PollScreen() {
   const [votes, setVotes] = useState<Record<string, { rating: number | null; veto: boolean }>>({})
   const [readyCount, setReadyCount] = useState(0)
   const [totalParticipants, setTotalParticipants] = useState(0)
+  const [online, setOnline] = useState(0)
   const [pollTitle, setPollTitle] = useState('')
   const [creatorId, setCreatorId] = useState<string | null>(null)
   const [princessMode, setPrincessMode] = useState(false)
@@ -32,6 +33,10 @@ export default function PollScreen() {
   const previousReadyCountRef = useRef<number>(0)
 
   const wsRef = useRef<WebSocket | null>(null)
+  // Last event sequence number and server epoch, to resume after a reconnect
+  const lastSeqRef = useRef<number | null>(null)
+  const epochRef = useRef<string | null>(null)
+  const closedRef = useRef(false)
   const saveTimeoutRef = useRef<number | null>(null)
 
   useEffect(() => {
@@ -56,16 +61,8 @@ export default function PollScreen() {
         setCreatorId(status.creator_id || null)
         setPrincessMode(status.princess_mode || false)
 
-        // Connect WebSocket
-        const ws = createWebSocket(pollId)
-        ws.onmessage = (event) => {
-          const message = JSON.parse(event.data)
-          handleWebSocketMessage(message)
-        }
-        ws.onerror = (error) => {
-          console.error('WebSocket error:', error)
-        }
-        wsRef.current = ws
+        // Connect WebSocket; the server sends a snapshot, then numbered events
+        connectWebSocket()
 
         setLoading(false)
       } catch (error) {
@@ -74,9 +71,32 @@ export default function PollScreen() {
       }
     }
 
+    const connectWebSocket = () => {
+      const resume = epochRef.current !== null && lastSeqRef.current !== null
+        ? { since: lastSeqRef.current, epoch: epochRef.current }
+        : undefined
+      const ws = createWebSocket(pollId, user.userId, resume)
+      ws.onmessage = (event) => {
+        const message = JSON.parse(event.data)
+        handleWebSocketMessage(message)
+      }
+      ws.onerror = (error) => {
+        console.error('WebSocket error:', error)
+      }
+      ws.onclose = () => {
+        // Reconnect and resume unless the screen is closing
+        if (!closedRef.current) {
+          window.setTimeout(connectWebSocket, 1000)
+        }
+      }
+      wsRef.current = ws
+    }
+
+    closedRef.current = false
     init()
 
     return () => {
+      closedRef.current = true
       if (wsRef.current) {
         wsRef.current.close()
       }
@@ -87,7 +107,21 @@ export default function PollScreen() {
   }, [pollId, user, navigate])
 
   const handleWebSocketMessage = (message: any) => {
+    if (typeof message.seq === 'number') {
+      lastSeqRef.current = message.seq
+    }
     switch (message.type) {
+      case 'snapshot':
+        epochRef.current = message.epoch
+        setOptions(message.options)
+        setReadyCount(message.ready)
+        previousReadyCountRef.current = message.ready
+        setTotalParticipants(message.participants)
+        setOnline(message.online)
+        if (message.winner) {
+          navigate(`/poll/${pollId}/result`)
+        }
+        break
       case 'option_added':
         setOptions((prev) => {
           // Check if option already exists to prevent duplicates
@@ -98,6 +132,13 @@ export default function PollScreen() {
         })
         setReady(false) // Reset ready status when option is added
         break
+      case 'options_added':
+        setOptions((prev) => [
+          ...prev,
+          ...message.options.filter((option: Option) => !prev.some(opt => opt.id === option.id)),
+        ])
+        setReady(false) // Reset ready status when options are added
+        break
       case 'ready_counts':
         const newReadyCount = message.ready
         const previousReadyCount = previousReadyCountRef.current
@@ -113,9 +154,39 @@ export default function PollScreen() {
         navigate(`/poll/${pollId}/result`)
         break
       case 'participant_joined':
-      case 'participant_left':
         setTotalParticipants(message.participants)
         break
+      case 'presence':
+        setOnline(message.online)
+        break
+      case 'resync':
+        // The server dropped events we were too slow to receive, or could not
+        // replay the ones missed while disconnected; reload state
+        resync()
+        break
+      case 'poll_deleted':
+        // Stop reconnecting to a poll that no longer exists and go home
+        closedRef.current = true
+        wsRef.current?.close()
+        alert('This poll has been deleted')
+        navigate('/')
+        break
+    }
+  }
+
+  const resync = async () => {
+    if (!pollId) return
+    try {
+      const [opts, status] = await Promise.all([listOptions(pollId), getStatus(pollId)])
+      setOptions(opts)
+      setReadyCount(status.readyCount)
+      previousReadyCountRef.current = status.readyCount
+      setTotalParticipants(status.totalParticipants)
+      if (status.winner) {
+        navigate(`/poll/${pollId}/result`)
+      }
+    } catch (error) {
+      console.error('Failed to resync poll:', error)
     }
   }
 
@@ -128,17 +199,19 @@ export default function PollScreen() {
     }, 300)
   }
 
+  const ballotEntries = (): VoteEntry[] =>
+    Object.entries(votes).map(([optionId, vote]) => ({
+      optionId,
+      rating: vote.veto ? null : vote.rating,
+      veto: vote.veto,
+    }))
+
   const saveVotes = async () => {
     if (!pollId || !user || saving) return
 
     setSaving(true)
     try {
-      const entries: VoteEntry[] = Object.entries(votes).map(([optionId, vote]) => ({
-        optionId,
-        rating: vote.veto ? null : vote.rating,
-        veto: vote.veto,
-      }))
-      await submitVote(pollId, user.userId, entries)
+      await submitVote(pollId, user.userId, ballotEntries())
     } catch (error) {
       console.error('Failed to save votes:', error)
     } finally {
@@ -181,8 +254,12 @@ export default function PollScreen() {
   const handleReady = async () => {
     if (!pollId || !user) return
 
+    // Send the ballot with the ready flag, so a pending save can't unready us
+    if (saveTimeoutRef.current) {
+      clearTimeout(saveTimeoutRef.current)
+    }
     try {
-      const response = await markReady(pollId, user.userId)
+      const response = await submitAndReady(pollId, user.userId, ballotEntries())
       setReady(true)
       previousReadyCountRef.current = response.readyCount
     } catch (error) {
@@ -218,7 +295,7 @@ export default function PollScreen() {
           borderRadius: '20px',
           display: 'inline-block',
         }}>
-          Ready: {readyCount}/{totalParticipants}
+          Ready: {readyCount}/{totalParticipants} · {online} online
         </div>
       </div>
 